@@ -16,7 +16,9 @@
 
 from reddwarf.common import cfg
 from reddwarf.common import exception
+from reddwarf.common import pagination
 from reddwarf.common import utils
+from reddwarf.db import get_db_api
 from reddwarf.db.models import DatabaseModelBase
 from reddwarf.openstack.common import log as logging
 from swiftclient.client import ClientException
@@ -35,6 +37,7 @@ class BackupState(object):
     SAVING = "SAVING"
     COMPLETED = "COMPLETED"
     FAILED = "FAILED"
+    RUNNING_STATES = [NEW, BUILDING, SAVING]
 
 
 class Backup(object):
@@ -106,6 +109,21 @@ class Backup(object):
                                     deleted=False)
         return db_info
 
+    @classmethod
+    def paginated(cls, context, query):
+        """
+        get a page of the Backups a list returned, in creation order
+        :param cls:
+        :param context: limit and marker of the page included
+        :param query: a list of Backups
+        :return: the page of Backups and the marker of the next page
+        """
+        limit = pagination.page_limit(context.limit, CONF.backups_page_size)
+        data_view = DBBackup.find_by_pagination('backups', query, 'backups',
+                                                limit=limit,
+                                                marker=context.marker)
+        return data_view.collection, data_view.next_page_marker
+
     @classmethod
     def list_for_instance(cls, instance_id):
         """
@@ -118,6 +136,39 @@ class Backup(object):
                                     deleted=False)
         return db_info
 
+    @classmethod
+    def running(cls, instance_id, exclude=None):
+        """
+        get a running Backup of given instance
+        :param cls:
+        :param instance_id:
+        :param exclude: id of a Backup to ignore
+        :return: a running Backup, or None
+        """
+        backups = DBBackup.find_all_in('state', BackupState.RUNNING_STATES,
+                                       instance_id=instance_id,
+                                       deleted=False)
+        for backup in backups:
+            if backup.id != exclude:
+                return backup
+        return None
+
+    @classmethod
+    def running_instance_ids(cls, instance_ids):
+        """
+        find which of the given instances have a Backup running, at once
+        :param cls:
+        :param instance_ids:
+        :return: set of the ids of instances with a running Backup
+        """
+        if not instance_ids:
+            return set()
+        return get_db_api().find_distinct(
+            DBBackup, 'instance_id',
+            {'instance_id': instance_ids,
+             'state': BackupState.RUNNING_STATES},
+            deleted=False)
+
     @classmethod
     def delete(cls, context, backup_id):
         """
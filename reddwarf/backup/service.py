@@ -19,6 +19,7 @@ from reddwarf.common import wsgi
 from reddwarf.backup import views
 from reddwarf.backup.models import Backup
 from reddwarf.common import exception
+from reddwarf.common import pagination
 from reddwarf.common import cfg
 from reddwarf.openstack.common import log as logging
 from reddwarf.openstack.common.gettextutils import _
@@ -38,8 +39,11 @@ class BackupController(wsgi.Controller):
         """
         LOG.debug("Listing Backups for tenant '%s'" % tenant_id)
         context = req.environ[wsgi.CONTEXT_KEY]
-        backups = Backup.list(context)
-        return wsgi.Result(views.BackupViews(backups).data(), 200)
+        backups, marker = Backup.paginated(context, Backup.list(context))
+        view = views.BackupViews(backups)
+        paged = pagination.SimplePaginatedDataView(req.url, 'backups', view,
+                                                   marker)
+        return wsgi.Result(paged.data(), 200)
 
     def show(self, req, tenant_id, id):
         """Return a single backup."""
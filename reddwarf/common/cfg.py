@@ -24,7 +24,21 @@ common_opts = [
                help='SQL Connection'),
     cfg.IntOpt('sql_idle_timeout', default=3600),
     cfg.BoolOpt('sql_query_log', default=False),
+    cfg.IntOpt('sql_pool_size', default=10,
+               help='Connections kept open in the SQL connection pool.'),
+    cfg.IntOpt('sql_max_overflow', default=20,
+               help='Connections opened beyond sql_pool_size under load.'),
+    cfg.IntOpt('sql_pool_timeout', default=30,
+               help='Seconds to wait for a free pooled SQL connection.'),
+    cfg.BoolOpt('sql_pool_ping', default=True,
+                help='Check pooled SQL connections are alive on checkout.'),
     cfg.IntOpt('bind_port', default=8779),
+    cfg.IntOpt('api_workers', default=1,
+               help='Number of API worker processes. More than one forks '
+                    'workers sharing the listen socket.'),
+    cfg.IntOpt('api_shutdown_timeout', default=30,
+               help='Seconds an API worker waits for requests in progress '
+                    'to finish when it is stopped.'),
     cfg.StrOpt('api_extensions_path', default='',
                help='Path to extensions'),
     cfg.StrOpt('api_paste_config',
@@ -44,6 +58,16 @@ common_opts = [
     cfg.StrOpt('nova_volume_url', default='http://localhost:8776/v2'),
     cfg.StrOpt('swift_url', default='http://localhost:8080/v1/AUTH_'),
     cfg.StrOpt('reddwarf_auth_url', default='http://0.0.0.0:5000/v2.0'),
+    cfg.IntOpt('remote_client_cache_size', default=100,
+               help='Maximum number of Nova, volume and Swift clients kept '
+                    'for reuse across requests. 0 disables the cache.'),
+    cfg.IntOpt('remote_client_cache_ttl', default=300,
+               help='Seconds a cached remote client is reused. Should not '
+                    'exceed the lifetime of auth tokens.'),
+    cfg.IntOpt('remote_client_pool_size', default=4,
+               help='Maximum number of Nova, volume or Swift clients '
+                    'pooled for each cached client. Each is used by one '
+                    'green thread at a time.'),
     cfg.StrOpt('host', default='0.0.0.0'),
     cfg.IntOpt('report_interval', default=10),
     cfg.IntOpt('periodic_interval', default=60),
@@ -65,13 +89,48 @@ common_opts = [
     cfg.IntOpt('users_page_size', default=20),
     cfg.IntOpt('databases_page_size', default=20),
     cfg.IntOpt('instances_page_size', default=20),
+    cfg.IntOpt('backups_page_size', default=20),
+    cfg.IntOpt('security_groups_page_size', default=20),
+    cfg.IntOpt('nova_server_lookup_pool_size', default=10,
+               help='Maximum number of concurrent Nova requests made when '
+                    'looking up the servers for a page of instances. Also '
+                    'bounded by remote_client_pool_size.'),
     cfg.ListOpt('ignore_users', default=[]),
     cfg.ListOpt('ignore_dbs', default=[]),
+    cfg.IntOpt('server_status_cache_ttl', default=0,
+               help='Seconds the Nova server status cached on an instance '
+                    'is trusted before Nova is asked again. 0 disables the '
+                    'cache.'),
+    cfg.IntOpt('instance_ready_cache_ttl', default=3,
+               help='Seconds to trust that MySQL is running on an instance '
+                    'before checking its service status again for user, '
+                    'database and root calls. 0 disables the cache.'),
+    cfg.IntOpt('instance_ready_cache_size', default=1000),
+    cfg.BoolOpt('nova_notifications_enabled', default=False,
+                help='Whether the taskmanager consumes Nova notifications '
+                     'to keep the cached server status up to date.'),
+    cfg.StrOpt('nova_notification_topic', default='notifications.info'),
+    cfg.StrOpt('nova_notification_queue',
+               default='reddwarf.nova_notifications'),
+    cfg.StrOpt('nova_control_exchange', default='nova'),
     cfg.IntOpt('agent_call_low_timeout', default=5),
     cfg.IntOpt('agent_call_high_timeout', default=60),
+    cfg.IntOpt('host_update_concurrency', default=10,
+               help='Guests of a host updated at the same time.'),
+    cfg.IntOpt('host_update_guest_timeout', default=90,
+               help='Seconds an update of one guest of a host may take '
+                    'before it is counted as failed.'),
     cfg.StrOpt('guest_id', default=None),
     cfg.IntOpt('state_change_wait_time', default=3 * 60),
-    cfg.IntOpt('agent_heartbeat_time', default=10),
+    cfg.IntOpt('agent_heartbeat_time', default=60,
+               help='Seconds after its last heartbeat that a guest agent is '
+                    'considered down, and calls to it fail at once.'),
+    cfg.IntOpt('agent_heartbeat_cache_time', default=5,
+               help='Seconds a heartbeat read to check a guest agent is '
+                    'reused for later calls to that agent.'),
+    cfg.IntOpt('agent_heartbeat_cache_size', default=1000,
+               help='Maximum number of guest agent heartbeats kept for '
+                    'reuse.'),
     cfg.IntOpt('num_tries', default=3),
     cfg.StrOpt('volume_fstype', default='ext3'),
     cfg.StrOpt('format_options', default='-m 5'),
@@ -89,10 +148,21 @@ common_opts = [
                default='reddwarf.quota.quota.DbQuotaDriver',
                help='default driver to use for quota checks'),
     cfg.StrOpt('taskmanager_queue', default='taskmanager'),
+    cfg.StrOpt('conductor_queue', default='conductor',
+               help='Queue the guest agents report their status on.'),
     cfg.BoolOpt('use_nova_server_volume', default=False),
     cfg.StrOpt('fake_mode_events', default='simulated'),
     cfg.StrOpt('device_path', default='/dev/vdb'),
     cfg.StrOpt('mount_point', default='/var/lib/mysql'),
+    cfg.StrOpt('mysql_socket', default='/var/run/mysqld/mysqld.sock',
+               help='Socket the guest agent probes to see if MySQL is up.'),
+    cfg.StrOpt('mysql_pid_file', default='/var/run/mysqld/mysqld.pid'),
+    cfg.IntOpt('mysql_probe_timeout', default=5,
+               help='Seconds MySQL has to greet the guest agent\'s probe '
+                    'before it is considered blocked.'),
+    cfg.IntOpt('agent_status_resync_interval', default=600,
+               help='Seconds after which the guest agent reports an '
+                    'unchanged MySQL status again.'),
     cfg.StrOpt('service_type', default='mysql'),
     cfg.StrOpt('block_device_mapping', default='vdb'),
     cfg.IntOpt('server_delete_time_out', default=2),
@@ -102,12 +172,29 @@ common_opts = [
     cfg.IntOpt('dns_time_out', default=60 * 2),
     cfg.IntOpt('resize_time_out', default=60 * 10),
     cfg.IntOpt('revert_time_out', default=60 * 10),
+    cfg.IntOpt('poll_max_sleep_time', default=10,
+               help='Longest wait between polls while the task manager '
+                    'waits on Nova; the wait doubles from the initial '
+                    'interval up to this.'),
     cfg.ListOpt('root_grant', default=['ALL']),
     cfg.BoolOpt('root_grant_option', default=True),
     cfg.IntOpt('http_get_rate', default=200),
     cfg.IntOpt('http_post_rate', default=200),
     cfg.IntOpt('http_delete_rate', default=200),
     cfg.IntOpt('http_put_rate', default=200),
+    cfg.StrOpt('rate_limit_storage',
+               default='reddwarf.common.limits.MemoryLimiterStorage',
+               help='Class holding rate limit state. The in-memory default '
+                    'is per process; reddwarf.common.limits.'
+                    'SqlLimiterStorage shares it between API workers and '
+                    'hosts through the database.'),
+    cfg.IntOpt('rate_limit_cache_size', default=10000,
+               help='Maximum number of tenant rate limit buckets kept in '
+                    'memory before the least recently used are evicted.'),
+    cfg.IntOpt('rate_limit_idle_timeout', default=60 * 60 * 24,
+               help='Seconds after which an idle rate limit bucket is '
+                    'evicted. Buckets drain within their limit\'s unit, so '
+                    'this should be at least the longest unit in use.'),
     cfg.BoolOpt('hostname_require_ipv4', default=True,
                 help="Require user hostnames to be IPv4 addresses."),
     cfg.StrOpt('backup_strategy', default='InnoBackupEx',
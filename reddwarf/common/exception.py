@@ -110,6 +110,11 @@ class GuestError(ReddwarfError):
                 "%(original_message)s.")
 
 
+class GuestMethodNotFound(GuestError):
+
+    message = _("The guest agent has no method %(method)s.")
+
+
 class GuestTimeout(ReddwarfError):
 
     message = _("Timeout trying to connect to the Guest Agent.")
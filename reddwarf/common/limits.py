@@ -17,8 +17,7 @@
 Module dedicated functions/classes dealing with rate limiting requests.
 """
 
-import collections
-import copy
+import array
 import httplib
 import math
 import re
@@ -27,14 +26,21 @@ import webob.dec
 import webob.exc
 
 from reddwarf.common import cfg
+from reddwarf.common import exception
+from reddwarf.common import utils
 from reddwarf.common import wsgi as base_wsgi
+from reddwarf.db import db_query
+from reddwarf.db import get_db_api
+from reddwarf.limits import models
 from reddwarf.openstack.common import importutils
 from reddwarf.openstack.common import jsonutils
+from reddwarf.openstack.common import log as logging
 from reddwarf.openstack.common import wsgi
 from reddwarf.openstack.common.gettextutils import _
 
 
 CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
 
 # Convenience constants for the limits dictionary passed to Limiter().
 PER_SECOND = 1
@@ -42,6 +48,8 @@ PER_MINUTE = 60
 PER_HOUR = 60 * 60
 PER_DAY = 60 * 60 * 24
 
+NAN = float('nan')
+
 
 class Limit(object):
     """
@@ -70,6 +78,8 @@ class Limit(object):
         self.verb = verb
         self.uri = uri
         self.regex = regex
+        self.pattern = re.compile(regex)
+        self.matches_all = regex in ('', '.*', '^.*')
         self.value = int(value)
         self.unit = unit
         self.unit_string = self.display_unit().lower()
@@ -95,35 +105,55 @@ class Limit(object):
         @param verb: string http verb (POST, GET, etc.)
         @param url: string URL
         """
-        if self.verb != verb or not re.match(self.regex, url):
+        if not self.matches(verb, url):
             return
 
-        now = self._get_time()
+        state = (self.water_level, self.last_request, self.next_request)
+        state, delay = self.consume(state)
+        self.water_level, self.last_request, self.next_request = state
+
+        if delay:
+            return delay
+
+        self.remaining = self._remaining(self.water_level)
+
+    def matches(self, verb, url):
+        """Whether a request with the given verb and url is limited."""
+        return self.verb == verb and (self.matches_all or
+                                      self.pattern.match(url))
+
+    def consume(self, state):
+        """
+        Runs one request through a leaky bucket for this limit.
 
-        if self.last_request is None:
-            self.last_request = now
+        @param state: (water_level, last_request, next_request) tuple
+                      describing the bucket, or None for an empty one
+        @return: Tuple of the new state and the delay (or None)
+        """
+        now = self._get_time()
+        water_level, last_request, next_request = state or (0, None, None)
 
-        leak_value = now - self.last_request
+        if last_request is None:
+            last_request = now
 
-        self.water_level -= leak_value
-        self.water_level = max(self.water_level, 0)
-        self.water_level += self.request_value
+        leak_value = now - last_request
 
-        difference = self.water_level - self.capacity
+        water_level -= leak_value
+        water_level = max(water_level, 0)
+        water_level += self.request_value
 
-        self.last_request = now
+        difference = water_level - self.capacity
 
         if difference > 0:
-            self.water_level -= self.request_value
-            self.next_request = now + difference
-            return difference
+            water_level -= self.request_value
+            return (water_level, now, now + difference), difference
+
+        return (water_level, now, now), None
 
+    def _remaining(self, water_level):
         cap = self.capacity
-        water = self.water_level
         val = self.value
-
-        self.remaining = math.floor(((cap - water) / cap) * val)
-        self.next_request = now
+        return math.floor(((cap - water_level) / cap) * val)
 
     def _get_time(self):
         """Retrieve the current time. Broken out for testability."""
@@ -133,16 +163,26 @@ class Limit(object):
         """Display the string name of the unit."""
         return self.UNITS.get(self.unit, "UNKNOWN")
 
-    def display(self):
-        """Return a useful representation of this class."""
+    def display(self, state=None):
+        """
+        Return a useful representation of this class.
+
+        @param state: Bucket state, as returned by consume(), to describe
+                      instead of this limit's own
+        """
+        remaining = self.remaining
+        next_request = self.next_request
+        if state is not None:
+            remaining = self._remaining(state[0])
+            next_request = state[2]
         return {
             "verb": self.verb,
             "URI": self.uri,
             "regex": self.regex,
             "value": self.value,
-            "remaining": int(self.remaining),
+            "remaining": int(remaining),
             "unit": self.display_unit(),
-            "resetTime": int(self.next_request or self._get_time()),
+            "resetTime": int(next_request or self._get_time()),
         }
 
 # "Limit" format is a dictionary with the HTTP verb, human-readable URI,
@@ -216,19 +256,62 @@ class RateLimitingMiddleware(base_wsgi.ReddwarfMiddleware):
         return self.application
 
 
+class LimitIndex(object):
+    """
+    Finds the limits relevant to a request without trying every regex.
+
+    Limits are grouped by verb. Within a verb, limits matching every URL
+    apply without any regex work, and the remaining patterns are merged into
+    one alternation, so a URL that none of them match costs a single match.
+    """
+
+    def __init__(self, limits):
+        grouped = {}
+        for index, limit in enumerate(limits):
+            always, specific = grouped.setdefault(limit.verb, ([], []))
+            if limit.matches_all:
+                always.append((index, limit))
+            else:
+                specific.append((index, limit))
+
+        self._verbs = {}
+        for verb, (always, specific) in grouped.items():
+            self._verbs[verb] = (always, specific, self._merge(specific))
+
+    def _merge(self, specific):
+        # Groups and inline flags would change meaning once merged, so
+        # patterns using them are only ever matched one by one.
+        if not specific or any(limit.pattern.groups or limit.pattern.flags
+                               for index, limit in specific):
+            return None
+        return re.compile("|".join("(?:%s)" % limit.regex
+                                   for index, limit in specific))
+
+    def find(self, verb, url):
+        """Return (position, limit) pairs for the limits matching."""
+        always, specific, merged = self._verbs.get(verb, ((), (), None))
+        if not specific or (merged is not None and not merged.match(url)):
+            return always
+        return always + [(index, limit) for index, limit in specific
+                         if limit.pattern.match(url)]
+
+
 class Limiter(object):
     """
-    Rate-limit checking class which handles limits in memory.
+    Rate-limit checking class. The state of each tenant's limits is kept in
+    a pluggable storage, in memory unless configured otherwise.
     """
 
-    def __init__(self, limits, **kwargs):
+    def __init__(self, limits, storage=None, **kwargs):
         """
         Initialize the new `Limiter`.
 
         @param limits: List of `Limit` objects
+        @param storage: Storage object, or class name, holding the limit
+                        state; defaults to the rate_limit_storage option
         """
-        self.limits = copy.deepcopy(limits)
-        self.levels = collections.defaultdict(lambda: copy.deepcopy(limits))
+        self.limits = list(limits)
+        self.levels = {}
 
         # Pick up any per-user limit information
         for key, value in kwargs.items():
@@ -236,11 +319,23 @@ class Limiter(object):
                 username = key[5:]
                 self.levels[username] = self.parse_limits(value)
 
+        self._index = LimitIndex(self.limits)
+        self._level_indexes = dict((username, LimitIndex(limits))
+                                   for username, limits in self.levels.items())
+
+        storage = storage or CONF.rate_limit_storage
+        if isinstance(storage, basestring):
+            storage = importutils.import_object(storage)
+        self.storage = storage
+
     def get_limits(self, username=None):
         """
         Return the limits for a given user.
         """
-        return [limit.display() for limit in self.levels[username]]
+        limits = self.levels.get(username, self.limits)
+        states = self.storage.get(username, range(len(limits)))
+        return [limit.display(state)
+                for limit, state in zip(limits, states)]
 
     def check_for_delay(self, verb, url, username=None):
         """
@@ -250,8 +345,9 @@ class Limiter(object):
         """
         delays = []
 
-        for limit in self.levels[username]:
-            delay = limit(verb, url)
+        limit_index = self._level_indexes.get(username, self._index)
+        for index, limit in limit_index.find(verb, url):
+            delay = self.storage.update(username, index, limit.consume)
             if delay:
                 delays.append((delay, limit.error_message))
 
@@ -325,6 +421,142 @@ class Limiter(object):
         return result
 
 
+class MemoryLimiterStorage(object):
+    """
+    Keeps limit state in this process, as one flat array of floats per user.
+    The least recently used users are evicted beyond rate_limit_cache_size,
+    as are users left idle for longer than rate_limit_idle_timeout.
+    """
+
+    # Each array holds the time it was last touched, then the state of each
+    # limit in turn; NaN marks a value that was never set.
+    STATE_SIZE = 3
+
+    def __init__(self):
+        self._buckets = utils.LRUDict()
+
+    def get(self, username, indexes):
+        """Return the state of each of the user's limits, or None."""
+        buckets = self._buckets.get(username)
+        return [self._state(buckets, index) for index in indexes]
+
+    def update(self, username, index, func):
+        """
+        Replace the state of one of the user's limits.
+
+        @param func: Called with the current state (or None); returns the
+                     new state and a result
+        @return: The result returned by func
+        """
+        now = time.time()
+        buckets = self._buckets.pop(username, None)
+        state, result = func(self._state(buckets, index))
+
+        offset = 1 + index * self.STATE_SIZE
+        if buckets is None:
+            buckets = array.array('d', [NAN])
+        if len(buckets) < offset + self.STATE_SIZE:
+            buckets.extend([NAN] * (offset + self.STATE_SIZE - len(buckets)))
+        buckets[0] = now
+        for position, value in enumerate(state):
+            buckets[offset + position] = NAN if value is None else value
+
+        self._buckets[username] = buckets
+        self._evict(now)
+        return result
+
+    def _state(self, buckets, index):
+        offset = 1 + index * self.STATE_SIZE
+        if (buckets is None or len(buckets) <= offset or
+                math.isnan(buckets[offset])):
+            return None
+        return tuple(None if math.isnan(value) else value
+                     for value in buckets[offset:offset + self.STATE_SIZE])
+
+    def _evict(self, now):
+        while self._buckets:
+            username, buckets = self._buckets.oldest()
+            if (len(self._buckets) <= CONF.rate_limit_cache_size and
+                    now - buckets[0] <= CONF.rate_limit_idle_timeout):
+                break
+            del self._buckets[username]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SqlLimiterStorage(object):
+    """
+    Keeps limit state in the database, so every API worker and host enforces
+    the same limits. Each update is a compare-and-swap on the bucket's
+    version and is retried if another worker changed the bucket first.
+    Buckets are purged once they have fully drained.
+    """
+
+    RETRIES = 10
+    PURGE_INTERVAL = 60
+
+    def __init__(self):
+        self._next_purge = 0
+
+    def get(self, username, indexes):
+        """Return the state of each of the user's limits, or None."""
+        keys = [self._key(username, index) for index in indexes]
+        buckets = dict((bucket.id, bucket) for bucket in
+                       models.RateLimitBucket.find_all_in('id', keys))
+        return [self._state(buckets.get(key)) for key in keys]
+
+    def update(self, username, index, func):
+        """
+        Replace the state of one of the user's limits.
+
+        @param func: Called with the current state (or None); returns the
+                     new state and a result
+        @return: The result returned by func
+        """
+        key = self._key(username, index)
+        self._purge()
+        for attempt in range(self.RETRIES):
+            bucket = models.RateLimitBucket.get_by(id=key)
+            state, result = func(self._state(bucket))
+            water_level, last_request, next_request = state
+            values = {'water_level': water_level,
+                      'last_request': last_request,
+                      'next_request': next_request,
+                      'expires_at': last_request + water_level}
+            if bucket is None:
+                try:
+                    get_db_api().insert(models.RateLimitBucket(
+                        id=key, version=0, **values))
+                    return result
+                except exception.DBConstraintError:
+                    continue
+            updated = models.RateLimitBucket.find_all(
+                id=key, version=bucket.version).update(
+                    version=bucket.version + 1, **values)
+            if updated:
+                return result
+        LOG.warn(_("Gave up updating rate limit %(key)s after %(attempt)d "
+                   "conflicting updates.") % locals())
+        return result
+
+    def _key(self, username, index):
+        return "%s/%d" % (username or '', index)
+
+    def _state(self, bucket):
+        if bucket is None:
+            return None
+        return (bucket.water_level, bucket.last_request, bucket.next_request)
+
+    def _purge(self):
+        now = time.time()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self.PURGE_INTERVAL
+        db_query.find_all_before(models.RateLimitBucket, column='expires_at',
+                                 value=now).delete()
+
+
 class WsgiLimiter(object):
     """
     Rate-limit checking from a WSGI application. Uses an in-memory `Limiter`.
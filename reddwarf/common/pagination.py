@@ -20,6 +20,11 @@ import urlparse
 from xml.dom import minidom
 
 
+def page_limit(limit, page_size):
+    """Returns the requested page limit, capped at the page size."""
+    return min(int(limit or page_size), page_size)
+
+
 class PaginatedDataView(object):
 
     def __init__(self, collection_type, collection, current_page_url,
@@ -15,21 +15,131 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import time
+
+from eventlet import pools
+
 from reddwarf.common import cfg
+from reddwarf.common import utils
+from reddwarf.openstack.common import log as logging
+from novaclient import base as novaclient_base
 from novaclient.v1_1.client import Client
 from swiftclient.client import Connection
 
 
 CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
 COMPUTE_URL = CONF.nova_compute_url
 PROXY_AUTH_URL = CONF.reddwarf_auth_url
 VOLUME_URL = CONF.nova_volume_url
 OBJECT_STORE_URL = CONF.swift_url
 
 
+class ClientCache(object):
+    """An LRU cache of remote clients.
+
+    Each cached client is a PooledClient, so concurrent requests sharing
+    one never use the same underlying client at once. Clients are keyed by
+    tenant, auth token and endpoint, so a client is only ever reused for
+    the token it was built with. Entries expire after
+    remote_client_cache_ttl seconds, which should not exceed the lifetime
+    of the auth tokens handed to Reddwarf.
+    """
+
+    def __init__(self):
+        self._clients = utils.LRUDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, create):
+        max_size = CONF.remote_client_cache_size
+        if max_size <= 0:
+            return create()
+        now = time.time()
+        entry = self._clients.pop(key, None)
+        if entry is not None and entry[0] > now:
+            self.hits += 1
+        else:
+            self.misses += 1
+            entry = (now + CONF.remote_client_cache_ttl, create())
+        self._clients[key] = entry
+        while len(self._clients) > max_size:
+            del self._clients[self._clients.oldest()[0]]
+            self.evictions += 1
+        return entry[1]
+
+    def clear(self):
+        self._clients.clear()
+
+    def stats(self):
+        return {'size': len(self._clients),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions}
+
+
+CLIENT_CACHE = ClientCache()
+
+
+class PooledClient(object):
+    """Shares remote clients between green threads.
+
+    Neither a novaclient nor a swiftclient Connection can be used by two
+    green threads at once, since each holds a single keep-alive HTTP
+    connection. Each call checks a client out of the pool and returns it
+    once the call completes. Managers such as servers are proxied the same
+    way, and the resources their calls return are bound to the proxy, so
+    calls like server.delete() check a client out as well.
+    """
+
+    def __init__(self, create, pool=None, path=()):
+        if pool is None:
+            pool = pools.Pool(max_size=CONF.remote_client_pool_size,
+                              create=create)
+        self._pool = pool
+        self._path = path
+
+    def _resolve(self, client, name):
+        for part in self._path:
+            client = getattr(client, part)
+        return getattr(client, name)
+
+    def _bind(self, result):
+        resources = result if isinstance(result, list) else [result]
+        for resource in resources:
+            if isinstance(resource, novaclient_base.Resource):
+                resource.manager = self
+
+    def __getattr__(self, name):
+        with self._pool.item() as client:
+            attr = self._resolve(client, name)
+        if isinstance(attr, novaclient_base.Manager):
+            return PooledClient(None, self._pool, self._path + (name,))
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            with self._pool.item() as client:
+                result = self._resolve(client, name)(*args, **kwargs)
+            if self._path:
+                self._bind(result)
+            return result
+        return call
+
+
+DNS_CLIENT = None
+
+
 def create_dns_client(context):
-    from reddwarf.dns.manager import DnsManager
-    return DnsManager()
+    # The DNS manager holds no per-request state, and the driver behind it
+    # re-authenticates on its own when its token expires, so one is shared
+    # by the whole process.
+    global DNS_CLIENT
+    if DNS_CLIENT is None:
+        from reddwarf.dns.manager import DnsManager
+        DNS_CLIENT = DnsManager()
+    return DNS_CLIENT
 
 
 def create_guest_client(context, id):
@@ -37,31 +147,41 @@ def create_guest_client(context, id):
     return API(context, id)
 
 
-def create_nova_client(context):
+def _create_nova_client(context, url):
     client = Client(context.user, context.auth_tok, project_id=context.tenant,
                     auth_url=PROXY_AUTH_URL)
     client.client.auth_token = context.auth_tok
-    client.client.management_url = "%s/%s/" % (COMPUTE_URL, context.tenant)
+    client.client.management_url = "%s/%s/" % (url, context.tenant)
 
     return client
 
 
+def create_nova_client(context):
+    def create():
+        return _create_nova_client(context, COMPUTE_URL)
+
+    key = (context.tenant, context.auth_tok, COMPUTE_URL)
+    return CLIENT_CACHE.get(key, lambda: PooledClient(create))
+
+
 def create_nova_volume_client(context):
     # Quite annoying but due to a paste config loading bug.
     # TODO(hub-cap): talk to the openstack-common people about this
-    client = Client(context.user, context.auth_tok,
-                    project_id=context.tenant, auth_url=PROXY_AUTH_URL)
-    client.client.auth_token = context.auth_tok
-    client.client.management_url = "%s/%s/" % (VOLUME_URL, context.tenant)
+    def create():
+        return _create_nova_client(context, VOLUME_URL)
 
-    return client
+    key = (context.tenant, context.auth_tok, VOLUME_URL)
+    return CLIENT_CACHE.get(key, lambda: PooledClient(create))
 
 
 def create_swift_client(context):
-    client = Connection(preauthurl=OBJECT_STORE_URL + context.tenant,
-                        preauthtoken=context.auth_tok,
-                        tenant_name=context.tenant)
-    return client
+    def create():
+        return Connection(preauthurl=OBJECT_STORE_URL + context.tenant,
+                          preauthtoken=context.auth_tok,
+                          tenant_name=context.tenant)
+
+    key = (context.tenant, context.auth_tok, OBJECT_STORE_URL)
+    return CLIENT_CACHE.get(key, lambda: PooledClient(create))
 
 # Override the functions above with fakes.
 if CONF.remote_implementation == "fake":
@@ -16,8 +16,10 @@
 #    under the License.
 """I totally stole most of this from melange, thx guys!!!"""
 
+import collections
 import datetime
 import inspect
+import random
 import re
 import signal
 import sys
@@ -26,6 +28,7 @@ import urlparse
 import uuid
 
 from eventlet import event
+from eventlet import greenpool
 from eventlet import greenthread
 from eventlet import semaphore
 from eventlet.green import subprocess
@@ -161,6 +164,62 @@ class MethodInspector(object):
         return "%s %s" % (self._func.__name__, args_str)
 
 
+class LRUDict(object):
+    """A dict that keeps its keys in the order they were last set.
+
+    Callers re-set a key when they use it, so oldest() is the least
+    recently used entry. Python 2.6 has no OrderedDict, so the order is
+    kept in a queue of (sequence, key) pairs; pairs left behind when a key
+    is set again or deleted are skipped, and dropped once they outnumber
+    the live entries.
+    """
+
+    def __init__(self):
+        self._items = {}
+        self._order = collections.deque()
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __setitem__(self, key, value):
+        self._sequence += 1
+        self._items[key] = (self._sequence, value)
+        self._order.append((self._sequence, key))
+        if len(self._order) > 2 * len(self._items) + 16:
+            self._order = collections.deque(sorted(
+                (sequence, key)
+                for key, (sequence, value) in self._items.iteritems()))
+
+    def __getitem__(self, key):
+        return self._items[key][1]
+
+    def __delitem__(self, key):
+        del self._items[key]
+
+    def get(self, key, default=None):
+        return self._items.get(key, (None, default))[1]
+
+    def pop(self, key, default=None):
+        return self._items.pop(key, (None, default))[1]
+
+    def oldest(self):
+        """Returns the least recently set (key, value); KeyError if empty."""
+        while self._order:
+            sequence, key = self._order[0]
+            if self._items.get(key, (None,))[0] == sequence:
+                return key, self._items[key][1]
+            self._order.popleft()
+        raise KeyError('oldest(): dictionary is empty')
+
+    def clear(self):
+        self._items.clear()
+        self._order.clear()
+
+
 class LoopingCallDone(Exception):
     """Exception to break out and stop a LoopingCall.
 
@@ -222,24 +281,124 @@ class LoopingCall(object):
         return self.done.wait()
 
 
+class PollStats(object):
+    """Keeps per-name duration totals for poll_until waits."""
+
+    def __init__(self):
+        self._stats = {}
+
+    def record(self, name, duration, polls, timed_out=False):
+        stats = self._stats.setdefault(name, {'waits': 0, 'timeouts': 0,
+                                              'polls': 0, 'total_time': 0.0,
+                                              'max_time': 0.0})
+        stats['waits'] += 1
+        stats['polls'] += polls
+        stats['total_time'] += duration
+        stats['max_time'] = max(stats['max_time'], duration)
+        if timed_out:
+            stats['timeouts'] += 1
+
+    def snapshot(self):
+        return dict((name, dict(stats))
+                    for name, stats in self._stats.iteritems())
+
+    def clear(self):
+        self._stats.clear()
+
+
+POLL_STATS = PollStats()
+
+_poll_wakers = collections.defaultdict(set)
+
+
+def wake_pollers(key):
+    """Makes every poll_until call waiting on key poll again right away."""
+    for waker in list(_poll_wakers.get(key, ())):
+        if not waker.ready():
+            waker.send()
+
+
 def poll_until(retriever, condition=lambda value: value,
-               sleep_time=1, time_out=None):
+               sleep_time=1, time_out=None, max_sleep_time=None,
+               backoff_factor=2, jitter=0.1, wake_key=None, name=None):
     """Retrieves object until it passes condition, then returns it.
 
     If time_out_limit is passed in, PollTimeOut will be raised once that
     amount of time is eclipsed.
 
+    If max_sleep_time is passed in the wait between polls starts at
+    sleep_time and grows by backoff_factor up to max_sleep_time, with up
+    to jitter (a fraction of the wait) added or taken off at random so
+    that many waits started together do not poll in lock step. Passing a
+    wake_key lets wake_pollers(wake_key) cut the current wait short.
+
     """
+    name = name or getattr(retriever, '__name__', 'poll_until')
     start_time = time.time()
+    delay = sleep_time
+    polls = 0
+    waker = None
+    if wake_key is not None:
+        waker = event.Event()
+        _poll_wakers[wake_key].add(waker)
+    try:
+        while True:
+            obj = retriever()
+            polls += 1
+            if condition(obj):
+                POLL_STATS.record(name, time.time() - start_time, polls)
+                return obj
+            elapsed = time.time() - start_time
+            if time_out is not None and elapsed > time_out:
+                POLL_STATS.record(name, elapsed, polls, timed_out=True)
+                LOG.debug("Timed out waiting for %s after %.1fs and %d polls."
+                          % (name, elapsed, polls))
+                raise exception.PollTimeOut
+            nap = delay
+            if max_sleep_time is not None:
+                nap *= random.uniform(1 - jitter, 1 + jitter)
+                delay = min(delay * backoff_factor, max_sleep_time)
+            if time_out is not None:
+                nap = max(0, min(nap, start_time + time_out - time.time()))
+            if waker is None:
+                greenthread.sleep(nap)
+            else:
+                with Timeout(nap, False):
+                    waker.wait()
+                if waker.ready():
+                    waker.reset()
+    finally:
+        if waker is not None:
+            _poll_wakers[wake_key].discard(waker)
+            if not _poll_wakers[wake_key]:
+                del _poll_wakers[wake_key]
+
 
-    def poll_and_check():
-        obj = retriever()
-        if condition(obj):
-            raise LoopingCallDone(retvalue=obj)
-        if time_out is not None and time.time() > start_time + time_out:
-            raise exception.PollTimeOut
-    lc = LoopingCall(f=poll_and_check).start(sleep_time, True)
-    return lc.wait()
+def fan_out(func, items, concurrency, timeout=None, key=lambda item: item):
+    """Calls func on every item, at most concurrency calls at a time.
+
+    Each call is given timeout seconds before it is abandoned. Returns two
+    dicts keyed by key(item): the results of the calls which returned and
+    the exceptions of those which raised or timed out (as an eventlet
+    Timeout). One failing call doesn't stop the others.
+    """
+    results = {}
+    failures = {}
+
+    def call(item):
+        timer = Timeout(timeout)
+        try:
+            results[key(item)] = func(item)
+        except (Exception, Timeout) as error:
+            failures[key(item)] = error
+        finally:
+            timer.cancel()
+
+    pool = greenpool.GreenPool(concurrency)
+    for item in items:
+        pool.spawn_n(call, item)
+    pool.waitall()
+    return results, failures
 
 
 # Copied from nova.api.openstack.common in the old code.
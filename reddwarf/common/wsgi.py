@@ -17,7 +17,9 @@
 """Wsgi helper utilities for reddwarf"""
 
 import eventlet.wsgi
+import greenlet
 import math
+import os
 import paste.urlmap
 import re
 import time
@@ -31,9 +33,12 @@ from xml.dom import minidom
 
 from reddwarf.common import context as rd_context
 from reddwarf.common import exception
+from reddwarf.common import remote
 from reddwarf.common import utils
+from reddwarf.db import get_db_api
 from reddwarf.openstack.common.gettextutils import _
 from reddwarf.openstack.common import jsonutils
+from reddwarf.openstack.common import rpc
 
 from reddwarf.openstack.common import pastedeploy
 from reddwarf.openstack.common import service
@@ -127,7 +132,8 @@ def launch(app_name, port, paste_config_file, data={},
       file and launch it via the service launcher. It takes care of
       all of the plumbing. The only caveat is that the paste_config_file
       must be a file that paste.deploy can find and handle. There is
-      a helper method in cfg.py that finds files.
+      a helper method in cfg.py that finds files. When api_workers is
+      more than one, that many worker processes are forked to serve it.
 
       Example:
         conf_file = CONF.find_file(CONF.api_paste_config)
@@ -136,9 +142,101 @@ def launch(app_name, port, paste_config_file, data={},
 
     """
     app = pastedeploy.paste_deploy_app(paste_config_file, app_name, data)
-    server = openstack_wsgi.Service(app, port, host=host,
-                                    backlog=backlog, threads=threads)
-    return service.launch(server)
+    server = Service(app, port, host=host, backlog=backlog, threads=threads)
+    workers = CONF.api_workers if CONF.api_workers > 1 else None
+    return service.launch(server, workers=workers)
+
+
+class Service(openstack_wsgi.Service):
+    """A wsgi Service that can be run in several worker processes.
+
+    The socket is bound when the service is created, so workers forked by
+    the ProcessLauncher all accept on it. A worker resets the database and
+    RPC connections it inherited when it starts. Stopping it stops accepting
+    connections, then waits up to api_shutdown_timeout for the requests in
+    progress to finish.
+    """
+
+    def __init__(self, application, port,
+                 host='0.0.0.0', backlog=128, threads=1000):
+        super(Service, self).__init__(application, port, host=host,
+                                      backlog=backlog, threads=threads)
+        self._socket = eventlet.listen((host, port), backlog=backlog)
+        self._server = None
+        self._accepting = True
+        self._active_requests = 0
+        self._parent_pid = os.getpid()
+
+    def start(self):
+        if os.getpid() != self._parent_pid:
+            self._reset_after_fork()
+        service.Service.start(self)
+        # Not a thread group thread: the server waits on the thread group's
+        # pool when it stops, which it can't do from inside the pool.
+        self._server = eventlet.spawn(self._run, self._count_requests,
+                                      _Listener(self))
+
+    def _reset_after_fork(self):
+        # Connections are sockets shared with the parent and the other
+        # workers, so each worker has to open its own.
+        get_db_api().dispose_db()
+        if rpc._RPCIMPL is not None:
+            rpc.cleanup()
+        remote.CLIENT_CACHE.clear()
+
+    def _count_requests(self, environ, start_response):
+        self._active_requests += 1
+        try:
+            return self.application(environ, start_response)
+        finally:
+            self._active_requests -= 1
+
+    def stop(self):
+        self._accepting = False
+        if self._server is not None:
+            # Lets a server spawned just now start, so it can be killed.
+            eventlet.sleep(0)
+            # Stopping the eventlet server also drops its open connections,
+            # so it is only stopped once the requests on them are done.
+            with eventlet.Timeout(CONF.api_shutdown_timeout, False):
+                while self._active_requests:
+                    eventlet.sleep(0.1)
+            self._server.kill()
+            for connection in list(self.tg.pool.coroutines_running):
+                connection.kill()
+            self._server = None
+        super(Service, self).stop()
+
+    def wait(self):
+        server = self._server
+        if server is not None:
+            try:
+                server.wait()
+            except greenlet.GreenletExit:
+                pass
+        super(Service, self).wait()
+
+
+class _Listener(object):
+    """The listening socket of a Service, as its eventlet server sees it.
+
+    Once the service is stopping, connections are closed as soon as they
+    are accepted, and the server is left waiting until it is killed.
+    """
+
+    def __init__(self, service):
+        self._service = service
+        self._socket = service._socket
+
+    def accept(self):
+        client, address = self._socket.accept()
+        if self._service._accepting:
+            return client, address
+        client.close()
+        eventlet.event.Event().wait()
+
+    def __getattr__(self, name):
+        return getattr(self._socket, name)
 
 
 # Note: taken from Nova
@@ -297,10 +395,12 @@ class Resource(openstack_wsgi.Resource):
         if getattr(self.controller, action, None) is None:
             return Fault(webob.exc.HTTPNotFound())
         try:
-            result = super(Resource, self).execute_action(
-                action,
-                request,
-                **action_args)
+            # The models an action loads are saved in the same session.
+            with get_db_api().shared_session():
+                result = super(Resource, self).execute_action(
+                    action,
+                    request,
+                    **action_args)
             if type(result) is dict:
                 result = Result(result)
             return result
@@ -0,0 +1,52 @@
+#    Copyright 2013 OpenStack LLC
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Routes the reports of the guest agents to the conductor.
+"""
+
+from reddwarf.common import cfg
+from reddwarf.common.manager import ManagerAPI
+from reddwarf.openstack.common import log as logging
+from reddwarf.openstack.common import timeutils
+
+
+CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
+
+
+class API(ManagerAPI):
+    """API for reporting to the conductor."""
+
+    def _fake_cast(self, method_name, **kwargs):
+        # Nothing else would flush the fake conductor, so the report is
+        # written as soon as it is received.
+        from reddwarf.conductor.manager import Manager
+        manager = Manager()
+        getattr(manager, method_name)(self.context, **kwargs)
+        manager.flush(self.context)
+
+    def _get_routing_key(self):
+        """Create the routing key for the conductor"""
+        return CONF.conductor_queue
+
+    def update_status(self, instance_id, status_code):
+        LOG.debug("Reporting status %s of instance: %s"
+                  % (status_code, instance_id))
+        self._cast("update_status", instance_id=instance_id,
+                   status_code=status_code, reported_at=timeutils.strtime())
+
+    def heartbeat(self, instance_id):
+        LOG.debug("Reporting heartbeat of instance: %s" % instance_id)
+        self._cast("heartbeat", instance_id=instance_id)
@@ -0,0 +1,125 @@
+#    Copyright 2013 OpenStack LLC
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from reddwarf.common import cfg
+from reddwarf.common import utils
+from reddwarf.guestagent.models import AgentHeartBeat
+from reddwarf.instance.models import InstanceServiceStatus
+from reddwarf.instance.models import ServiceStatus
+from reddwarf.openstack.common import log as logging
+from reddwarf.openstack.common import periodic_task
+from reddwarf.openstack.common import timeutils
+
+LOG = logging.getLogger(__name__)
+RPC_API_VERSION = "1.0"
+CONF = cfg.CONF
+
+
+class Manager(periodic_task.PeriodicTasks):
+    """Writes the reports of the guest agents to the database.
+
+    Reports are only queued when they arrive. Each periodic tick keeps the
+    latest report of every instance and writes them in one transaction per
+    table. Reports that fail to save are queued again for the next tick.
+
+    Several conductors may consume the topic, each flushing on its own
+    timer, so a status is stamped with the time the agent reported it and
+    is never written over one reported later. Heartbeats, timed on arrival,
+    never go back either.
+    """
+
+    def __init__(self):
+        self._statuses = {}
+        self._heartbeats = {}
+
+    def update_status(self, context, instance_id, status_code,
+                      reported_at=None):
+        # Agents that predate report times are timed on arrival.
+        if reported_at is None:
+            reported_at = utils.utcnow()
+        else:
+            reported_at = timeutils.parse_strtime(reported_at)
+        queued = self._statuses.get(instance_id)
+        if queued is None or queued[0] <= reported_at:
+            self._statuses[instance_id] = (reported_at, status_code)
+
+    def heartbeat(self, context, instance_id):
+        self._heartbeats[instance_id] = utils.utcnow()
+
+    @periodic_task.periodic_task
+    def flush(self, context):
+        statuses, self._statuses = self._statuses, {}
+        heartbeats, self._heartbeats = self._heartbeats, {}
+        # Agents only resend an unchanged status now and then, so reports
+        # that fail to save are queued again for the next flush.
+        if statuses:
+            try:
+                self._save_statuses(statuses)
+            except Exception:
+                LOG.exception("Failed to save %d statuses, will retry."
+                              % len(statuses))
+                for instance_id, report in statuses.iteritems():
+                    queued = self._statuses.get(instance_id)
+                    if queued is None or queued[0] < report[0]:
+                        self._statuses[instance_id] = report
+        if heartbeats:
+            try:
+                self._save_heartbeats(heartbeats)
+            except Exception:
+                LOG.exception("Failed to save %d heartbeats, will retry."
+                              % len(heartbeats))
+                for instance_id, updated_at in heartbeats.iteritems():
+                    queued = self._heartbeats.get(instance_id)
+                    if queued is None or queued < updated_at:
+                        self._heartbeats[instance_id] = updated_at
+
+    def _save_statuses(self, statuses):
+        existing = InstanceServiceStatus.find_all_by_instance_ids(
+            statuses.keys())
+        newer = []
+        for instance_id, (reported_at, status_code) in statuses.iteritems():
+            db_status = existing.get(instance_id)
+            status = ServiceStatus.from_code(status_code)
+            if db_status is None or status is None:
+                LOG.warn("Ignoring status %s of unknown instance: %s"
+                         % (status_code, instance_id))
+            elif (db_status.updated_at is not None and
+                    db_status.updated_at >= reported_at):
+                LOG.debug("Ignoring status %s of instance %s reported "
+                          "before the one saved." % (status_code, instance_id))
+            else:
+                # Unchanged statuses are saved too, so the row records the
+                # time of the latest report.
+                db_status.set_status(status)
+                db_status.updated_at = reported_at
+                newer.append(db_status)
+        LOG.debug("Saving %d of %d reported statuses."
+                  % (len(newer), len(statuses)))
+        if newer:
+            InstanceServiceStatus.save_all(newer)
+
+    def _save_heartbeats(self, heartbeats):
+        existing = AgentHeartBeat.find_all_by_instance_ids(heartbeats.keys())
+        beats = []
+        for instance_id, updated_at in heartbeats.iteritems():
+            beat = existing.get(instance_id)
+            if beat is None:
+                beat = AgentHeartBeat(id=utils.generate_uuid(),
+                                      instance_id=instance_id)
+            elif beat.updated_at >= updated_at:
+                continue
+            beat.updated_at = updated_at
+            beats.append(beat)
+        if beats:
+            AgentHeartBeat.save_all(beats)
@@ -55,8 +55,8 @@ class Query(object):
         return iter(self.all())
 
     def update(self, **values):
-        self.db_api.update_all(self._query_func, self._model, self._conditions,
-                               values)
+        return self.db_api.update_all(self._query_func, self._model,
+                                      self._conditions, values)
 
     def delete(self):
         self.db_api.delete_all(self._query_func, self._model,
@@ -29,14 +29,39 @@ class DatabaseModelBase(models.ModelBase):
 
     @classmethod
     def create(cls, **values):
+        instance = cls._new(values)
+        LOG.debug(_("Creating %s: %s"), cls.__name__, instance.__dict__)
+        instance = instance.db_api.insert(instance)
+        if not instance.is_valid():
+            raise exception.InvalidModelError(errors=instance.errors)
+        return instance
+
+    @classmethod
+    def create_all(cls, values_list):
+        """Creates a model for each dict of values with a bulk insert."""
+        instances = [cls._new(values) for values in values_list]
+        return get_db_api().insert_many(instances)
+
+    @classmethod
+    def save_all(cls, models):
+        """Saves several models, new or existing, in one transaction."""
+        now = utils.utcnow()
+        for model in models:
+            if not model.is_valid():
+                raise exception.InvalidModelError(errors=model.errors)
+            model['updated'] = now
+        return get_db_api().save_all(models)
+
+    @classmethod
+    def _new(cls, values):
+        values = dict(values)
         if 'id' not in values:
             values['id'] = utils.generate_uuid()
         if hasattr(cls, 'deleted') and 'deleted' not in values:
             values['deleted'] = False
         values['created'] = utils.utcnow()
-        instance = cls(**values).save()
-        if not instance.is_valid():
-            raise exception.InvalidModelError(errors=instance.errors)
+        instance = cls(**values)
+        instance['updated'] = values['created']
         return instance
 
     @property
@@ -51,14 +76,12 @@ class DatabaseModelBase(models.ModelBase):
         if not self.is_valid():
             raise exception.InvalidModelError(errors=self.errors)
         self['updated'] = utils.utcnow()
-        LOG.debug(_("Saving %s: %s") %
-                  (self.__class__.__name__, self.__dict__))
+        LOG.debug(_("Saving %s: %s"), self.__class__.__name__, self.__dict__)
         return self.db_api.save(self)
 
     def delete(self):
         self['updated'] = utils.utcnow()
-        LOG.debug(_("Deleting %s: %s") %
-                  (self.__class__.__name__, self.__dict__))
+        LOG.debug(_("Deleting %s: %s"), self.__class__.__name__, self.__dict__)
 
         if self.preserve_on_delete:
             self['deleted_at'] = utils.utcnow()
@@ -96,10 +119,37 @@ class DatabaseModelBase(models.ModelBase):
     def get_by(cls, **kwargs):
         return get_db_api().find_by(cls, **cls._process_conditions(kwargs))
 
+    @classmethod
+    def get_joined_by(cls, joined_cls, on, **kwargs):
+        """Returns a (model, joined model) pair found with a single query.
+
+        on is a pair of column names, one from each model, to join on.
+        Returns None if nothing matches.
+        """
+        return get_db_api().find_joined_by(cls, joined_cls, on,
+                                           **cls._process_conditions(kwargs))
+
+    @classmethod
+    def find_all_joined_in(cls, joined_cls, on, column, values, **kwargs):
+        """Returns the (model, joined model) pairs whose column value is one
+        of the given values, found with a single query.
+        """
+        if not values:
+            return []
+        return get_db_api().find_all_joined_in(
+            cls, joined_cls, on, column, values,
+            **cls._process_conditions(kwargs))
+
     @classmethod
     def find_all(cls, **kwargs):
         return db_query.find_all(cls, **cls._process_conditions(kwargs))
 
+    @classmethod
+    def find_all_in(cls, column, values, **kwargs):
+        """Finds all models whose column value is one of the given values."""
+        return db_query.find_all_in(cls, column=column, values=values,
+                                    **cls._process_conditions(kwargs))
+
     @classmethod
     def _process_conditions(cls, raw_conditions):
         """Override in inheritors to format/modify any conditions."""
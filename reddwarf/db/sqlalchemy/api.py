@@ -39,6 +39,46 @@ def find_all(model, **conditions):
     return _query_by(model, **conditions)
 
 
+def find_all_in(model, column, values, **conditions):
+    return _query_by(model, **conditions).filter(
+        getattr(model, column).in_(values))
+
+
+def find_all_before(model, column, value, **conditions):
+    return _query_by(model, **conditions).filter(
+        getattr(model, column) < value)
+
+
+def find_distinct(model, column, in_conditions, **conditions):
+    """Returns the set of distinct values column has in matching rows.
+
+    in_conditions maps column names to the values each column may have.
+    """
+    query = session.get_session().query(getattr(model, column)).distinct()
+    for name, value in conditions.iteritems():
+        query = query.filter(getattr(model, name) == value)
+    for name, values in in_conditions.iteritems():
+        query = query.filter(getattr(model, name).in_(values))
+    return set(row[0] for row in query)
+
+
+def find_joined_by(model, joined_model, on, **conditions):
+    model_column, joined_column = on
+    return _query_by(model, **conditions).add_entity(joined_model).join(
+        joined_model,
+        getattr(model, model_column) == getattr(joined_model, joined_column)
+    ).first()
+
+
+def find_all_joined_in(model, joined_model, on, column, values,
+                       **conditions):
+    model_column, joined_column = on
+    return _query_by(model, **conditions).add_entity(joined_model).join(
+        joined_model,
+        getattr(model, model_column) == getattr(joined_model, joined_column)
+    ).filter(getattr(model, column).in_(values)).all()
+
+
 def find_all_by_limit(query_func, model, conditions, limit, marker=None,
                       marker_column=None):
     return _limits(query_func, model, conditions, limit, marker,
@@ -53,18 +93,84 @@ def save(model):
     try:
         db_session = session.get_session()
         model = db_session.merge(model)
-        db_session.flush()
+        # A shared session may hold other changed models; only this one
+        # is being saved.
+        db_session.flush([model])
         return model
     except sqlalchemy.exc.IntegrityError as error:
         raise exception.DBConstraintError(model_name=model.__class__.__name__,
                                           error=str(error.orig))
 
 
+def insert(model):
+    """Like save, but fails rather than overwriting an existing row."""
+    try:
+        db_session = session.get_session()
+        db_session.add(model)
+        db_session.flush([model])
+        return model
+    except sqlalchemy.exc.IntegrityError as error:
+        raise exception.DBConstraintError(model_name=model.__class__.__name__,
+                                          error=str(error.orig))
+
+
+def insert_many(models):
+    """Inserts new models in one transaction.
+
+    Nothing is merged, so no row is read first, and rows of a model whose
+    ids are already set are written with a single executemany INSERT.
+    """
+    if not models:
+        return models
+    try:
+        db_session = session.get_session(shared=False)
+        with db_session.begin():
+            db_session.add_all(models)
+        return models
+    except sqlalchemy.exc.IntegrityError as error:
+        raise exception.DBConstraintError(
+            model_name=models[0].__class__.__name__, error=str(error.orig))
+
+
+def save_all(models):
+    """Saves new and existing models in one transaction.
+
+    The existing rows are read with one query per model class, so merging
+    doesn't SELECT each row, and models without a row are inserted without
+    being merged at all.
+    """
+    if not models:
+        return models
+    try:
+        db_session = session.get_session(shared=False)
+        with db_session.begin():
+            # Holding on to the rows keeps them in the session's weakly
+            # referenced identity map, where merge finds them.
+            existing = {}
+            for model_class in set(model.__class__ for model in models):
+                ids = [model.id for model in models
+                       if model.__class__ is model_class]
+                for row in db_session.query(model_class).filter(
+                        model_class.id.in_(ids)):
+                    existing[(model_class, row.id)] = row
+            saved = []
+            for model in models:
+                if (model.__class__, model.id) in existing:
+                    model = db_session.merge(model)
+                else:
+                    db_session.add(model)
+                saved.append(model)
+        return saved
+    except sqlalchemy.exc.IntegrityError as error:
+        raise exception.DBConstraintError(
+            model_name=models[0].__class__.__name__, error=str(error.orig))
+
+
 def delete(model):
     db_session = session.get_session()
     model = db_session.merge(model)
     db_session.delete(model)
-    db_session.flush()
+    db_session.flush([model])
 
 
 def delete_all(query_func, model, **conditions):
@@ -77,7 +183,100 @@ def update(model, **values):
 
 
 def update_all(query_func, model, conditions, values):
-    query_func(model, **conditions).update(values)
+    return query_func(model, **conditions).update(values)
+
+
+def reserve_quota_usages(usage_model, reservation_model, tenant_id, deltas,
+                         hard_limits, status):
+    """Checks and reserves deltas against a tenant's usages atomically.
+
+    The usage rows are read with SELECT ... FOR UPDATE and the reservations
+    are written in the same transaction, so concurrent reservations for a
+    tenant are serialized instead of racing. Missing usage rows are created.
+    Raises QuotaExceeded, changing nothing, if any delta would go over its
+    hard limit.
+    """
+    try:
+        return _reserve_quota_usages(usage_model, reservation_model,
+                                     tenant_id, deltas, hard_limits, status)
+    except sqlalchemy.exc.IntegrityError:
+        # A concurrent first reservation created the missing usage rows;
+        # they exist now, so this attempt will lock them instead.
+        return _reserve_quota_usages(usage_model, reservation_model,
+                                     tenant_id, deltas, hard_limits, status)
+
+
+def _reserve_quota_usages(usage_model, reservation_model, tenant_id, deltas,
+                          hard_limits, status):
+    now = utils.utcnow()
+    db_session = session.get_session(shared=False)
+    with db_session.begin():
+        usages = dict((usage.resource, usage) for usage in
+                      db_session.query(usage_model)
+                      .filter_by(tenant_id=tenant_id)
+                      .filter(usage_model.resource.in_(deltas.keys()))
+                      .with_lockmode('update'))
+        for resource in deltas:
+            if resource not in usages:
+                usages[resource] = usage_model(id=utils.generate_uuid(),
+                                               tenant_id=tenant_id,
+                                               resource=resource,
+                                               in_use=0, reserved=0,
+                                               created=now)
+                db_session.add(usages[resource])
+
+        overs = [resource for resource, delta in deltas.iteritems()
+                 if (usages[resource].in_use + usages[resource].reserved +
+                     delta) > hard_limits[resource]]
+        if overs:
+            raise exception.QuotaExceeded(overs=sorted(overs))
+
+        reservations = []
+        for resource, delta in deltas.iteritems():
+            usage = usages[resource]
+            usage.reserved += delta
+            usage.updated = now
+            reservations.append(reservation_model(id=utils.generate_uuid(),
+                                                  usage_id=usage.id,
+                                                  delta=delta,
+                                                  status=status,
+                                                  created=now,
+                                                  updated=now))
+        db_session.add_all(reservations)
+    return reservations
+
+
+def settle_reservations(usage_model, reservation_model, reservations, status,
+                        apply_to_in_use):
+    """Releases reservations from their usages in one transaction.
+
+    The reserved counts are decremented in place, and moved to in_use when
+    apply_to_in_use is set, with one UPDATE per usage row; every
+    reservation's status is then changed with a single UPDATE.
+    """
+    if not reservations:
+        return
+    now = utils.utcnow()
+    deltas = {}
+    for reservation in reservations:
+        deltas[reservation.usage_id] = (deltas.get(reservation.usage_id, 0) +
+                                        reservation.delta)
+    db_session = session.get_session(shared=False)
+    with db_session.begin():
+        for usage_id, delta in deltas.iteritems():
+            values = {'reserved': usage_model.reserved - delta,
+                      'updated': now}
+            if apply_to_in_use:
+                values['in_use'] = usage_model.in_use + delta
+            db_session.query(usage_model).filter_by(id=usage_id).update(
+                values, synchronize_session=False)
+        ids = [reservation.id for reservation in reservations]
+        db_session.query(reservation_model).filter(
+            reservation_model.id.in_(ids)).update(
+                {'status': status, 'updated': now},
+                synchronize_session=False)
+    for reservation in reservations:
+        reservation.status = status
 
 
 def configure_db(options, *plugins):
@@ -98,6 +297,18 @@ def clean_db():
     session.clean_db()
 
 
+def dispose_db():
+    session.dispose_db()
+
+
+def pool_stats():
+    return session.pool_stats()
+
+
+def shared_session():
+    return session.shared_session()
+
+
 def db_sync(options, version=None, repo_path=None):
     migration.db_sync(options, version, repo_path)
 
@@ -129,7 +340,24 @@ def _query_by(cls, **conditions):
 
 def _limits(query_func, model, conditions, limit, marker, marker_column=None):
     query = query_func(model, **conditions)
+    if marker_column is None and hasattr(model, 'created'):
+        return _keyset_limits(query, model, limit, marker)
     marker_column = marker_column or model.id
     if marker:
         query = query.filter(marker_column > marker)
     return query.order_by(marker_column).limit(limit)
+
+
+def _keyset_limits(query, model, limit, marker):
+    """Pages in creation order, resuming after the marker's row.
+
+    The marker is still an id; its created time is looked up in the same
+    query, and the id breaks ties between rows created together.
+    """
+    if marker:
+        marker_created = session.get_session().query(model.created).filter(
+            model.id == marker).as_scalar()
+        query = query.filter(or_(model.created > marker_created,
+                                 and_(model.created == marker_created,
+                                      model.id > marker)))
+    return query.order_by(model.created, model.id).limit(limit)
@@ -38,6 +38,8 @@ def map(engine, models):
                Table('dns_records', meta, autoload=True))
     orm.mapper(models['agent_heartbeats'],
                Table('agent_heartbeats', meta, autoload=True))
+    orm.mapper(models['rate_limit_buckets'],
+               Table('rate_limit_buckets', meta, autoload=True))
     orm.mapper(models['quotas'],
                Table('quotas', meta, autoload=True))
     orm.mapper(models['quota_usages'],
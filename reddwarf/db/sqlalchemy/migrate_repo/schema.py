@@ -45,7 +45,7 @@ Integer = lambda: sqlalchemy.types.Integer()
 
 BigInteger = lambda: sqlalchemy.types.BigInteger()
 
-Float = lambda: sqlalchemy.types.Float()
+Float = lambda precision=None: sqlalchemy.types.Float(precision=precision)
 
 
 def create_tables(tables):
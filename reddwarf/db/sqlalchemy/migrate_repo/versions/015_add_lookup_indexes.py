@@ -0,0 +1,84 @@
+# Copyright 2013 OpenStack LLC.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.schema import Index
+from sqlalchemy.schema import MetaData
+
+from reddwarf.db.sqlalchemy.migrate_repo.schema import Table
+
+
+# (index name, table, columns, unique)
+# quota_usages already has a unique constraint on (tenant_id, resource),
+# which doubles as its lookup index.
+INDEXES = [
+    ('service_statuses_instance_id', 'service_statuses',
+     ['instance_id'], True),
+    ('agent_heartbeats_instance_id', 'agent_heartbeats',
+     ['instance_id'], True),
+    ('instances_tenant_id_deleted', 'instances',
+     ['tenant_id', 'deleted'], False),
+    ('instances_compute_instance_id', 'instances',
+     ['compute_instance_id'], False),
+    ('backups_instance_id_state', 'backups',
+     ['instance_id', 'state'], False),
+    ('reservations_usage_id', 'reservations',
+     ['usage_id'], False),
+    ('security_group_instance_associations_instance_id',
+     'security_group_instance_associations',
+     ['instance_id'], False),
+]
+
+
+def _remove_duplicates(table):
+    """Keeps only the most recently updated row for each instance_id."""
+    duplicates = select([table.c.instance_id],
+                        group_by=[table.c.instance_id],
+                        having=func.count(table.c.id) > 1).execute()
+    for (instance_id,) in duplicates.fetchall():
+        rows = select([table.c.id],
+                      table.c.instance_id == instance_id,
+                      order_by=[table.c.updated_at.desc()]).execute()
+        stale_ids = [row[0] for row in rows.fetchall()][1:]
+        table.delete(table.c.id.in_(stale_ids)).execute()
+
+
+def _indexes(meta):
+    tables = {}
+    for name, table_name, columns, unique in INDEXES:
+        if table_name not in tables:
+            tables[table_name] = Table(table_name, meta, autoload=True)
+        table = tables[table_name]
+        yield (Index(name, *[table.c[column] for column in columns],
+                     unique=unique),
+               table, unique)
+
+
+def upgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    for index, table, unique in _indexes(meta):
+        if unique:
+            _remove_duplicates(table)
+        index.create(migrate_engine)
+
+
+def downgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+
+    for index, table, unique in _indexes(meta):
+        index.drop(migrate_engine)
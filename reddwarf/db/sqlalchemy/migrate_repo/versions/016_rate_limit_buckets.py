@@ -0,0 +1,49 @@
+# Copyright 2013 OpenStack LLC.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy.schema import Column
+from sqlalchemy.schema import Index
+from sqlalchemy.schema import MetaData
+
+from reddwarf.db.sqlalchemy.migrate_repo.schema import create_tables
+from reddwarf.db.sqlalchemy.migrate_repo.schema import drop_tables
+from reddwarf.db.sqlalchemy.migrate_repo.schema import Float
+from reddwarf.db.sqlalchemy.migrate_repo.schema import Integer
+from reddwarf.db.sqlalchemy.migrate_repo.schema import String
+from reddwarf.db.sqlalchemy.migrate_repo.schema import Table
+
+
+meta = MetaData()
+
+# Times are seconds since the epoch, so they need double precision.
+rate_limit_buckets = Table(
+    'rate_limit_buckets',
+    meta,
+    Column('id', String(255), primary_key=True, nullable=False),
+    Column('water_level', Float(53), nullable=False),
+    Column('last_request', Float(53)),
+    Column('next_request', Float(53)),
+    Column('expires_at', Float(53), nullable=False),
+    Column('version', Integer(), nullable=False),
+    Index('rate_limit_buckets_expires_at', 'expires_at'))
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+    create_tables([rate_limit_buckets])
+
+
+def downgrade(migrate_engine):
+    meta.bind = migrate_engine
+    drop_tables([rate_limit_buckets])
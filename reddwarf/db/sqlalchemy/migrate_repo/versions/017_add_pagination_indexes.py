@@ -0,0 +1,66 @@
+# Copyright 2013 OpenStack LLC.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from sqlalchemy.schema import Index
+from sqlalchemy.schema import MetaData
+
+from reddwarf.db.sqlalchemy.migrate_repo.schema import Table
+
+
+# (index name, table, columns)
+# Listings filter on the leading columns and page in (created, id) order.
+INDEXES = [
+    ('instances_tenant_id_deleted_created', 'instances',
+     ['tenant_id', 'deleted', 'created', 'id']),
+    ('instances_deleted_created', 'instances',
+     ['deleted', 'created', 'id']),
+    ('backups_tenant_id_deleted_created', 'backups',
+     ['tenant_id', 'deleted', 'created', 'id']),
+    ('backups_instance_id_deleted_created', 'backups',
+     ['instance_id', 'deleted', 'created', 'id']),
+    ('security_groups_tenant_id_deleted_created', 'security_groups',
+     ['tenant_id', 'deleted', 'created', 'id']),
+]
+
+# Covered by instances_tenant_id_deleted_created.
+REPLACED_INDEX = ('instances_tenant_id_deleted', 'instances',
+                  ['tenant_id', 'deleted'])
+
+
+def _index(meta, tables, name, table_name, columns):
+    if table_name not in tables:
+        tables[table_name] = Table(table_name, meta, autoload=True)
+    table = tables[table_name]
+    return Index(name, *[table.c[column] for column in columns])
+
+
+def upgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+    tables = {}
+
+    for name, table_name, columns in INDEXES:
+        _index(meta, tables, name, table_name, columns).create(
+            migrate_engine)
+    _index(meta, tables, *REPLACED_INDEX).drop(migrate_engine)
+
+
+def downgrade(migrate_engine):
+    meta = MetaData()
+    meta.bind = migrate_engine
+    tables = {}
+
+    _index(meta, tables, *REPLACED_INDEX).create(migrate_engine)
+    for name, table_name, columns in INDEXES:
+        _index(meta, tables, name, table_name, columns).drop(migrate_engine)
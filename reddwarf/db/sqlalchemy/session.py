@@ -16,9 +16,18 @@
 #    under the License.
 
 import contextlib
+import time
+
+from eventlet import corolocal
+from eventlet.green import threading as green_threading
 from sqlalchemy import create_engine
+from sqlalchemy import event
+from sqlalchemy import exc
 from sqlalchemy import MetaData
+from sqlalchemy import pool
+from sqlalchemy.engine import url as sql_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.util import queue as sql_queue
 
 from reddwarf.common import cfg
 from reddwarf.openstack.common import log as logging
@@ -27,6 +36,7 @@ from reddwarf.db.sqlalchemy import mappers
 
 _ENGINE = None
 _MAKER = None
+_LOCAL = corolocal.local()
 
 
 LOG = logging.getLogger(__name__)
@@ -45,6 +55,7 @@ def configure_db(options, models_mapper=None):
         from reddwarf.dns import models as dns_models
         from reddwarf.extensions.mysql import models as mysql_models
         from reddwarf.guestagent import models as agent_models
+        from reddwarf.limits import models as limits_models
         from reddwarf.quota import models as quota_models
         from reddwarf.backup import models as backup_models
         from reddwarf.extensions.security_group import models as secgrp_models
@@ -54,6 +65,7 @@ def configure_db(options, models_mapper=None):
             dns_models,
             mysql_models,
             agent_models,
+            limits_models,
             quota_models,
             backup_models,
             secgrp_models,
@@ -70,12 +82,112 @@ def _create_engine(options):
         "pool_recycle": CONF.sql_idle_timeout,
         "echo": CONF.sql_query_log
     }
+    if not sql_url.make_url(options['sql_connection']).drivername.startswith(
+            'sqlite'):
+        # SQLite file databases use a NullPool, which takes no sizing.
+        engine_args.update({
+            "poolclass": MeteredQueuePool,
+            "pool_size": CONF.sql_pool_size,
+            "max_overflow": CONF.sql_max_overflow,
+            "pool_timeout": CONF.sql_pool_timeout,
+        })
     LOG.info(_("Creating SQLAlchemy engine with args: %s") % engine_args)
-    return create_engine(options['sql_connection'], **engine_args)
+    engine = create_engine(options['sql_connection'], **engine_args)
+    if CONF.sql_pool_ping:
+        event.listen(engine, 'checkout',
+                     PingConnection(engine.dialect).checkout)
+    return engine
+
+
+class PingConnection(object):
+    """
+    A connection pool checkout listener that ensures live connections are
+    returned from the connection pool at checkout, for any database the
+    dialect can recognize a disconnect from.
+    """
+
+    def __init__(self, dialect):
+        self.dialect = dialect
+
+    def checkout(self, dbapi_con, con_record, con_proxy):
+        """Event triggered when a connection is checked out from the pool"""
+        cursor = dbapi_con.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except self.dialect.dbapi.Error as error:
+            if self.dialect.is_disconnect(error, dbapi_con, cursor):
+                raise exc.DisconnectionError()
+            raise
+        finally:
+            cursor.close()
+
+
+class _GreenQueue(sql_queue.Queue):
+    """A connection queue that blocks only the waiting greenthread.
+
+    The API only monkey patches sockets, so the default queue would block
+    the whole process, and the greenthreads that could return a connection,
+    while a checkout waits.
+    """
+
+    def __init__(self, maxsize=0):
+        sql_queue.Queue.__init__(self, maxsize)
+        self.mutex = green_threading.RLock()
+        self.not_empty = green_threading.Condition(self.mutex)
+        self.not_full = green_threading.Condition(self.mutex)
+
+
+class MeteredQueuePool(pool.QueuePool):
+    """A QueuePool that records how long checkouts wait for a connection."""
+
+    def __init__(self, creator, pool_size=5, **kw):
+        pool.QueuePool.__init__(self, creator, pool_size=pool_size, **kw)
+        self._pool = _GreenQueue(pool_size)
+        self.checkouts = 0
+        self.checkout_wait = 0.0
+        self.checkout_wait_max = 0.0
 
+    def _do_get(self):
+        start = time.time()
+        try:
+            return pool.QueuePool._do_get(self)
+        finally:
+            wait = time.time() - start
+            self.checkouts += 1
+            self.checkout_wait += wait
+            self.checkout_wait_max = max(self.checkout_wait_max, wait)
+            if wait > 1:
+                LOG.warn(_("Waited %(wait).1fs for a database connection "
+                           "with %(in_use)d in use.") %
+                         {'wait': wait, 'in_use': self.checkedout()})
 
-def get_session(autocommit=True, expire_on_commit=False):
-    """Helper method to grab session."""
+    def stats(self):
+        return {
+            'pool_size': self.size(),
+            'in_use': self.checkedout(),
+            'overflow': max(self.overflow(), 0),
+            'checkouts': self.checkouts,
+            'checkout_wait': self.checkout_wait,
+            'checkout_wait_max': self.checkout_wait_max,
+        }
+
+
+def get_session(autocommit=True, expire_on_commit=False, shared=True):
+    """Helper method to grab session.
+
+    Inside shared_session, the greenthread's shared session is returned
+    unless shared is False. Transactions should use a session of their own,
+    since committing flushes every change the session holds.
+    """
+    if shared and getattr(_LOCAL, 'depth', 0):
+        if _LOCAL.session is None:
+            _LOCAL.session = _make_session(autocommit, expire_on_commit,
+                                           autoflush=False)
+        return _LOCAL.session
+    return _make_session(autocommit, expire_on_commit)
+
+
+def _make_session(autocommit, expire_on_commit, **kwargs):
     global _MAKER, _ENGINE
     if not _MAKER:
         if not _ENGINE:
@@ -85,13 +197,49 @@ def get_session(autocommit=True, expire_on_commit=False):
         _MAKER = sessionmaker(bind=_ENGINE,
                               autocommit=autocommit,
                               expire_on_commit=expire_on_commit)
-    return _MAKER()
+    return _MAKER(**kwargs)
+
+
+@contextlib.contextmanager
+def shared_session():
+    """Shares one session among the db calls of this greenthread inside it.
+
+    Models loaded inside are kept in the session, so saving them merges
+    without reading them again, and reading them again returns the models
+    already held, unsaved changes and all. Writes still flush as they are
+    made, so other services see them right away. A save flushes only the
+    model saved, and the shared session doesn't autoflush, so models
+    changed in memory are never written unless they are saved.
+    """
+    _LOCAL.depth = getattr(_LOCAL, 'depth', 0) + 1
+    if _LOCAL.depth == 1:
+        _LOCAL.session = None
+    try:
+        yield
+    finally:
+        _LOCAL.depth -= 1
+        if not _LOCAL.depth and _LOCAL.session is not None:
+            _LOCAL.session.close()
+            _LOCAL.session = None
 
 
 def raw_query(model, autocommit=True, expire_on_commit=False):
     return get_session(autocommit, expire_on_commit).query(model)
 
 
+def pool_stats():
+    """Returns the connection pool's usage and checkout wait times."""
+    if _ENGINE and isinstance(_ENGINE.pool, MeteredQueuePool):
+        return _ENGINE.pool.stats()
+    return {}
+
+
+def dispose_db():
+    """Drops pooled connections, such as those inherited across a fork."""
+    if _ENGINE:
+        _ENGINE.dispose()
+
+
 def clean_db():
     global _ENGINE
     meta = MetaData()
@@ -35,14 +35,22 @@ class DnsManager(object):
                  *args, **kwargs):
         if not dns_driver:
             dns_driver = CONF.dns_driver
-        dns_driver = utils.import_object(dns_driver)
-        self.driver = dns_driver()
+        self.driver_class = utils.import_class(dns_driver)
+        self._driver = None
 
         if not dns_instance_entry_factory:
             dns_instance_entry_factory = CONF.dns_instance_entry_factory
-        entry_factory = utils.import_object(dns_instance_entry_factory)
+        entry_factory = utils.import_class(dns_instance_entry_factory)
         self.entry_factory = entry_factory()
 
+    @property
+    def driver(self):
+        # Drivers may authenticate against a remote service when they're
+        # built, so wait until an entry actually has to be changed.
+        if self._driver is None:
+            self._driver = self.driver_class()
+        return self._driver
+
     def create_instance_entry(self, instance_id, content):
         """Connects a new instance with a DNS entry.
 
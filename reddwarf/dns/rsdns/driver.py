@@ -108,6 +108,9 @@ class RsDnsDriver(object):
     """Uses RS DNSaaS"""
 
     def __init__(self, raise_if_zone_missing=True):
+        # The client re-authenticates and retries once whenever a request
+        # comes back with a 401, so the token obtained here can be kept for
+        # the life of the driver.
         self.dns_client = create_client_with_flag_values()
         self.dns_client.authenticate()
         self.default_dns_zone = RsDnsZone(id=DNS_DOMAIN_ID,
@@ -23,6 +23,8 @@ from reddwarf.openstack.common import log as logging
 
 from reddwarf import db
 
+from reddwarf.backup.models import Backup
+from reddwarf.common import cfg
 from reddwarf.common import exception
 from reddwarf.common import utils
 from reddwarf.instance.models import DBInstance
@@ -34,6 +36,7 @@ from reddwarf.common.remote import create_nova_client
 from novaclient import exceptions as nova_exceptions
 
 
+CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
 
@@ -66,35 +69,44 @@ class DetailedHost(object):
         for instance in self.instances:
             instance['server_id'] = instance['uuid']
             del instance['uuid']
-            try:
-                db_info = DBInstance.find_by(
-                    compute_instance_id=instance['server_id'])
-                instance['id'] = db_info.id
-                instance['tenant_id'] = db_info.tenant_id
-                status = InstanceServiceStatus.find_by(
-                    instance_id=db_info.id)
-                instance_info = SimpleInstance(None, db_info, status)
-                instance['status'] = instance_info.status
-            except exception.ReddwarfError as re:
-                LOG.error(re)
+        # Every instance of the host, and its status, is read at once.
+        found = DBInstance.find_all_joined_in(
+            InstanceServiceStatus, ('id', 'instance_id'),
+            'compute_instance_id',
+            [instance['server_id'] for instance in self.instances])
+        by_server_id = dict((db_info.compute_instance_id, (db_info, status))
+                            for db_info, status in found)
+        running = Backup.running_instance_ids(
+            [db_info.id for db_info, status in found])
+        for instance in self.instances:
+            if instance['server_id'] not in by_server_id:
                 LOG.error("Compute Instance ID found with no associated RD "
                           "instance: %s" % instance['server_id'])
                 instance['id'] = None
+                continue
+            db_info, status = by_server_id[instance['server_id']]
+            instance['id'] = db_info.id
+            instance['tenant_id'] = db_info.tenant_id
+            instance_info = SimpleInstance(None, db_info, status)
+            instance_info.backup_running = db_info.id in running
+            instance['status'] = instance_info.status
 
     def update_all(self, context):
         num_i = len(self.instances)
         LOG.debug("Host %s has %s instances to update" % (self.name, num_i))
-        failed_instances = []
-        for instance in self.instances:
-            client = create_guest_client(context, instance['id'])
-            try:
-                client.update_guest()
-            except exception.ReddwarfError as re:
-                LOG.error(re)
-                LOG.error("Unable to update instance: %s" % instance['id'])
-                failed_instances.append(instance['id'])
-        if len(failed_instances) > 0:
-            msg = "Failed to update instances: %s" % failed_instances
+
+        def update_guest(instance):
+            create_guest_client(context, instance['id']).update_guest()
+
+        results, failures = utils.fan_out(
+            update_guest, self.instances, CONF.host_update_concurrency,
+            timeout=CONF.host_update_guest_timeout,
+            key=lambda instance: instance['id'])
+        for instance_id, error in failures.iteritems():
+            LOG.error(error)
+            LOG.error("Unable to update instance: %s" % instance_id)
+        if failures:
+            msg = "Failed to update instances: %s" % sorted(failures)
             raise exception.UpdateGuestError(msg)
 
     @staticmethod
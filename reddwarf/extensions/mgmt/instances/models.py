@@ -14,6 +14,8 @@
 
 from reddwarf.openstack.common import log as logging
 
+from reddwarf.common import cfg
+from reddwarf.common import pagination
 from reddwarf.common.remote import create_nova_client
 from reddwarf.common.remote import create_nova_volume_client
 from reddwarf.instance import models as imodels
@@ -23,9 +25,11 @@ from reddwarf.extensions.mysql import models as mysql_models
 
 
 LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
 
 
 def load_mgmt_instances(context, deleted=None):
+    """Loads a page of instances, and returns it with the next marker."""
     client = create_nova_client(context)
     mgmt_servers = client.rdservers.list()
     db_infos = None
@@ -33,11 +37,15 @@ def load_mgmt_instances(context, deleted=None):
         db_infos = instance_models.DBInstance.find_all(deleted=deleted)
     else:
         db_infos = instance_models.DBInstance.find_all()
+    limit = pagination.page_limit(context.limit, CONF.instances_page_size)
+    data_view = instance_models.DBInstance.find_by_pagination(
+        'instances', db_infos, 'instances', limit=limit,
+        marker=context.marker)
     instances = MgmtInstances.load_status_from_existing(
         context,
-        db_infos,
+        data_view.collection,
         mgmt_servers)
-    return instances
+    return instances, data_view.next_page_marker
 
 
 def load_mgmt_instance(cls, context, id):
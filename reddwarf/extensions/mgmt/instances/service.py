@@ -19,6 +19,7 @@
 from novaclient import exceptions as nova_exceptions
 
 from reddwarf.common import exception
+from reddwarf.common import pagination
 from reddwarf.common import wsgi
 from reddwarf.common.auth import admin_context
 from reddwarf.instance import models as instance_models
@@ -51,13 +52,16 @@ class MgmtInstanceController(InstanceController):
         elif deleted_q in ['false']:
             deleted = False
         try:
-            instances = models.load_mgmt_instances(context, deleted=deleted)
+            instances, marker = models.load_mgmt_instances(context,
+                                                           deleted=deleted)
         except nova_exceptions.ClientException, e:
             LOG.error(e)
             return wsgi.Result(str(e), 403)
 
-        view_cls = views.MgmtInstancesView
-        return wsgi.Result(view_cls(instances, req=req).data(), 200)
+        view = views.MgmtInstancesView(instances, req=req)
+        paged = pagination.SimplePaginatedDataView(req.url, 'instances', view,
+                                                   marker)
+        return wsgi.Result(paged.data(), 200)
 
     @admin_context
     def show(self, req, tenant_id, id):
@@ -19,6 +19,8 @@
 Model classes that extend the instances functionality for MySQL instances.
 """
 
+import time
+
 from reddwarf.common import cfg
 from reddwarf.common import exception
 from reddwarf.common import utils
@@ -37,14 +39,31 @@ def persisted_models():
     return {'root_enabled_history': RootHistory}
 
 
+# Instances recently seen with MySQL running, keyed by tenant and id.
+_verified_instances = {}
+
+
 def load_and_verify(context, instance_id):
     # Load InstanceServiceStatus to verify if its running
-    instance = base_models.Instance.load(context, instance_id)
-    if not instance.is_sql_running:
+    key = (context.tenant, context.is_admin, instance_id)
+    now = time.time()
+    expires = _verified_instances.get(key)
+    if expires is not None and expires > now:
+        return
+    db_info, service_status = base_models.load_db_info_and_service_status(
+        context, instance_id)
+    if service_status.status not in base_models.MYSQL_RESPONSIVE_STATUSES:
+        _verified_instances.pop(key, None)
         raise exception.UnprocessableEntity(
-            "Instance %s is not ready." % instance.id)
-    else:
-        return instance
+            "Instance %s is not ready." % instance_id)
+    if CONF.instance_ready_cache_ttl > 0:
+        if len(_verified_instances) >= CONF.instance_ready_cache_size:
+            for stale in [k for k, expiry in _verified_instances.items()
+                          if expiry <= now]:
+                del _verified_instances[stale]
+            if len(_verified_instances) >= CONF.instance_ready_cache_size:
+                _verified_instances.clear()
+        _verified_instances[key] = now + CONF.instance_ready_cache_ttl
 
 
 class User(object):
@@ -76,6 +95,18 @@ class User(object):
         # Load InstanceServiceStatus to verify if it's running
         load_and_verify(context, instance_id)
         client = create_guest_client(context, instance_id)
+        try:
+            results = client.create_users(users)
+        except exception.GuestMethodNotFound:
+            return cls._create_one_by_one(client, users)
+        for result in results:
+            if result['exists']:
+                raise exception.UserAlreadyExists(name=result['_name'],
+                                                  host=result['_host'])
+
+    @classmethod
+    def _create_one_by_one(cls, client, users):
+        # Agents without create_users are asked about each user in turn.
         for user in users:
             user_name = user['_name']
             host_name = user['_host']
@@ -181,8 +212,7 @@ class RootHistory(object):
         self.created = utils.utcnow()
 
     def save(self):
-        LOG.debug(_("Saving %s: %s") % (self.__class__.__name__,
-                                        self.__dict__))
+        LOG.debug(_("Saving %s: %s"), self.__class__.__name__, self.__dict__)
         return get_db_api().save(self)
 
     @classmethod
@@ -256,6 +286,17 @@ class Schema(object):
     def create(cls, context, instance_id, schemas):
         load_and_verify(context, instance_id)
         client = create_guest_client(context, instance_id)
+        try:
+            results = client.create_databases(schemas)
+        except exception.GuestMethodNotFound:
+            return cls._create_one_by_one(client, schemas)
+        for result in results:
+            if result['exists']:
+                raise exception.DatabaseAlreadyExists(name=result['_name'])
+
+    @classmethod
+    def _create_one_by_one(cls, client, schemas):
+        # Agents without create_databases are asked about each in turn.
         for schema in schemas:
             schema_name = schema['_name']
             existing_schema, _nadda = Schemas.load_with_client(
@@ -19,9 +19,12 @@
 """
 Model classes for Security Groups and Security Group Rules on instances.
 """
+import sys
+
 import reddwarf.common.remote
 from reddwarf.common import cfg
 from reddwarf.common import exception
+from reddwarf.common import utils
 from reddwarf.db.models import DatabaseModelBase
 from reddwarf.common.models import NovaRemoteModelBase
 from reddwarf.openstack.common import log as logging
@@ -102,11 +105,7 @@ class SecurityGroup(DatabaseModelBase):
 
     def delete(self, context):
         try:
-            sec_group_rules = self.get_rules()
-            if sec_group_rules:
-                for rule in sec_group_rules:
-                    rule.delete(context)
-
+            SecurityGroupRule.delete_all(self.get_rules(), context)
             RemoteSecurityGroup.delete(self.id, context)
             super(SecurityGroup, self).delete()
 
@@ -174,6 +173,41 @@ class SecurityGroupRule(DatabaseModelBase):
             raise exception.SecurityGroupRuleDeletionError(
                 "Failed to delete Security Group")
 
+    @classmethod
+    def delete_all(cls, rules, context):
+        """Deletes rules, marking them deleted in the db in one transaction.
+
+        Rules deleted remotely before a failure are still marked deleted.
+        """
+        deleted = []
+        try:
+            for rule in rules:
+                RemoteSecurityGroup.delete_rule(rule.id, context)
+                deleted.append(rule)
+        except Exception:
+            exc_info = sys.exc_info()
+            # Failing to mark the rules deleted must not hide the error
+            # that stopped deleting them.
+            try:
+                cls._mark_deleted(deleted)
+            except Exception:
+                LOG.exception('Failed to mark security group rules deleted')
+            if isinstance(exc_info[1], exception.ReddwarfError):
+                LOG.error('Failed to delete security group',
+                          exc_info=exc_info)
+                raise exception.SecurityGroupRuleDeletionError(
+                    "Failed to delete Security Group")
+            raise exc_info[0], exc_info[1], exc_info[2]
+        cls._mark_deleted(deleted)
+
+    @classmethod
+    def _mark_deleted(cls, rules):
+        now = utils.utcnow()
+        for rule in rules:
+            rule.deleted = True
+            rule.deleted_at = now
+        cls.save_all(rules)
+
 
 class SecurityGroupInstanceAssociation(DatabaseModelBase):
     _data_fields = ['id', 'security_group_id', 'instance_id',
@@ -18,6 +18,7 @@
 
 
 from reddwarf.common import exception
+from reddwarf.common import pagination
 from reddwarf.common import wsgi
 from reddwarf.common import cfg
 from reddwarf.extensions.security_group import models
@@ -36,16 +37,23 @@ class SecurityGroupController(wsgi.Controller):
         """Return all security groups tied to a particular tenant_id."""
         LOG.debug("Index() called with %s" % (tenant_id))
 
+        context = req.environ[wsgi.CONTEXT_KEY]
         sec_groups = models.SecurityGroup().find_all(tenant_id=tenant_id,
                                                      deleted=False)
+        limit = pagination.page_limit(context.limit,
+                                      CONF.security_groups_page_size)
+        data_view = models.SecurityGroup.find_by_pagination(
+            'security_groups', sec_groups, req.url, limit=limit,
+            marker=context.marker)
+        sec_groups = data_view.collection
 
         # Construct the mapping from Security Groups to Security Group Rules
         rules_map = dict([(g.id, g.get_rules()) for g in sec_groups])
 
-        return wsgi.Result(
-            views.SecurityGroupsView(sec_groups,
-                                     rules_map,
-                                     req, tenant_id).list(), 200)
+        view = views.SecurityGroupsView(sec_groups, rules_map, req, tenant_id)
+        paged = pagination.SimplePaginatedDataView(
+            req.url, 'security_groups', view, data_view.next_page_marker)
+        return wsgi.Result(paged.data(), 200)
 
     def show(self, req, tenant_id, id):
         """Return a single security group."""
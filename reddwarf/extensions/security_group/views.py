@@ -100,6 +100,9 @@ class SecurityGroupsView(object):
 
         return {"security_groups": groups_data}
 
+    def data(self):
+        return self.list()
+
 
 class SecurityGroupRulesView(object):
 
@@ -19,6 +19,8 @@
 Handles all request to the Platform or Guest VM
 """
 
+import time
+
 from eventlet import Timeout
 
 from reddwarf.common import cfg
@@ -27,6 +29,7 @@ from reddwarf.common import utils
 from reddwarf.guestagent import models as agent_models
 from reddwarf.openstack.common import log as logging
 from reddwarf.openstack.common import rpc
+from reddwarf.openstack.common.rpc import common as rpc_common
 from reddwarf.openstack.common.rpc import proxy
 from reddwarf.openstack.common.gettextutils import _
 
@@ -36,6 +39,20 @@ AGENT_LOW_TIMEOUT = CONF.agent_call_low_timeout
 AGENT_HIGH_TIMEOUT = CONF.agent_call_high_timeout
 RPC_API_VERSION = "1.0"
 
+# The heartbeats read to check agents, with the time each was read, by
+# instance id, oldest read first.
+_HEARTBEATS = utils.LRUDict()
+
+
+def _evict_heartbeats(now):
+    """Drops expired heartbeats, and the oldest beyond the cache size."""
+    while _HEARTBEATS:
+        instance_id, (read_at, agent) = _HEARTBEATS.oldest()
+        if (len(_HEARTBEATS) <= CONF.agent_heartbeat_cache_size and
+                now - read_at < CONF.agent_heartbeat_cache_time):
+            break
+        del _HEARTBEATS[instance_id]
+
 
 class API(proxy.RpcProxy):
     """API for interacting with the guest manager."""
@@ -48,6 +65,7 @@ class API(proxy.RpcProxy):
 
     def _call(self, method_name, timeout_sec, **kwargs):
         LOG.debug("Calling %s with timeout %s" % (method_name, timeout_sec))
+        self._check_for_hearbeat()
         try:
             result = self.call(self.context,
                                self.make_msg(method_name, **kwargs),
@@ -55,6 +73,13 @@ class API(proxy.RpcProxy):
 
             LOG.debug("Result is %s" % result)
             return result
+        except rpc_common.RemoteError as e:
+            LOG.error(e)
+            # Agents that predate a method fail to dispatch it.
+            if (e.exc_type == 'AttributeError' and
+                    'No such RPC function' in str(e.value)):
+                raise exception.GuestMethodNotFound(method=method_name)
+            raise exception.GuestError(original_message=str(e))
         except Exception as e:
             LOG.error(e)
             raise exception.GuestError(original_message=str(e))
@@ -98,15 +123,33 @@ class API(proxy.RpcProxy):
         return "guestagent.%s" % self.id
 
     def _check_for_hearbeat(self):
-        """Preemptively raise GuestTimeout if heartbeat is old."""
-        try:
-            agent = agent_models.AgentHeartBeat.find_by(instance_id=self.id)
-            if agent_models.AgentHeartBeat.is_active(agent):
-                return True
-        except exception.ModelNotFoundError as mnfe:
-            LOG.warn(mnfe)
+        """Preemptively raise GuestTimeout if heartbeat is old.
+
+        The heartbeat is read at most once every agent_heartbeat_cache_time
+        seconds for each agent, so calls to a dead agent fail without
+        waiting on it or on the database.
+        """
+        agent = self._load_heartbeat()
+        if agent is not None and agent_models.AgentHeartBeat.is_active(agent):
+            return True
+        LOG.warn(_("Guest agent of instance %s has no recent heartbeat."),
+                 self.id)
         raise exception.GuestTimeout()
 
+    def _load_heartbeat(self):
+        read_at, agent = _HEARTBEATS.get(self.id, (None, None))
+        now = time.time()
+        if read_at is None or now - read_at >= CONF.agent_heartbeat_cache_time:
+            try:
+                agent = agent_models.AgentHeartBeat.find_by(
+                    instance_id=self.id)
+            except exception.ModelNotFoundError as mnfe:
+                LOG.warn(mnfe)
+                agent = None
+            _HEARTBEATS[self.id] = (now, agent)
+            _evict_heartbeats(now)
+        return agent
+
     def change_passwords(self, users):
         """Make an asynchronous call to change the passwords of one or more
            users."""
@@ -118,6 +161,12 @@ class API(proxy.RpcProxy):
         LOG.debug(_("Creating Users for Instance %s"), self.id)
         self._cast("create_user", users=users)
 
+    def create_users(self, users):
+        """Make a synchronous call to create new database users, unless
+           any of them already exists."""
+        LOG.debug(_("Creating Users for Instance %s"), self.id)
+        return self._call("create_users", AGENT_HIGH_TIMEOUT, users=users)
+
     def get_user(self, username, hostname):
         """Make an asynchronous call to get a single database user."""
         LOG.debug(_("Getting a user on Instance %s"), self.id)
@@ -161,6 +210,13 @@ class API(proxy.RpcProxy):
         LOG.debug(_("Creating databases for Instance %s"), self.id)
         self._cast("create_database", databases=databases)
 
+    def create_databases(self, databases):
+        """Make a synchronous call to create new databases, unless any of
+           them already exists."""
+        LOG.debug(_("Creating databases for Instance %s"), self.id)
+        return self._call("create_databases", AGENT_HIGH_TIMEOUT,
+                          databases=databases)
+
     def list_databases(self, limit=None, marker=None, include_marker=False):
         """Make an asynchronous call to list databases"""
         LOG.debug(_("Listing databases for Instance %s"), self.id)
@@ -239,7 +295,6 @@ class API(proxy.RpcProxy):
     def get_volume_info(self):
         """Make a synchronous call to get volume info for the container"""
         LOG.debug(_("Check Volume Info on Instance %s"), self.id)
-        # self._check_for_hearbeat()
         # TODO (juice) does default fs_path need to be configurable?
         return self._call("get_filesystem_stats", AGENT_LOW_TIMEOUT,
                           fs_path="/var/lib/mysql")
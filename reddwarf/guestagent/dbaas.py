@@ -25,8 +25,10 @@ handles RPC calls relating to Platform specific operations.
 
 """
 
+import errno
 import os
 import re
+import socket
 import string
 import time
 import uuid
@@ -41,6 +43,8 @@ from sqlalchemy.sql.expression import text
 from reddwarf.common import cfg
 from reddwarf.common import exception
 from reddwarf.common import utils
+from reddwarf.common.context import ReddwarfContext
+from reddwarf.conductor import api as conductor_api
 from reddwarf.extensions.mysql.models import RootHistory
 from reddwarf.guestagent import query
 from reddwarf.guestagent.db import models
@@ -55,7 +59,6 @@ LOG = logging.getLogger(__name__)
 FLUSH = text(query.FLUSH)
 
 ENGINE = None
-MYSQLD_ARGS = None
 PREPARING = False
 UUID = False
 
@@ -122,6 +125,44 @@ def load_mysqld_options():
         return None
 
 
+def probe_mysqld(socket_path, timeout):
+    """Connects to mysqld's socket and waits for it to greet the client.
+
+    Returns True if mysqld sent its greeting (or an error packet, such as
+    too many connections, which also means it is up), and False if it
+    accepted the connection but said nothing. Raises socket.error if
+    nothing accepts connections on the socket.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        try:
+            return len(sock.recv(4)) > 0
+        except socket.timeout:
+            return False
+    finally:
+        sock.close()
+
+
+def mysqld_pid(pid_file):
+    """Returns the pid written in mysqld's pid file, or None."""
+    try:
+        with open(pid_file) as f:
+            return int(f.read().strip())
+    except (IOError, ValueError):
+        return None
+
+
+def process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        # EPERM means the process exists but belongs to another user.
+        return e.errno == errno.EPERM
+    return True
+
+
 class MySqlAppStatus(object):
     """
     Answers the question "what is the status of the MySQL application on
@@ -129,8 +170,8 @@ class MySqlAppStatus(object):
     the state of the application is determined by calling a series of
     commands.
 
-    This class also handles saving and load the status of the MySQL application
-    in the database.
+    This class also handles loading the status of the MySQL application from
+    the database, and reporting it to the conductor.
     The status is updated whenever the update() method is called, except
     if the state is changed to building or restart mode using the
      "begin_mysql_install" and "begin_mysql_restart" methods.
@@ -143,6 +184,7 @@ class MySqlAppStatus(object):
     """
 
     _instance = None
+    _reported_at = 0
 
     def __init__(self):
         if self._instance is not None:
@@ -176,34 +218,28 @@ class MySqlAppStatus(object):
         return cls._instance
 
     def _get_actual_db_status(self):
-        global MYSQLD_ARGS
+        """Probes mysqld in process, so nothing is forked every tick."""
         try:
-            out, err = utils.execute_with_timeout(
-                "/usr/bin/mysqladmin",
-                "ping", run_as_root=True)
-            LOG.info("Service Status is RUNNING.")
-            return rd_models.ServiceStatuses.RUNNING
-        except exception.ProcessExecutionError as e:
-            LOG.error("Process execution ")
-            try:
-                out, err = utils.execute_with_timeout("/bin/ps", "-C",
-                                                      "mysqld", "h")
-                pid = out.split()[0]
-                # TODO(rnirmal): Need to create new statuses for instances
-                # where the mysql service is up, but unresponsive
-                LOG.info("Service Status is BLOCKED.")
-                return rd_models.ServiceStatuses.BLOCKED
-            except exception.ProcessExecutionError as e:
-                if not MYSQLD_ARGS:
-                    MYSQLD_ARGS = load_mysqld_options()
-                pid_file = MYSQLD_ARGS.get('pid_file',
-                                           '/var/run/mysqld/mysqld.pid')
-                if os.path.exists(pid_file):
-                    LOG.info("Service Status is CRASHED.")
-                    return rd_models.ServiceStatuses.CRASHED
-                else:
-                    LOG.info("Service Status is SHUTDOWN.")
-                    return rd_models.ServiceStatuses.SHUTDOWN
+            if probe_mysqld(CONF.mysql_socket, CONF.mysql_probe_timeout):
+                LOG.debug("Service Status is RUNNING.")
+                return rd_models.ServiceStatuses.RUNNING
+            # TODO(rnirmal): Need to create new statuses for instances
+            # where the mysql service is up, but unresponsive
+            LOG.info("Service Status is BLOCKED.")
+            return rd_models.ServiceStatuses.BLOCKED
+        except socket.error as e:
+            LOG.debug("MySQL socket %s is not accepting connections: %s"
+                      % (CONF.mysql_socket, e))
+        pid = mysqld_pid(CONF.mysql_pid_file)
+        if pid is None:
+            LOG.info("Service Status is SHUTDOWN.")
+            return rd_models.ServiceStatuses.SHUTDOWN
+        elif process_exists(pid):
+            LOG.info("Service Status is BLOCKED.")
+            return rd_models.ServiceStatuses.BLOCKED
+        else:
+            LOG.info("Service Status is CRASHED.")
+            return rd_models.ServiceStatuses.CRASHED
 
     @property
     def is_mysql_installed(self):
@@ -232,21 +268,25 @@ class MySqlAppStatus(object):
         return rd_models.InstanceServiceStatus.find_by(instance_id=inst_id)
 
     def set_status(self, status):
-        """Changes the status of the MySQL app in the database."""
-        db_status = self._load_status()
-        db_status.set_status(status)
-        db_status.save()
+        """Reports the status of the MySQL app to the conductor."""
+        conductor_api.API(ReddwarfContext()).update_status(CONF.guest_id,
+                                                           status.code)
         self.status = status
+        self._reported_at = time.time()
 
     def update(self):
         """Find and report status of MySQL on this machine.
 
-        The database is update and the status is also returned.
+        The status is only reported when it changed, or when it hasn't been
+        reported for agent_status_resync_interval seconds, in case it was
+        changed by something other than the agent.
         """
         if self.is_mysql_installed and not self._is_mysql_restarting:
-            LOG.info("Determining status of MySQL app...")
+            LOG.debug("Determining status of MySQL app...")
             status = self._get_actual_db_status()
-            self.set_status(status)
+            resync_at = self._reported_at + CONF.agent_status_resync_interval
+            if status != self.status or time.time() >= resync_at:
+                self.set_status(status)
         else:
             LOG.info("MySQL is not installed or is in restart mode, so for "
                      "now we'll skip determining the status of MySQL on this "
@@ -277,15 +317,20 @@ class MySqlAppStatus(object):
 
 
 class LocalSqlClient(object):
-    """A sqlalchemy wrapper to manage transactions"""
+    """A sqlalchemy wrapper to manage transactions
+
+    A read_only client runs its queries without a transaction and never
+    flushes the privilege tables.
+    """
 
-    def __init__(self, engine, use_flush=True):
+    def __init__(self, engine, use_flush=True, read_only=False):
         self.engine = engine
-        self.use_flush = use_flush
+        self.use_flush = use_flush and not read_only
+        self.read_only = read_only
 
     def __enter__(self):
         self.conn = self.engine.connect()
-        self.trans = self.conn.begin()
+        self.trans = None if self.read_only else self.conn.begin()
         return self.conn
 
     def __exit__(self, type, value, traceback):
@@ -302,31 +347,44 @@ class LocalSqlClient(object):
         try:
             return self.conn.execute(t, kwargs)
         except:
-            self.trans.rollback()
-            self.trans = None
+            if self.trans:
+                self.trans.rollback()
+                self.trans = None
             raise
 
 
 class MySqlAdmin(object):
     """Handles administrative tasks on the MySQL database."""
 
-    def _associate_dbs(self, user):
-        """Internal. Given a MySQLUser, populate its databases attribute."""
-        LOG.debug("Associating dbs to user %s at %s" % (user.name, user.host))
-        with LocalSqlClient(get_engine()) as client:
-            q = query.Query()
-            q.columns = ["grantee", "table_schema"]
-            q.tables = ["information_schema.SCHEMA_PRIVILEGES"]
-            q.group = ["grantee", "table_schema"]
-            q.where = ["privilege_type != 'USAGE'"]
-            t = text(str(q))
-            db_result = client.execute(t)
-            for db in db_result:
-                LOG.debug("\t db: %s" % db)
-                if db['grantee'] == "'%s'@'%s'" % (user.name, user.host):
-                    mysql_db = models.MySQLDatabase()
-                    mysql_db.name = db['table_schema']
-                    user.databases.append(mysql_db.serialize())
+    def _associate_dbs(self, client, *users):
+        """Internal. Given MySQLUsers, populate their databases attributes.
+
+        The grants of all the users are read with a single query on the
+        client's connection.
+        """
+        grantees = dict(("'%s'@'%s'" % (user.name, user.host), user)
+                        for user in users)
+        if not grantees:
+            return
+        LOG.debug("Associating dbs to users %s" % grantees.keys())
+        params = dict(('grantee%d' % index, grantee)
+                      for index, grantee in enumerate(grantees))
+        q = query.Query()
+        q.columns = ["grantee", "table_schema"]
+        q.tables = ["information_schema.SCHEMA_PRIVILEGES"]
+        q.group = ["grantee", "table_schema"]
+        q.where = ["privilege_type != 'USAGE'",
+                   "grantee IN (%s)" % ", ".join(":%s" % name
+                                                 for name in sorted(params))]
+        t = text(str(q))
+        db_result = client.execute(t, **params)
+        for db in db_result:
+            LOG.debug("\t db: %s" % db)
+            user = grantees.get(db['grantee'])
+            if user is not None:
+                mysql_db = models.MySQLDatabase()
+                mysql_db.name = db['table_schema']
+                user.databases.append(mysql_db.serialize())
 
     def change_passwords(self, users):
         """Change the passwords of one or more existing users."""
@@ -349,15 +407,47 @@ class MySqlAdmin(object):
 
     def create_database(self, databases):
         """Create the list of specified databases"""
-        with LocalSqlClient(get_engine()) as client:
+        with LocalSqlClient(get_engine(), use_flush=False) as client:
             for item in databases:
-                mydb = models.MySQLDatabase()
-                mydb.deserialize(item)
-                cd = query.CreateDatabase(mydb.name,
-                                          mydb.character_set,
-                                          mydb.collate)
-                t = text(str(cd))
-                client.execute(t)
+                self._create_database(client, item)
+
+    def _create_database(self, client, item):
+        mydb = models.MySQLDatabase()
+        mydb.deserialize(item)
+        cd = query.CreateDatabase(mydb.name,
+                                  mydb.character_set,
+                                  mydb.collate)
+        t = text(str(cd))
+        client.execute(t)
+
+    def create_databases(self, databases):
+        """Create the databases unless any of them already exists.
+
+        Existing databases are found with one query, and either all of
+        the databases are created or none are. Returns a result for each
+        database saying whether it already existed.
+        """
+        names = [item['_name'] for item in databases]
+        with LocalSqlClient(get_engine(), use_flush=False) as client:
+            existing = self._existing_databases(client, names)
+            if not existing:
+                for item in databases:
+                    self._create_database(client, item)
+        return [{'_name': name, 'exists': name in existing}
+                for name in names]
+
+    def _existing_databases(self, client, names):
+        if not names:
+            return set()
+        params = dict(('name%d' % index, name)
+                      for index, name in enumerate(names))
+        q = query.Query()
+        q.columns = ['schema_name as name']
+        q.tables = ['information_schema.schemata']
+        q.where = ["schema_name IN (%s)" % ", ".join(
+            ":%s" % key for key in sorted(params))]
+        t = text(str(q))
+        return set(row['name'] for row in client.execute(t, **params))
 
     def create_user(self, users):
         """Create users and grant them privileges for the
@@ -366,24 +456,65 @@ class MySqlAdmin(object):
             for item in users:
                 user = models.MySQLUser()
                 user.deserialize(item)
-                # TODO(cp16net):Should users be allowed to create users
-                # 'os_admin' or 'debian-sys-maint'
-                g = query.Grant(user=user.name, host=user.host,
-                                clear=user.password)
-                t = text(str(g))
-                client.execute(t)
-                for database in user.databases:
-                    mydb = models.MySQLDatabase()
-                    mydb.deserialize(database)
-                    g = query.Grant(permissions='ALL', database=mydb.name,
-                                    user=user.name, host=user.host,
-                                    clear=user.password)
-                    t = text(str(g))
-                    client.execute(t)
+                self._create_user(client, user)
+
+    def _create_user(self, client, user):
+        # TODO(cp16net):Should users be allowed to create users
+        # 'os_admin' or 'debian-sys-maint'
+        g = query.Grant(user=user.name, host=user.host,
+                        clear=user.password)
+        t = text(str(g))
+        client.execute(t)
+        for database in user.databases:
+            mydb = models.MySQLDatabase()
+            mydb.deserialize(database)
+            g = query.Grant(permissions='ALL', database=mydb.name,
+                            user=user.name, host=user.host,
+                            clear=user.password)
+            t = text(str(g))
+            client.execute(t)
+
+    def create_users(self, users):
+        """Create the users unless any of them already exists.
+
+        Existing users are found with one query, and either all of the
+        users are created or none are. Returns a result for each user
+        saying whether it already existed.
+        """
+        userhosts = [(item['_name'], item.get('_host') or '%')
+                     for item in users]
+        with LocalSqlClient(get_engine()) as client:
+            existing = self._existing_users(client, userhosts)
+            if not existing:
+                for item in users:
+                    user = models.MySQLUser()
+                    user.deserialize(item)
+                    self._create_user(client, user)
+        return [{'_name': name, '_host': host,
+                 'exists': (name, host) in existing}
+                for name, host in userhosts]
+
+    def _existing_users(self, client, userhosts):
+        if not userhosts:
+            return set()
+        params = {}
+        matches = []
+        for index, (name, host) in enumerate(userhosts):
+            params['user%d' % index] = name
+            params['host%d' % index] = host
+            matches.append("(User = :user%d AND Host = :host%d)"
+                           % (index, index))
+        q = query.Query()
+        q.columns = ['User', 'Host']
+        q.tables = ['mysql.user']
+        q.where = ["(%s)" % " OR ".join(matches)]
+        t = text(str(q))
+        return set((row['User'], row['Host'])
+                   for row in client.execute(t, **params))
 
     def delete_database(self, database):
         """Delete the specified database"""
-        with LocalSqlClient(get_engine()) as client:
+        with LocalSqlClient(get_engine(), use_flush=False) as client:
             mydb = models.MySQLDatabase()
             mydb.deserialize(database)
             dd = query.DropDatabase(mydb.name)
@@ -413,7 +544,7 @@ class MySqlAdmin(object):
         except exceptions.ValueError as ve:
             raise exception.BadRequest("Username %s is not valid: %s"
                                        % (username, ve.message))
-        with LocalSqlClient(get_engine()) as client:
+        with LocalSqlClient(get_engine(), read_only=True) as client:
             q = query.Query()
             q.columns = ['User', 'Host', 'Password']
             q.tables = ['mysql.user']
@@ -430,7 +561,7 @@ class MySqlAdmin(object):
             found_user = result[0]
             user.password = found_user['Password']
             user.host = found_user['Host']
-            self._associate_dbs(user)
+            self._associate_dbs(client, user)
             return user
 
     def grant_access(self, username, hostname, databases):
@@ -460,7 +591,7 @@ class MySqlAdmin(object):
         """List databases the user created on this mysql instance"""
         LOG.debug(_("---Listing Databases---"))
         databases = []
-        with LocalSqlClient(get_engine()) as client:
+        with LocalSqlClient(get_engine(), read_only=True) as client:
             # If you have an external volume mounted at /var/lib/mysql
             # the lost+found directory will show up in mysql as a database
             # which will create errors if you try to do any database ops
@@ -524,7 +655,7 @@ class MySqlAdmin(object):
         '''
         LOG.debug(_("---Listing Users---"))
         users = []
-        with LocalSqlClient(get_engine()) as client:
+        with LocalSqlClient(get_engine(), read_only=True) as client:
             mysql_user = models.MySQLUser()
             iq = query.Query()  # Inner query.
             iq.columns = ['User', 'Host', "CONCAT(User, '@', Host) as Marker"]
@@ -554,9 +685,10 @@ class MySqlAdmin(object):
                 mysql_user = models.MySQLUser()
                 mysql_user.name = row['User']
                 mysql_user.host = row['Host']
-                self._associate_dbs(mysql_user)
                 next_marker = row['Marker']
-                users.append(mysql_user.serialize())
+                users.append(mysql_user)
+            self._associate_dbs(client, *users)
+        users = [user.serialize() for user in users]
         if result.rowcount <= limit:
             next_marker = None
         LOG.debug("users = " + str(users))
@@ -903,7 +1035,7 @@ class MySqlRootAccess(object):
     @classmethod
     def is_root_enabled(cls):
         """Return True if root access is enabled; False otherwise."""
-        with LocalSqlClient(get_engine()) as client:
+        with LocalSqlClient(get_engine(), read_only=True) as client:
             t = text(query.ROOT_ENABLED)
             result = client.execute(t)
             LOG.debug("Found %s with remote root access" % result.rowcount)
@@ -916,7 +1048,7 @@ class MySqlRootAccess(object):
         user.name = "root"
         user.host = "%"
         user.password = generate_random_password()
-        with LocalSqlClient(get_engine()) as client:
+        with LocalSqlClient(get_engine(), use_flush=False) as client:
             print client
             try:
                 cu = query.CreateUser(user.name, host=user.host)
@@ -1,4 +1,6 @@
 from reddwarf.common import cfg
+from reddwarf.common.context import ReddwarfContext
+from reddwarf.conductor import api as conductor_api
 from reddwarf.guestagent import dbaas, backup
 from reddwarf.guestagent import volume
 from reddwarf.openstack.common import log as logging
@@ -21,6 +23,11 @@ class Manager(periodic_task.PeriodicTasks):
         """Update the status of the MySQL service"""
         dbaas.MySqlAppStatus.get().update()
 
+    @periodic_task.periodic_task
+    def report_heartbeat(self, context):
+        """Tell the conductor the agent is alive, whatever MySQL is doing"""
+        conductor_api.API(ReddwarfContext()).heartbeat(CONF.guest_id)
+
     def change_passwords(self, context, users):
         return dbaas.MySqlAdmin().change_passwords(users)
 
@@ -34,6 +41,12 @@ class Manager(periodic_task.PeriodicTasks):
             return
         dbaas.MySqlAdmin().create_user(users)
 
+    def create_databases(self, context, databases):
+        return dbaas.MySqlAdmin().create_databases(databases or [])
+
+    def create_users(self, context, users):
+        return dbaas.MySqlAdmin().create_users(users or [])
+
     def delete_database(self, context, database):
         return dbaas.MySqlAdmin().delete_database(database)
 
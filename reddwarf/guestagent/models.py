@@ -12,7 +12,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-from datetime import datetime
 from datetime import timedelta
 
 from reddwarf.common import cfg
@@ -59,13 +58,20 @@ class AgentHeartBeat(dbmodels.DatabaseModelBase):
         if not self.is_valid():
             raise exception.InvalidModelError(errors=self.errors)
         self['updated_at'] = utils.utcnow()
-        LOG.debug(_("Saving %s: %s") %
-                  (self.__class__.__name__, self.__dict__))
+        LOG.debug(_("Saving %s: %s"), self.__class__.__name__, self.__dict__)
         return get_db_api().save(self)
 
+    @classmethod
+    def find_all_by_instance_ids(cls, instance_ids):
+        """Returns a dict of heartbeats keyed by instance id."""
+        if not instance_ids:
+            return {}
+        beats = cls.find_all_in('instance_id', instance_ids)
+        return dict((beat.instance_id, beat) for beat in beats)
+
     @staticmethod
     def is_active(agent):
-        return (datetime.now() - agent.updated_at <
+        return (utils.utcnow() - agent.updated_at <
                 timedelta(seconds=AGENT_HEARTBEAT))
 
 
@@ -18,9 +18,13 @@
 """Model classes that form the core of instances functionality."""
 
 from datetime import datetime
+from datetime import timedelta
+from eventlet import greenpool
 from novaclient import exceptions as nova_exceptions
 from reddwarf.common import cfg
 from reddwarf.common import exception
+from reddwarf.common import pagination
+from reddwarf.common import utils
 from reddwarf.common.remote import create_dns_client
 from reddwarf.common.remote import create_guest_client
 from reddwarf.common.remote import create_nova_client
@@ -32,6 +36,7 @@ from reddwarf.quota.quota import run_with_quotas
 from reddwarf.instance.tasks import InstanceTask
 from reddwarf.instance.tasks import InstanceTasks
 from reddwarf.taskmanager import api as task_api
+from reddwarf.openstack.common import jsonutils
 from reddwarf.openstack.common import log as logging
 from reddwarf.openstack.common.gettextutils import _
 
@@ -81,15 +86,15 @@ def load_simple_instance_server_status(context, db_info):
     if 'BUILDING' == db_info.task_status.action:
         db_info.server_status = "BUILD"
         db_info.addresses = {}
+    elif db_info.server_status_is_fresh:
+        db_info.addresses = db_info.cached_addresses
     else:
         client = create_nova_client(context)
         try:
             server = client.servers.get(db_info.compute_instance_id)
-            db_info.server_status = server.status
-            db_info.addresses = server.addresses
+            db_info.cache_server_status(server.status, server.addresses)
         except nova_exceptions.NotFound, e:
-            db_info.server_status = "SHUTDOWN"
-            db_info.addresses = {}
+            db_info.cache_server_status("SHUTDOWN", {})
 
 
 # If the compute server is in any of these states we can't perform any
@@ -115,6 +120,7 @@ class SimpleInstance(object):
         self.context = context
         self.db_info = db_info
         self.service_status = service_status
+        self._backup_running = None
 
     @property
     def addresses(self):
@@ -122,6 +128,20 @@ class SimpleInstance(object):
         if hasattr(self.db_info, 'addresses'):
             return self.db_info.addresses
 
+    @property
+    def backup_running(self):
+        """True if a backup of the instance is running.
+
+        Looked up once per instance object, unless it was set in bulk.
+        """
+        if self._backup_running is None:
+            self._backup_running = Backup.running(self.id) is not None
+        return self._backup_running
+
+    @backup_running.setter
+    def backup_running(self, value):
+        self._backup_running = value
+
     @property
     def created(self):
         return self.db_info.created
@@ -182,7 +202,7 @@ class SimpleInstance(object):
             return self.db_info.server_status
 
         ### Check if there is a backup running for this instance
-        if Backup.running(self.id):
+        if self.backup_running:
             return InstanceStatus.BACKUP
 
         ### Report as Shutdown while deleting, unless there's an error.
@@ -257,6 +277,29 @@ def get_db_info(context, id):
     return db_info
 
 
+def load_db_info_and_service_status(context, id):
+    """Loads an instance's database record and service status together.
+
+    Both rows are read with a single query and Nova is not contacted, so
+    this is the cheap way to check whether MySQL is up on an instance.
+    """
+    if context is None:
+        raise TypeError("Argument context not defined.")
+    elif id is None:
+        raise TypeError("Argument id not defined.")
+    found = DBInstance.get_joined_by(InstanceServiceStatus,
+                                     ('id', 'instance_id'),
+                                     id=id, deleted=False)
+    if found is None:
+        raise exception.NotFound(uuid=id)
+    db_info, service_status = found
+    if not context.is_admin and db_info.tenant_id != context.tenant:
+        LOG.error("Tenant %s tried to access instance %s, owned by %s."
+                  % (context.tenant, id, db_info.tenant_id))
+        raise exception.NotFound(uuid=id)
+    return db_info, service_status
+
+
 def load_any_instance(context, id):
     # Try to load an instance with a server.
     # If that fails, try to load it without the server.
@@ -270,18 +313,13 @@ def load_any_instance(context, id):
 def load_instance(cls, context, id, needs_server=False):
     db_info = get_db_info(context, id)
     if not needs_server:
-        # TODO(tim.simpson): When we have notifications this won't be
-        # necessary and instead we'll just use the server_status field from
-        # the instance table.
         load_simple_instance_server_status(context, db_info)
         server = None
     else:
         try:
             server = load_server(context, db_info.id,
                                  db_info.compute_instance_id)
-            #TODO(tim.simpson): Remove this hack when we have notifications!
-            db_info.server_status = server.status
-            db_info.addresses = server.addresses
+            db_info.cache_server_status(server.status, server.addresses)
         except exception.ComputeInstanceNotFound:
             LOG.error("COMPUTE ID = %s" % db_info.compute_instance_id)
             raise exception.UnprocessableEntity("Instance %s is not ready." %
@@ -553,7 +591,7 @@ class Instance(BuiltInstance):
             status = self.db_info.task_status
         elif not self.service_status.status.action_is_allowed:
             status = self.status
-        elif Backup.running(self.id):
+        elif self.backup_running:
             status = InstanceStatus.BACKUP
         else:
             return
@@ -563,26 +601,73 @@ class Instance(BuiltInstance):
         raise exception.UnprocessableEntity(msg)
 
 
-def create_server_list_matcher(server_list):
-    # Returns a method which finds a server from the given list.
+class CachedServer(object):
+    """Stands in for a Nova server using the status cached on an instance."""
+
+    def __init__(self, db_info):
+        self.id = db_info.compute_instance_id
+        self.status = db_info.server_status
+        self.addresses = db_info.cached_addresses
+
+
+def load_servers(client, server_ids):
+    """Fetches the given servers from Nova, keyed by server id.
+
+    Only the requested servers are fetched, in parallel, so the cost of a
+    listing depends on the page size rather than on how many servers the
+    tenant has. Servers Nova can't find are left out of the result.
+
+    The lookups share the client, so it has to be one that hands each green
+    thread its own connection, like the PooledClient create_nova_client
+    returns; its pool size bounds how many lookups run at once.
+    """
+    def get_server(server_id):
+        try:
+            return client.servers.get(server_id)
+        except nova_exceptions.NotFound:
+            LOG.debug("Could not find nova server_id(%s)" % server_id)
+            return None
+
+    server_ids = set(server_id for server_id in server_ids if server_id)
+    if not server_ids:
+        return {}
+    pool = greenpool.GreenPool(min(len(server_ids),
+                                   CONF.nova_server_lookup_pool_size))
+    servers = pool.imap(get_server, server_ids)
+    return dict((server.id, server) for server in servers
+                if server is not None)
+
+
+def create_server_dict_matcher(servers, duplicates=()):
+    # Returns a method which finds a server in the given dict of servers.
     def find_server(instance_id, server_id):
-        matches = [server for server in server_list if server.id == server_id]
-        if len(matches) == 1:
-            return matches[0]
-        elif len(matches) < 1:
+        if server_id in duplicates:
+            # Should never happen, but never say never.
+            LOG.error(_("Server %s for instance %s was found twice!") %
+                      (server_id, instance_id))
+            raise exception.ReddwarfError(uuid=instance_id)
+        try:
+            return servers[server_id]
+        except KeyError:
             # The instance was not found in the list and
             # this can happen if the instance is deleted from
             # nova but still in reddwarf database
             raise exception.ComputeInstanceNotFound(
                 instance_id=instance_id, server_id=server_id)
-        else:
-            # Should never happen, but never say never.
-            LOG.error(_("Server %s for instance %s was found twice!") %
-                      (server_id, instance_id))
-            raise exception.ReddwarfError(uuid=instance_id)
     return find_server
 
 
+def create_server_list_matcher(server_list):
+    # Returns a method which finds a server from the given list.
+    servers = {}
+    duplicates = set()
+    for server in server_list:
+        if server.id in servers:
+            duplicates.add(server.id)
+        servers[server.id] = server
+    return create_server_dict_matcher(servers, duplicates)
+
+
 class Instances(object):
 
     DEFAULT_LIMIT = CONF.instances_page_size
@@ -595,22 +680,35 @@ class Instances(object):
 
         if context is None:
             raise TypeError("Argument context not defined.")
-        client = create_nova_client(context)
-        servers = client.servers.list()
 
         db_infos = DBInstance.find_all(tenant_id=context.tenant, deleted=False)
-        limit = int(context.limit or Instances.DEFAULT_LIMIT)
-        if limit > Instances.DEFAULT_LIMIT:
-            limit = Instances.DEFAULT_LIMIT
+        limit = pagination.page_limit(context.limit, Instances.DEFAULT_LIMIT)
         data_view = DBInstance.find_by_pagination('instances', db_infos, "foo",
                                                   limit=limit,
                                                   marker=context.marker)
         next_marker = data_view.next_page_marker
 
-        find_server = create_server_list_matcher(servers)
-        for db in db_infos:
+        servers = {}
+        stale = []
+        for db in data_view.collection:
             LOG.debug("checking for db [id=%s, compute_instance_id=%s]" %
                       (db.id, db.compute_instance_id))
+            if InstanceTasks.BUILDING == db.task_status:
+                continue
+            if db.server_status_is_fresh:
+                servers[db.compute_instance_id] = CachedServer(db)
+            else:
+                stale.append(db)
+        if stale:
+            client = create_nova_client(context)
+            loaded = load_servers(client, [db.compute_instance_id
+                                           for db in stale])
+            for db in stale:
+                server = loaded.get(db.compute_instance_id)
+                if server is not None:
+                    db.cache_server_status(server.status, server.addresses)
+            servers.update(loaded)
+        find_server = create_server_dict_matcher(servers)
         ret = Instances._load_servers_status(load_simple_instance, context,
                                              data_view.collection,
                                              find_server)
@@ -619,33 +717,36 @@ class Instances(object):
     @staticmethod
     def _load_servers_status(load_instance, context, db_items, find_server):
         ret = []
+        db_items = list(db_items)
+        statuses = InstanceServiceStatus.find_all_by_instance_ids(
+            [db.id for db in db_items])
         for db in db_items:
             server = None
-            try:
-                #TODO(tim.simpson): Delete when we get notifications working!
-                if InstanceTasks.BUILDING == db.task_status:
-                    db.server_status = "BUILD"
-                else:
-                    try:
-                        server = find_server(db.id, db.compute_instance_id)
-                        db.server_status = server.status
-                    except exception.ComputeInstanceNotFound:
-                        db.server_status = "SHUTDOWN"  # Fake it...
-                #TODO(tim.simpson): End of hack.
-
-                #volumes = find_volumes(server.id)
-                status = InstanceServiceStatus.find_by(instance_id=db.id)
-                LOG.info(_("Server api_status(%s)") %
-                         (status.status.api_status))
-                if not status.status:  # This should never happen.
-                    LOG.error(_("Server status could not be read for "
-                                "instance id(%s)") % (db.id))
-                    continue
-            except exception.ModelNotFoundError:
+            #TODO(tim.simpson): Delete when we get notifications working!
+            if InstanceTasks.BUILDING == db.task_status:
+                db.server_status = "BUILD"
+            else:
+                try:
+                    server = find_server(db.id, db.compute_instance_id)
+                    db.server_status = server.status
+                except exception.ComputeInstanceNotFound:
+                    db.server_status = "SHUTDOWN"  # Fake it...
+            #TODO(tim.simpson): End of hack.
+
+            #volumes = find_volumes(server.id)
+            status = statuses.get(db.id)
+            if status is None or not status.status:
                 LOG.error(_("Server status could not be read for "
                             "instance id(%s)") % (db.id))
                 continue
+            LOG.info(_("Server api_status(%s)") %
+                     (status.status.api_status))
             ret.append(load_instance(context, db, status))
+        running = Backup.running_instance_ids([db.id for db in db_items
+                                               if db.id in statuses])
+        for instance in ret:
+            if isinstance(instance, SimpleInstance):
+                instance.backup_running = instance.id in running
         return ret
 
 
@@ -680,6 +781,53 @@ class DBInstance(dbmodels.DatabaseModelBase):
 
     task_status = property(get_task_status, set_task_status)
 
+    @property
+    def cached_addresses(self):
+        if not self.server_addresses:
+            return {}
+        return jsonutils.loads(self.server_addresses)
+
+    @property
+    def server_status_is_fresh(self):
+        """True if the cached server status can be trusted without Nova."""
+        ttl = CONF.server_status_cache_ttl
+        if ttl <= 0 or not self.server_status_updated:
+            return False
+        age = utils.utcnow() - self.server_status_updated
+        return age < timedelta(seconds=ttl)
+
+    def cache_server_status(self, server_status, addresses):
+        """Sets the server status fetched from Nova on a read path.
+
+        The status is written through to the instances table when the cache
+        is enabled and the stored copy is stale or out of date.
+        """
+        addresses = addresses or {}
+        unchanged = (self.server_status == server_status and
+                     self.cached_addresses == addresses)
+        self.server_status = server_status
+        self.addresses = addresses
+        if CONF.server_status_cache_ttl <= 0:
+            return
+        if unchanged and self.server_status_is_fresh:
+            return
+        self.update_server_status(server_status, addresses)
+
+    def update_server_status(self, server_status, addresses):
+        """Stores the server status and addresses in the instances table.
+
+        "updated" is left alone since it reflects changes made through the
+        API rather than changes in Nova.
+        """
+        self.server_status = server_status
+        self.addresses = addresses or {}
+        self.server_addresses = jsonutils.dumps(self.addresses)
+        self.server_status_updated = utils.utcnow()
+        DBInstance.find_all(id=self.id).update(
+            server_status=self.server_status,
+            server_addresses=self.server_addresses,
+            server_status_updated=self.server_status_updated)
+
 
 class ServiceImage(dbmodels.DatabaseModelBase):
     """Defines the status of the service being run."""
@@ -712,6 +860,24 @@ class InstanceServiceStatus(dbmodels.DatabaseModelBase):
 
     status = property(get_status, set_status)
 
+    def save(self):
+        # The conductor compares reports against updated_at, so a status
+        # saved here must not lose to a report made before it.
+        self['updated_at'] = utils.utcnow()
+        return super(InstanceServiceStatus, self).save()
+
+    @classmethod
+    def find_all_by_instance_ids(cls, instance_ids):
+        """Returns a dict of service statuses keyed by instance id.
+
+        All of the statuses are fetched with a single query, so this should
+        be preferred over calling find_by for each instance in a listing.
+        """
+        if not instance_ids:
+            return {}
+        statuses = cls.find_all_in('instance_id', instance_ids)
+        return dict((status.instance_id, status) for status in statuses)
+
 
 def persisted_models():
     return {
@@ -0,0 +1,26 @@
+#    Copyright 2013 OpenStack LLC
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from reddwarf.db import models as dbmodels
+
+
+def persisted_models():
+    return {'rate_limit_buckets': RateLimitBucket}
+
+
+class RateLimitBucket(dbmodels.DatabaseModelBase):
+    """The shared leaky bucket state of one tenant's rate limit."""
+
+    _data_fields = ['id', 'water_level', 'last_request', 'next_request',
+                    'expires_at', 'version']
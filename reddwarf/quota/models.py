@@ -15,6 +15,7 @@
 
 from reddwarf.common import cfg
 from reddwarf.common import utils
+from reddwarf.db import get_db_api
 from reddwarf.db import models as dbmodels
 from reddwarf.openstack.common import log as logging
 
@@ -50,6 +51,17 @@ class QuotaUsage(dbmodels.DatabaseModelBase):
     _data_fields = ['created', 'updated', 'tenant_id', 'resource',
                     'in_use', 'reserved', 'id']
 
+    @classmethod
+    def reserve(cls, tenant_id, deltas, hard_limits):
+        """Reserves deltas against the tenant's usages in one transaction.
+
+        Raises QuotaExceeded if any delta would go over its hard limit,
+        otherwise returns the new reservations.
+        """
+        return get_db_api().reserve_quota_usages(
+            cls, Reservation, tenant_id, deltas, hard_limits,
+            Reservation.Statuses.RESERVED)
+
 
 class Reservation(dbmodels.DatabaseModelBase):
     """Defines the reservation for a quota."""
@@ -62,6 +74,20 @@ class Reservation(dbmodels.DatabaseModelBase):
                     COMMITTED='Committed',
                     ROLLEDBACK='Rolled Back')
 
+    @classmethod
+    def commit_all(cls, reservations):
+        """Moves the reserved deltas into use in one transaction."""
+        get_db_api().settle_reservations(QuotaUsage, cls, reservations,
+                                         cls.Statuses.COMMITTED,
+                                         apply_to_in_use=True)
+
+    @classmethod
+    def rollback_all(cls, reservations):
+        """Releases the reserved deltas in one transaction."""
+        get_db_api().settle_reservations(QuotaUsage, cls, reservations,
+                                         cls.Statuses.ROLLEDBACK,
+                                         apply_to_in_use=False)
+
 
 def persisted_models():
     return {
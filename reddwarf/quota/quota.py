@@ -101,14 +101,13 @@ class DbQuotaDriver(object):
                              for usage in all_usages
                              if usage.resource in resources)
         if len(result_usages) != len(resources):
-            for resource in resources:
-                # Not in the DB, return default value
-                if resource not in result_usages:
-                    usage = QuotaUsage.create(tenant_id=tenant_id,
-                                              in_use=0,
-                                              reserved=0,
-                                              resource=resource)
-                    result_usages[resource] = usage
+            # Not in the DB, return default values
+            missing = [{'tenant_id': tenant_id, 'in_use': 0, 'reserved': 0,
+                        'resource': resource}
+                       for resource in resources
+                       if resource not in result_usages]
+            for usage in QuotaUsage.create_all(missing):
+                result_usages[usage.resource] = usage
 
         return result_usages
 
@@ -147,30 +146,12 @@ class DbQuotaDriver(object):
                                                  unregistered_resources)
 
         quotas = self.get_all_quotas_by_tenant(tenant_id, deltas.keys())
-        quota_usages = self.get_all_quota_usages_by_tenant(tenant_id,
-                                                           deltas.keys())
-
-        overs = [resource for resource in deltas
-                 if (quota_usages[resource].in_use +
-                     quota_usages[resource].reserved +
-                     int(deltas[resource])) > quotas[resource].hard_limit]
-
-        if overs:
-            raise exception.QuotaExceeded(overs=sorted(overs))
+        hard_limits = dict((resource, quota.hard_limit)
+                           for resource, quota in quotas.iteritems())
+        deltas = dict((resource, int(delta))
+                      for resource, delta in deltas.iteritems())
 
-        reservations = []
-        for resource in deltas:
-            reserved = deltas[resource]
-            usage = quota_usages[resource]
-            usage.reserved = reserved
-            usage.save()
-
-            resv = Reservation.create(usage_id=usage.id,
-                                      delta=usage.reserved,
-                                      status=Reservation.Statuses.RESERVED)
-            reservations.append(resv)
-
-        return reservations
+        return QuotaUsage.reserve(tenant_id, deltas, hard_limits)
 
     def commit(self, reservations):
         """Commit reservations.
@@ -179,13 +160,7 @@ class DbQuotaDriver(object):
                              returned by the reserve() method.
         """
 
-        for reservation in reservations:
-            usage = QuotaUsage.find_by(id=reservation.usage_id)
-            usage.in_use += reservation.delta
-            usage.reserved -= reservation.delta
-            reservation.status = Reservation.Statuses.COMMITTED
-            usage.save()
-            reservation.save()
+        Reservation.commit_all(reservations)
 
     def rollback(self, reservations):
         """Roll back reservations.
@@ -194,12 +169,7 @@ class DbQuotaDriver(object):
                              returned by the reserve() method.
         """
 
-        for reservation in reservations:
-            usage = QuotaUsage.find_by(id=reservation.usage_id)
-            usage.reserved -= reservation.delta
-            reservation.status = Reservation.Statuses.ROLLEDBACK
-            usage.save()
-            reservation.save()
+        Reservation.rollback_all(reservations)
 
 
 class QuotaEngine(object):
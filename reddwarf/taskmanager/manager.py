@@ -15,6 +15,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from reddwarf.common import cfg
 from reddwarf.common import exception
 from reddwarf.openstack.common import log as logging
 from reddwarf.openstack.common import periodic_task
@@ -23,10 +24,28 @@ from reddwarf.taskmanager.models import FreshInstanceTasks
 
 LOG = logging.getLogger(__name__)
 RPC_API_VERSION = "1.0"
+CONF = cfg.CONF
 
 
 class Manager(periodic_task.PeriodicTasks):
 
+    def initialize_service_hook(self, service):
+        if CONF.nova_notifications_enabled:
+            LOG.info("Listening for Nova notifications on %s."
+                     % CONF.nova_notification_topic)
+            service.conn.declare_topic_consumer(
+                topic=CONF.nova_notification_topic,
+                callback=self.process_nova_notification,
+                queue_name=CONF.nova_notification_queue,
+                exchange_name=CONF.nova_control_exchange)
+
+    def process_nova_notification(self, message):
+        try:
+            models.update_server_status_from_notification(message)
+            models.wake_pollers_from_notification(message)
+        except Exception:
+            LOG.exception("Error processing Nova notification %s." % message)
+
     def resize_volume(self, context, instance_id, new_size):
         instance_tasks = models.BuiltInstanceTasks.load(context, instance_id)
         instance_tasks.resize_volume(new_size)
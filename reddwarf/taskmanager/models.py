@@ -46,6 +46,7 @@ VOLUME_TIME_OUT = CONF.volume_time_out  # seconds.
 DNS_TIME_OUT = CONF.dns_time_out  # seconds.
 RESIZE_TIME_OUT = CONF.resize_time_out  # seconds.
 REVERT_TIME_OUT = CONF.revert_time_out  # seconds.
+POLL_MAX_SLEEP_TIME = CONF.poll_max_sleep_time  # seconds.
 
 use_nova_server_volume = CONF.use_nova_server_volume
 
@@ -197,7 +198,10 @@ class FreshInstanceTasks(FreshInstance):
             lambda: volume_client.volumes.get(volume_ref.id),
             lambda v_ref: v_ref.status in ['available', 'error'],
             sleep_time=2,
-            time_out=VOLUME_TIME_OUT)
+            time_out=VOLUME_TIME_OUT,
+            max_sleep_time=POLL_MAX_SLEEP_TIME,
+            wake_key=volume_ref.id,
+            name='volume_available')
 
         v_ref = volume_client.volumes.get(volume_ref.id)
         if v_ref.status in ['error']:
@@ -275,7 +279,10 @@ class FreshInstanceTasks(FreshInstance):
                     LOG.error(msg % (self.id, server.status))
                     raise ReddwarfError(status=server.status)
             poll_until(get_server, ip_is_available,
-                       sleep_time=1, time_out=DNS_TIME_OUT)
+                       sleep_time=1, time_out=DNS_TIME_OUT,
+                       max_sleep_time=POLL_MAX_SLEEP_TIME,
+                       wake_key=self.db_info.compute_instance_id,
+                       name='server_ip_available')
             server = nova_client.servers.get(self.db_info.compute_instance_id)
             LOG.info("Creating dns entry...")
             dns_client.create_instance_entry(self.id,
@@ -330,7 +337,9 @@ class BuiltInstanceTasks(BuiltInstance):
                 return True
 
         poll_until(server_is_finished, sleep_time=2,
-                   time_out=CONF.server_delete_time_out)
+                   time_out=CONF.server_delete_time_out,
+                   max_sleep_time=POLL_MAX_SLEEP_TIME,
+                   wake_key=self.db_info.compute_instance_id)
 
     def resize_volume(self, new_size):
         LOG.debug("%s: Resizing volume for instance: %s to %r GB"
@@ -341,7 +350,10 @@ class BuiltInstanceTasks(BuiltInstance):
                 lambda: self.volume_client.volumes.get(self.volume_id),
                 lambda volume: volume.status == 'in-use',
                 sleep_time=2,
-                time_out=CONF.volume_time_out)
+                time_out=CONF.volume_time_out,
+                max_sleep_time=POLL_MAX_SLEEP_TIME,
+                wake_key=self.volume_id,
+                name='volume_resized')
             volume = self.volume_client.volumes.get(self.volume_id)
             self.update_db(volume_size=volume.size)
             self.nova_client.volumes.rescan_server_volume(self.server,
@@ -386,7 +398,10 @@ class BuiltInstanceTasks(BuiltInstance):
             utils.poll_until(
                 update_server_info,
                 sleep_time=2,
-                time_out=reboot_time_out)
+                time_out=reboot_time_out,
+                max_sleep_time=POLL_MAX_SLEEP_TIME,
+                wake_key=self.db_info.compute_instance_id,
+                name='server_rebooted')
 
             # Set the status to PAUSED. The guest agent will reset the status
             # when the reboot completes and MySQL is running.
@@ -478,6 +493,88 @@ class BackupTasks(object):
             reddwarf.backup.models.Backup.delete(backup_id)
 
 
+# Maps the vm and task states in Nova notifications to the server status
+# the Nova API would report, mirroring nova.api.openstack.common.
+NOVA_STATE_MAP = {
+    'active': {
+        'default': 'ACTIVE',
+        'rebooting': 'REBOOT',
+        'rebooting_hard': 'HARD_REBOOT',
+        'rebuilding': 'REBUILD',
+        'migrating': 'MIGRATING',
+        'resize_prep': 'RESIZE',
+        'resize_migrating': 'RESIZE',
+        'resize_migrated': 'RESIZE',
+        'resize_finish': 'RESIZE',
+    },
+    'building': {'default': 'BUILD'},
+    'stopped': {'default': 'SHUTOFF'},
+    'resized': {
+        'default': 'VERIFY_RESIZE',
+        'resize_reverting': 'REVERT_RESIZE',
+    },
+    'paused': {'default': 'PAUSED'},
+    'suspended': {'default': 'SUSPENDED'},
+    'rescued': {'default': 'RESCUE'},
+    'error': {'default': 'ERROR'},
+    'deleted': {'default': 'DELETED'},
+    'soft_deleted': {'default': 'SOFT_DELETED'},
+}
+
+
+def nova_server_status(vm_state, task_state=None):
+    states = NOVA_STATE_MAP.get(vm_state, {'default': 'UNKNOWN'})
+    return states.get(task_state, states['default'])
+
+
+def nova_notification_addresses(fixed_ips):
+    """Converts the fixed_ips of a notification to server.addresses."""
+    addresses = {}
+    for ip in fixed_ips:
+        addresses.setdefault(ip.get('label'), []).append(
+            {'addr': ip.get('address'), 'version': ip.get('version')})
+    return addresses
+
+
+def update_server_status_from_notification(message):
+    """Stores the server status carried by a Nova compute notification."""
+    event_type = message.get('event_type', '')
+    if not event_type.startswith('compute.instance.'):
+        return
+    payload = message.get('payload') or {}
+    server_id = payload.get('instance_id')
+    if not server_id:
+        return
+    db_info = inst_models.DBInstance.get_by(compute_instance_id=server_id,
+                                            deleted=False)
+    if db_info is None:
+        return
+    task_state = payload.get('new_task_state',
+                             payload.get('state_description'))
+    server_status = nova_server_status(payload.get('state'), task_state)
+    if 'fixed_ips' in payload:
+        addresses = nova_notification_addresses(payload['fixed_ips'])
+    else:
+        addresses = db_info.cached_addresses
+    LOG.debug("Nova reported server %s of instance %s as %s (%s)."
+              % (server_id, db_info.id, server_status, event_type))
+    db_info.update_server_status(server_status, addresses)
+
+
+def wake_pollers_from_notification(message):
+    """Wakes the waits on the server or volume a Nova notification is for."""
+    event_type = message.get('event_type', '')
+    payload = message.get('payload') or {}
+    if event_type.startswith('compute.instance.'):
+        resource_id = payload.get('instance_id')
+    elif event_type.startswith('volume.'):
+        resource_id = payload.get('volume_id')
+    else:
+        return
+    if resource_id:
+        utils.wake_pollers(resource_id)
+
+
 class ResizeActionBase(object):
     """Base class for executing a resize action."""
 
@@ -492,7 +589,8 @@ class ResizeActionBase(object):
         utils.poll_until(
             self._guest_is_awake,
             sleep_time=2,
-            time_out=RESIZE_TIME_OUT)
+            time_out=RESIZE_TIME_OUT,
+            max_sleep_time=POLL_MAX_SLEEP_TIME)
 
     def _assert_nova_status_is_ok(self):
         # Make sure Nova thinks things went well.
@@ -590,7 +688,10 @@ class ResizeActionBase(object):
         utils.poll_until(
             update_server_info,
             sleep_time=2,
-            time_out=RESIZE_TIME_OUT)
+            time_out=RESIZE_TIME_OUT,
+            max_sleep_time=POLL_MAX_SLEEP_TIME,
+            wake_key=self.instance.db_info.compute_instance_id,
+            name='server_resized')
 
     def _wait_for_revert_nova_action(self):
         # Wait for the server to return to ACTIVE after revert.
@@ -600,7 +701,10 @@ class ResizeActionBase(object):
         utils.poll_until(
             update_server_info,
             sleep_time=2,
-            time_out=REVERT_TIME_OUT)
+            time_out=REVERT_TIME_OUT,
+            max_sleep_time=POLL_MAX_SLEEP_TIME,
+            wake_key=self.instance.db_info.compute_instance_id,
+            name='server_reverted')
 
 
 class ResizeAction(ResizeActionBase):
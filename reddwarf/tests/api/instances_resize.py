@@ -85,8 +85,10 @@ class ResizeTestBase(TestCase):
         if not self.poll_until_mocked:
             self.mock.StubOutWithMock(utils, "poll_until")
             self.poll_until_mocked = True
-        utils.poll_until(mox.IgnoreArg(), sleep_time=2, time_out=120)\
-            .WithSideEffects(lambda ignore, sleep_time, time_out: change())
+        utils.poll_until(mox.IgnoreArg(), sleep_time=2, time_out=120,
+                         max_sleep_time=mox.IgnoreArg(),
+                         wake_key=mox.IgnoreArg(), name=mox.IgnoreArg())\
+            .WithSideEffects(lambda ignore, **kwargs: change())
 
     def _nova_resizes_successfully(self):
         self.server.resize(NEW_FLAVOR_ID)
@@ -124,7 +126,9 @@ class ResizeTests(ResizeTestBase):
         self.server.resize(NEW_FLAVOR_ID)
 
         self.mock.StubOutWithMock(utils, 'poll_until')
-        utils.poll_until(mox.IgnoreArg(), sleep_time=2, time_out=120)\
+        utils.poll_until(mox.IgnoreArg(), sleep_time=2, time_out=120,
+                         max_sleep_time=mox.IgnoreArg(),
+                         wake_key=mox.IgnoreArg(), name=mox.IgnoreArg())\
             .AndRaise(PollTimeOut)
 
     def test_nova_doesnt_change_flavor(self):
@@ -151,7 +155,8 @@ class ResizeTests(ResizeTestBase):
         self._nova_resizes_successfully()
         self.instance._set_service_status_to_paused()
         self.instance.service_status = ServiceStatuses.PAUSED
-        utils.poll_until(mox.IgnoreArg(), sleep_time=2, time_out=120)\
+        utils.poll_until(mox.IgnoreArg(), sleep_time=2, time_out=120,
+                         max_sleep_time=mox.IgnoreArg())\
             .AndRaise(PollTimeOut)
         self.instance.server.revert_resize()
         self._server_changes_to("ACTIVE", OLD_FLAVOR_ID)
@@ -162,7 +167,8 @@ class ResizeTests(ResizeTestBase):
         self._nova_resizes_successfully()
         self.instance._set_service_status_to_paused()
         self.instance.service_status = ServiceStatuses.SHUTDOWN
-        utils.poll_until(mox.IgnoreArg(), sleep_time=2, time_out=120)
+        utils.poll_until(mox.IgnoreArg(), sleep_time=2, time_out=120,
+                         max_sleep_time=mox.IgnoreArg())
         self._start_mysql()
         self.instance.server.revert_resize()
         self._server_changes_to("ACTIVE", OLD_FLAVOR_ID)
@@ -173,7 +179,8 @@ class ResizeTests(ResizeTestBase):
         self._nova_resizes_successfully()
         self.instance._set_service_status_to_paused()
         self.instance.service_status = ServiceStatuses.RUNNING
-        utils.poll_until(mox.IgnoreArg(), sleep_time=2, time_out=120)
+        utils.poll_until(mox.IgnoreArg(), sleep_time=2, time_out=120,
+                         max_sleep_time=mox.IgnoreArg())
         self._start_mysql()
         self.server.status = "SHUTDOWN"
         self.instance.server.confirm_resize()
@@ -183,7 +190,8 @@ class ResizeTests(ResizeTestBase):
         self._nova_resizes_successfully()
         self.instance._set_service_status_to_paused()
         self.instance.service_status = ServiceStatuses.PAUSED
-        utils.poll_until(mox.IgnoreArg(), sleep_time=2, time_out=120)\
+        utils.poll_until(mox.IgnoreArg(), sleep_time=2, time_out=120,
+                         max_sleep_time=mox.IgnoreArg())\
             .AndRaise(PollTimeOut)
         self.instance.server.revert_resize()
         self._server_changes_to("ERROR", OLD_FLAVOR_ID)
@@ -210,6 +218,7 @@ class MigrateTests(ResizeTestBase):
         self._server_changes_to("VERIFY_RESIZE", NEW_FLAVOR_ID)
         self.instance._set_service_status_to_paused()
         self.instance.service_status = ServiceStatuses.RUNNING
-        utils.poll_until(mox.IgnoreArg(), sleep_time=2, time_out=120)
+        utils.poll_until(mox.IgnoreArg(), sleep_time=2, time_out=120,
+                         max_sleep_time=mox.IgnoreArg())
         self._start_mysql()
         self.instance.server.confirm_resize()
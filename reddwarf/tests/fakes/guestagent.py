@@ -91,10 +91,28 @@ class FakeGuest(object):
         for db in databases:
             self.dbs[db['_name']] = db
 
+    def create_databases(self, databases):
+        results = [{'_name': db['_name'], 'exists': db['_name'] in self.dbs}
+                   for db in databases]
+        if not any(result['exists'] for result in results):
+            self.create_database(databases)
+        return results
+
     def create_user(self, users):
         for user in users:
             self._create_user(user)
 
+    def create_users(self, users):
+        for user in users:
+            self._check_username(user['_name'])
+        results = [{'_name': user['_name'], '_host': user['_host'],
+                    'exists': (user['_name'], user['_host'] or '%')
+                    in self.users}
+                   for user in users]
+        if not any(result['exists'] for result in results):
+            self.create_user(users)
+        return results
+
     def _create_user(self, user):
         username = user['_name']
         self._check_username(username)
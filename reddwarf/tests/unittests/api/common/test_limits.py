@@ -19,6 +19,7 @@ Tests dealing with HTTP rate-limiting.
 
 import httplib
 import StringIO
+import time
 from xml.dom import minidom
 from reddwarf.quota.models import Quota
 import testtools
@@ -28,9 +29,11 @@ from mockito import when, mock, any
 from reddwarf.common import limits
 from reddwarf.common.limits import Limit
 from reddwarf.limits import views
+from reddwarf.limits.models import RateLimitBucket
 from reddwarf.limits.service import LimitsController
 from reddwarf.openstack.common import jsonutils
 from reddwarf.quota.quota import QUOTAS
+from reddwarf.tests.unittests.util import util
 
 TEST_LIMITS = [
     Limit("GET", "/delayed", "^/delayed", 1, limits.PER_MINUTE),
@@ -688,6 +691,150 @@ class WsgiLimiterProxyTest(BaseLimitTestSuite):
         super(WsgiLimiterProxyTest, self).tearDown()
 
 
+class MemoryLimiterStorageTest(testtools.TestCase):
+    """
+    Tests for the `limits.MemoryLimiterStorage` class.
+    """
+
+    def setUp(self):
+        super(MemoryLimiterStorageTest, self).setUp()
+        self.storage = limits.MemoryLimiterStorage()
+        self.now = 1000.0
+        self.patch(limits.time, 'time', lambda: self.now)
+
+    def _set(self, username, level, index=0):
+        self.storage.update(username, index,
+                            lambda old: ((level, 5.0, None), None))
+
+    def _levels(self, *usernames):
+        return [state and state[0] for username in usernames
+                for state in self.storage.get(username, [0])]
+
+    def test_update_passes_current_state(self):
+        self._set('a', 1.0)
+        self._set('a', 2.0, index=2)
+        result = self.storage.update('a', 0, lambda old: (old, old))
+        self.assertEqual((1.0, 5.0, None), result)
+        self.assertEqual([(1.0, 5.0, None), None, (2.0, 5.0, None), None],
+                         self.storage.get('a', range(4)))
+        self.assertEqual([None], self.storage.get('b', [0]))
+
+    def test_evicts_least_recently_used(self):
+        self.patch(limits.CONF, 'rate_limit_cache_size', 2)
+        self._set('a', 1.0)
+        self._set('b', 2.0)
+        self._set('a', 3.0)
+        self._set('c', 4.0)
+        self.assertEqual([3.0, None, 4.0], self._levels('a', 'b', 'c'))
+        self.assertEqual(2, len(self.storage))
+
+    def test_evicts_idle_buckets(self):
+        self.patch(limits.CONF, 'rate_limit_idle_timeout', 60)
+        self._set('a', 1.0)
+        self.now += 30
+        self._set('b', 2.0)
+        self.now += 45
+        self._set('c', 3.0)
+        self.assertEqual([None, 2.0, 3.0], self._levels('a', 'b', 'c'))
+
+
+class LimitIndexTest(testtools.TestCase):
+    """
+    Tests for the `limits.LimitIndex` class.
+    """
+
+    def _found(self, index, verb, url):
+        return sorted(position for position, limit in index.find(verb, url))
+
+    def test_find(self):
+        index = limits.LimitIndex([
+            Limit("GET", "*", ".*", 10, limits.PER_MINUTE),
+            Limit("GET", "/instances", "^/instances", 5, limits.PER_MINUTE),
+            Limit("GET", "/backups", "^/backups", 5, limits.PER_MINUTE),
+            Limit("POST", "/instances", "^/instances", 1, limits.PER_MINUTE),
+        ])
+        self.assertEqual([0, 1], self._found(index, "GET", "/instances/1"))
+        self.assertEqual([0, 2], self._found(index, "GET", "/backups"))
+        self.assertEqual([0], self._found(index, "GET", "/flavors"))
+        self.assertEqual([3], self._found(index, "POST", "/instances"))
+        self.assertEqual([], self._found(index, "POST", "/backups"))
+        self.assertEqual([], self._found(index, "DELETE", "/instances"))
+
+    def test_patterns_with_groups_are_not_merged(self):
+        index = limits.LimitIndex([
+            Limit("GET", "*", "^/(a)\\1", 10, limits.PER_MINUTE),
+            Limit("GET", "*", "^/(b)\\1", 10, limits.PER_MINUTE),
+        ])
+        self.assertEqual([1], self._found(index, "GET", "/bb"))
+        self.assertEqual([], self._found(index, "GET", "/ba"))
+
+
+class SqlLimiterStorageTest(testtools.TestCase):
+    """
+    Tests for the `limits.SqlLimiterStorage` class.
+    """
+
+    def setUp(self):
+        super(SqlLimiterStorageTest, self).setUp()
+        util.init_db()
+        self.now = time.time()
+        self.limit = Limit("PUT", "*", ".*", 2, limits.PER_MINUTE)
+        self.limit._get_time = lambda: self.now
+        # Two API workers sharing the database.
+        self.limiters = [limits.Limiter([self.limit],
+                                        limits.SqlLimiterStorage())
+                         for _ in range(2)]
+
+    def tearDown(self):
+        super(SqlLimiterStorageTest, self).tearDown()
+        RateLimitBucket.find_all().delete()
+
+    def _check(self, limiter, username="user1"):
+        return limiter.check_for_delay("PUT", "/anything", username)[0]
+
+    def test_limit_is_shared(self):
+        first, second = self.limiters
+        self.assertEqual(None, self._check(first))
+        self.assertEqual(None, self._check(second))
+        self.assertEqual(30.0, self._check(first))
+        self.assertEqual(30.0, self._check(second))
+        self.assertEqual(None, self._check(second, "user2"))
+
+    def test_get_limits(self):
+        first, second = self.limiters
+        self._check(first)
+        limit, = second.get_limits("user1")
+        self.assertEqual(1, limit['remaining'])
+        limit, = second.get_limits("user2")
+        self.assertEqual(2, limit['remaining'])
+
+    def test_concurrent_update_is_retried(self):
+        storage = self.limiters[0].storage
+        self._check(self.limiters[0])
+
+        def consume_racing(state):
+            # Another worker updates the bucket between our read and write.
+            if not racing:
+                racing.append(True)
+                self._check(self.limiters[1])
+            return self.limit.consume(state)
+
+        racing = []
+        self.assertEqual(30.0,
+                         storage.update("user1", 0, consume_racing))
+
+    def test_drained_buckets_are_purged(self):
+        self._check(self.limiters[0])
+        self.now -= 3600
+        self._check(self.limiters[0], "user2")
+        self.now += 3600
+        self.limiters[0].storage._next_purge = 0
+        self._check(self.limiters[0], "user3")
+        self.assertEqual(["user1/0", "user3/0"],
+                         sorted(bucket.id for bucket in
+                                RateLimitBucket.find_all()))
+
+
 class LimitsViewTest(testtools.TestCase):
     def setUp(self):
         super(LimitsViewTest, self).setUp()
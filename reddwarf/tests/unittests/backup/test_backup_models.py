@@ -159,6 +159,23 @@ class BackupORMTest(testtools.TestCase):
         db_record = models.Backup.list_for_instance(self.instance_id)
         self.assertEqual(2, db_record.count())
 
+    def test_paginated(self):
+        for name in ['second', 'third']:
+            models.DBBackup.create(tenant_id=self.context.tenant,
+                                   name=name,
+                                   state=BACKUP_STATE,
+                                   instance_id=self.instance_id,
+                                   deleted=False)
+        self.context.limit = 2
+        first, marker = models.Backup.paginated(
+            self.context, models.Backup.list(self.context))
+        self.context.marker = marker
+        rest, marker = models.Backup.paginated(
+            self.context, models.Backup.list(self.context))
+        self.assertEqual([BACKUP_NAME, 'second', 'third'],
+                         [backup.name for backup in first + rest])
+        self.assertEqual(None, marker)
+
     def test_running(self):
         running = models.Backup.running(instance_id=self.instance_id)
         self.assertTrue(running)
@@ -172,6 +189,19 @@ class BackupORMTest(testtools.TestCase):
                                             exclude=self.backup.id)
         self.assertFalse(not_running)
 
+    def test_running_instance_ids(self):
+        models.DBBackup.create(tenant_id=self.context.tenant,
+                               name=BACKUP_NAME_2,
+                               state=models.BackupState.COMPLETED,
+                               instance_id='done-instance',
+                               deleted=False)
+        running = models.Backup.running_instance_ids(
+            [self.instance_id, 'done-instance', 'non-existent'])
+        self.assertEqual(set([self.instance_id]), running)
+
+    def test_running_instance_ids_empty(self):
+        self.assertEqual(set(), models.Backup.running_instance_ids([]))
+
     def test_is_running(self):
         self.assertTrue(self.backup.is_running)
 
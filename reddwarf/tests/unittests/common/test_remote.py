@@ -1,7 +1,9 @@
+import eventlet
 from mockito import mock, when, unstub
 import testtools
 from testtools.matchers import *
 
+from novaclient import base as novaclient_base
 import swiftclient.client
 
 from reddwarf.tests.fakes.swift import SwiftClientStub
@@ -212,3 +214,121 @@ class TestRemote(testtools.TestCase):
         self.assertThat(obj_resp[1], Is('updated-object-contents'))
         # ensure object count has not increased
         self.assertThat(len(conn.get_container('new-container')[1]), Is(1))
+
+
+class TestClientCache(testtools.TestCase):
+    def setUp(self):
+        super(TestClientCache, self).setUp()
+        self.cache = remote.ClientCache()
+        self.size = remote.CONF.remote_client_cache_size
+        self.ttl = remote.CONF.remote_client_cache_ttl
+        remote.CONF.remote_client_cache_size = 2
+        remote.CONF.remote_client_cache_ttl = 300
+
+    def tearDown(self):
+        super(TestClientCache, self).tearDown()
+        remote.CONF.remote_client_cache_size = self.size
+        remote.CONF.remote_client_cache_ttl = self.ttl
+        unstub()
+
+    def test_hit(self):
+        client = self.cache.get('a', object)
+        self.assertIs(client, self.cache.get('a', object))
+        self.assertEqual({'size': 1, 'hits': 1, 'misses': 1, 'evictions': 0},
+                         self.cache.stats())
+
+    def test_lru_eviction(self):
+        client_a = self.cache.get('a', object)
+        self.cache.get('b', object)
+        self.cache.get('a', object)
+        self.cache.get('c', object)
+        self.assertIs(client_a, self.cache.get('a', object))
+        self.assertEqual(1, self.cache.stats()['evictions'])
+        self.assertEqual(2, self.cache.stats()['size'])
+
+    def test_expiry(self):
+        remote.CONF.remote_client_cache_ttl = -1
+        client = self.cache.get('a', object)
+        self.assertIsNot(client, self.cache.get('a', object))
+        self.assertEqual(2, self.cache.stats()['misses'])
+
+    def test_disabled(self):
+        remote.CONF.remote_client_cache_size = 0
+        client = self.cache.get('a', object)
+        self.assertIsNot(client, self.cache.get('a', object))
+        self.assertEqual(0, self.cache.stats()['size'])
+
+    def test_nova_client_is_reused_per_token(self):
+        remote.CONF.remote_client_cache_size = 10
+        remote.CLIENT_CACHE.clear()
+        context = ReddwarfContext(tenant='123', auth_tok='token')
+        client = remote.create_nova_client(context)
+        self.assertIs(client, remote.create_nova_client(context))
+        self.assertIsNot(client, remote.create_nova_volume_client(context))
+        other = ReddwarfContext(tenant='123', auth_tok='other')
+        self.assertIsNot(client, remote.create_nova_client(other))
+
+    def test_swift_client_attributes(self):
+        client = remote.create_swift_client(ReddwarfContext(tenant='123'))
+        self.assertEqual(remote.OBJECT_STORE_URL + '123', client.url)
+
+
+class FakeServer(novaclient_base.Resource):
+    def delete(self):
+        self.manager.delete(self)
+
+
+class FakeServers(novaclient_base.Manager):
+    resource_class = FakeServer
+
+    def get(self, server_id):
+        # Yields while in use, so overlapping calls on a client show up.
+        self.assert_not_in_use()
+        self.api.in_use = True
+        eventlet.sleep(0.01)
+        self.api.in_use = False
+        return self.resource_class(self, {'id': server_id})
+
+    def delete(self, server):
+        self.assert_not_in_use()
+        self.api.deleted.append(server.id)
+
+    def assert_not_in_use(self):
+        if self.api.in_use:
+            raise AssertionError("Client used by two green threads.")
+
+
+class FakeNovaClient(object):
+    def __init__(self):
+        self.in_use = False
+        self.deleted = []
+        self.servers = FakeServers(self)
+
+
+class TestPooledClient(testtools.TestCase):
+    def setUp(self):
+        super(TestPooledClient, self).setUp()
+        self.clients = []
+        self.client = remote.PooledClient(self._create)
+
+    def _create(self):
+        client = FakeNovaClient()
+        self.clients.append(client)
+        return client
+
+    def test_concurrent_calls_use_their_own_clients(self):
+        pool = eventlet.GreenPool()
+        servers = list(pool.imap(self.client.servers.get, ['a', 'b', 'c']))
+        self.assertEqual(['a', 'b', 'c'], [server.id for server in servers])
+        self.assertEqual(3, len(self.clients))
+
+    def test_clients_are_reused(self):
+        self.client.servers.get('a')
+        self.client.servers.get('b')
+        self.assertEqual(1, len(self.clients))
+
+    def test_resources_are_bound_to_the_pool(self):
+        server = self.client.servers.get('a')
+        self.assertIsInstance(server.manager, remote.PooledClient)
+        server.delete()
+        self.assertEqual(['a'], self.clients[0].deleted)
@@ -0,0 +1,159 @@
+#    Copyright 2013 OpenStack LLC
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+import eventlet
+import testtools
+
+from reddwarf.common import exception
+from reddwarf.common import utils
+
+
+class PollUntilTest(testtools.TestCase):
+
+    def setUp(self):
+        super(PollUntilTest, self).setUp()
+        utils.POLL_STATS.clear()
+        self.naps = []
+        self.patch(utils.greenthread, 'sleep', self.naps.append)
+
+    def _retriever(self, *values):
+        values = list(values)
+        return lambda: values.pop(0)
+
+    def test_returns_first_value_passing_condition(self):
+        result = utils.poll_until(self._retriever(0, 0, 3), sleep_time=0.01)
+        self.assertEqual(3, result)
+        self.assertEqual([0.01, 0.01], self.naps)
+
+    def test_backs_off_up_to_max_sleep_time(self):
+        utils.poll_until(self._retriever(0, 0, 0, 0, 1), sleep_time=1,
+                         max_sleep_time=3, jitter=0)
+        self.assertEqual([1, 2, 3, 3], self.naps)
+
+    def test_jitter_stays_within_bounds(self):
+        utils.poll_until(self._retriever(*([0] * 20 + [1])), sleep_time=1,
+                         max_sleep_time=1, jitter=0.5)
+        self.assertTrue(all(0.5 <= nap <= 1.5 for nap in self.naps))
+
+    def test_times_out(self):
+        self.assertRaises(exception.PollTimeOut, utils.poll_until,
+                          lambda: time.sleep(0.02), sleep_time=0,
+                          time_out=0.01, name='never')
+        self.assertEqual(1, utils.POLL_STATS.snapshot()['never']['timeouts'])
+
+    def test_records_wait_stats(self):
+        utils.poll_until(self._retriever(0, 1), sleep_time=0, name='thing')
+        utils.poll_until(self._retriever(1), sleep_time=0, name='thing')
+        stats = utils.POLL_STATS.snapshot()['thing']
+        self.assertEqual(2, stats['waits'])
+        self.assertEqual(3, stats['polls'])
+        self.assertEqual(0, stats['timeouts'])
+
+    def test_wake_pollers_cuts_the_wait_short(self):
+        values = [0, 1]
+        waiter = eventlet.spawn(utils.poll_until, lambda: values.pop(0),
+                                sleep_time=60, time_out=120, wake_key='srv')
+        eventlet.sleep(0)
+        start = time.time()
+        utils.wake_pollers('srv')
+        self.assertEqual(1, waiter.wait())
+        self.assertTrue(time.time() - start < 0.5)
+        # The wait is on the wake up itself, not on naps checking for it.
+        self.assertEqual([], self.naps)
+        self.assertNotIn('srv', utils._poll_wakers)
+
+    def test_wake_key_wait_lasts_the_nap(self):
+        start = time.time()
+        self.assertEqual(1, utils.poll_until(self._retriever(0, 1),
+                                             sleep_time=0.05, wake_key='srv'))
+        self.assertTrue(time.time() - start >= 0.05)
+
+
+class LRUDictTest(testtools.TestCase):
+
+    def setUp(self):
+        super(LRUDictTest, self).setUp()
+        self.lru = utils.LRUDict()
+
+    def test_oldest_is_least_recently_set(self):
+        self.lru['a'] = 1
+        self.lru['b'] = 2
+        self.lru['a'] = 3
+        self.assertEqual(('b', 2), self.lru.oldest())
+        del self.lru['b']
+        self.assertEqual(('a', 3), self.lru.oldest())
+
+    def test_pop_and_get(self):
+        self.lru['a'] = 1
+        self.assertEqual(1, self.lru.get('a'))
+        self.assertEqual(1, self.lru.pop('a'))
+        self.assertEqual(None, self.lru.pop('a'))
+        self.assertEqual(0, len(self.lru))
+        self.assertRaises(KeyError, self.lru.oldest)
+
+    def test_order_queue_is_compacted(self):
+        for value in range(100):
+            self.lru['a'] = value
+            self.lru['b'] = value
+        self.assertTrue(len(self.lru._order) <= 2 * len(self.lru) + 16)
+        self.assertEqual(('a', 99), self.lru.oldest())
+
+
+class FanOutTest(testtools.TestCase):
+
+    def test_aggregates_results_and_failures(self):
+        def half(number):
+            if number % 2:
+                raise ValueError(number)
+            return number / 2
+
+        results, failures = utils.fan_out(half, range(5), 2)
+
+        self.assertEqual({0: 0, 2: 1, 4: 2}, results)
+        self.assertEqual([1, 3], sorted(failures))
+        self.assertTrue(isinstance(failures[1], ValueError))
+
+    def test_limits_concurrency(self):
+        running = []
+        most = []
+
+        def work(item):
+            running.append(item)
+            most.append(len(running))
+            eventlet.sleep(0.01)
+            running.remove(item)
+
+        utils.fan_out(work, range(10), 3)
+
+        self.assertEqual(3, max(most))
+
+    def test_abandons_calls_past_the_timeout(self):
+        def work(seconds):
+            eventlet.sleep(seconds)
+            return seconds
+
+        start = time.time()
+        results, failures = utils.fan_out(work, [0, 10], 2, timeout=0.05)
+
+        self.assertTrue(time.time() - start < 5)
+        self.assertEqual({0: 0}, results)
+        self.assertTrue(isinstance(failures[10], eventlet.Timeout))
+
+    def test_keys_by_key_function(self):
+        results, failures = utils.fan_out(lambda item: item['value'],
+                                          [{'id': 'a', 'value': 1}], 1,
+                                          key=lambda item: item['id'])
+        self.assertEqual({'a': 1}, results)
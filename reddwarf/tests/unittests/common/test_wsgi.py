@@ -0,0 +1,102 @@
+#    Copyright 2013 OpenStack LLC
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import socket
+
+import eventlet
+import testtools
+from mock import Mock
+
+from reddwarf.common import wsgi
+
+
+def slow_app(environ, start_response):
+    eventlet.sleep(0.2)
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return ['done']
+
+
+class ServiceTest(testtools.TestCase):
+
+    def setUp(self):
+        super(ServiceTest, self).setUp()
+        self.service = wsgi.Service(slow_app, 0, host='127.0.0.1')
+        self.addCleanup(self.service.stop)
+
+    def _get(self):
+        client = eventlet.connect(('127.0.0.1', self.service.port))
+        client.sendall('GET / HTTP/1.0\r\n\r\n')
+        response = client.makefile().read()
+        client.close()
+        return response
+
+    def test_stop_waits_for_requests_in_progress(self):
+        self.service.start()
+        request = eventlet.spawn(self._get)
+        eventlet.sleep(0.05)
+
+        self.service.stop()
+
+        response = request.wait()
+        self.assertIn('200 OK', response)
+        self.assertTrue(response.endswith('done'))
+        self.assertRaises(socket.error, self._get)
+
+    def test_wait_returns_once_stopped(self):
+        self.service.start()
+        eventlet.spawn_after(0.05, self.service.stop)
+
+        with eventlet.Timeout(5):
+            self.service.wait()
+
+    def test_start_in_forked_worker_resets_connections(self):
+        db_api = Mock()
+        self.patch(wsgi, 'get_db_api', Mock(return_value=db_api))
+        self.patch(wsgi.rpc, '_RPCIMPL', Mock())
+        self.patch(wsgi.rpc, 'cleanup', Mock())
+        self.service._parent_pid = -1
+
+        self.service.start()
+
+        self.assertTrue(db_api.dispose_db.called)
+        self.assertTrue(wsgi.rpc.cleanup.called)
+
+    def test_start_in_parent_keeps_connections(self):
+        self.patch(wsgi, 'get_db_api', Mock())
+
+        self.service.start()
+
+        self.assertFalse(wsgi.get_db_api.called)
+
+
+class LaunchTest(testtools.TestCase):
+
+    def setUp(self):
+        super(LaunchTest, self).setUp()
+        self.patch(wsgi.pastedeploy, 'paste_deploy_app', Mock())
+        self.patch(wsgi.service, 'launch', Mock())
+
+    def _launch(self):
+        wsgi.launch('reddwarf', 0, 'api-paste.ini', host='127.0.0.1')
+        server, = wsgi.service.launch.call_args[0]
+        server._socket.close()
+        return wsgi.service.launch.call_args[1]['workers']
+
+    def test_single_process(self):
+        self.patch(wsgi.CONF, 'api_workers', 1)
+        self.assertEqual(None, self._launch())
+
+    def test_workers(self):
+        self.patch(wsgi.CONF, 'api_workers', 4)
+        self.assertEqual(4, self._launch())
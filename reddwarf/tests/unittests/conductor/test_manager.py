@@ -0,0 +1,193 @@
+#    Copyright 2013 OpenStack LLC
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import testtools
+from mock import Mock
+
+from reddwarf.common import utils
+from reddwarf.conductor.manager import Manager
+from reddwarf.guestagent.models import AgentHeartBeat
+from reddwarf.instance.models import InstanceServiceStatus
+from reddwarf.instance.models import ServiceStatuses
+from reddwarf.openstack.common import timeutils
+from reddwarf.tests.unittests.util import util
+
+
+class ConductorManagerTest(testtools.TestCase):
+
+    def setUp(self):
+        super(ConductorManagerTest, self).setUp()
+        util.init_db()
+        self.manager = Manager()
+        self.instance_ids = [utils.generate_uuid() for _ in range(2)]
+        for instance_id in self.instance_ids:
+            InstanceServiceStatus.create(instance_id=instance_id,
+                                         status=ServiceStatuses.NEW)
+
+    def tearDown(self):
+        super(ConductorManagerTest, self).tearDown()
+        for instance_id in self.instance_ids:
+            InstanceServiceStatus.find_by(instance_id=instance_id).delete()
+            beat = AgentHeartBeat.get_by(instance_id=instance_id)
+            if beat:
+                beat.delete()
+
+    def _status(self, instance_id):
+        return InstanceServiceStatus.find_by(instance_id=instance_id).status
+
+    def test_statuses_are_written_on_flush(self):
+        running, shutdown = self.instance_ids
+        self.manager.update_status(None, running,
+                                   ServiceStatuses.BUILDING.code)
+        self.manager.update_status(None, running,
+                                   ServiceStatuses.RUNNING.code)
+        self.manager.update_status(None, shutdown,
+                                   ServiceStatuses.SHUTDOWN.code)
+        self.assertEqual(ServiceStatuses.NEW, self._status(running))
+
+        self.manager.flush(None)
+
+        self.assertEqual(ServiceStatuses.RUNNING, self._status(running))
+        self.assertEqual(ServiceStatuses.SHUTDOWN, self._status(shutdown))
+
+    def test_older_reports_are_not_written(self):
+        instance_id = self.instance_ids[0]
+        newer, older = Manager(), Manager()
+        newer.update_status(None, instance_id, ServiceStatuses.RUNNING.code,
+                            reported_at='2013-01-01T00:00:02.000000')
+        older.update_status(None, instance_id, ServiceStatuses.SHUTDOWN.code,
+                            reported_at='2013-01-01T00:00:01.000000')
+
+        newer.flush(None)
+        older.flush(None)
+
+        self.assertEqual(ServiceStatuses.RUNNING, self._status(instance_id))
+
+    def test_report_made_before_a_save_is_not_written(self):
+        instance_id = self.instance_ids[0]
+        self.manager.update_status(None, instance_id,
+                                   ServiceStatuses.RUNNING.code,
+                                   reported_at=timeutils.strtime())
+        status = InstanceServiceStatus.find_by(instance_id=instance_id)
+        status.set_status(ServiceStatuses.PAUSED)
+        status.save()
+
+        self.manager.flush(None)
+
+        self.assertEqual(ServiceStatuses.PAUSED, self._status(instance_id))
+
+    def test_latest_report_is_kept(self):
+        instance_id = self.instance_ids[0]
+        self.manager.update_status(None, instance_id,
+                                   ServiceStatuses.RUNNING.code,
+                                   reported_at='2013-01-01T00:00:02.000000')
+        self.manager.update_status(None, instance_id,
+                                   ServiceStatuses.SHUTDOWN.code,
+                                   reported_at='2013-01-01T00:00:01.000000')
+
+        self.manager.flush(None)
+
+        self.assertEqual(ServiceStatuses.RUNNING, self._status(instance_id))
+
+    def test_unknown_instance_is_ignored(self):
+        self.manager.update_status(None, 'unknown',
+                                   ServiceStatuses.RUNNING.code)
+        self.manager.flush(None)
+        self.assertEqual(None, InstanceServiceStatus.get_by(
+            instance_id='unknown'))
+
+    def test_heartbeats_are_created_then_updated(self):
+        instance_id = self.instance_ids[0]
+        self.manager.heartbeat(None, instance_id)
+        self.manager.flush(None)
+        first = AgentHeartBeat.find_by(instance_id=instance_id).updated_at
+
+        self.manager.heartbeat(None, instance_id)
+        self.manager.flush(None)
+
+        beats = AgentHeartBeat.find_all(instance_id=instance_id).all()
+        self.assertEqual(1, len(beats))
+        self.assertTrue(beats[0].updated_at >= first)
+
+    def test_flush_empties_the_queue(self):
+        self.manager.update_status(None, self.instance_ids[0],
+                                   ServiceStatuses.RUNNING.code)
+        self.manager.flush(None)
+        self.patch(InstanceServiceStatus, 'save_all', Mock())
+
+        self.manager.flush(None)
+
+        self.assertFalse(InstanceServiceStatus.save_all.called)
+
+    def _fail_once(self, model, exc):
+        save_all = model.save_all
+        calls = []
+
+        def fail_once(models):
+            calls.append(models)
+            if len(calls) == 1:
+                raise exc
+            return save_all(models)
+        self.patch(model, 'save_all', staticmethod(fail_once))
+
+    def test_failed_status_write_is_retried(self):
+        instance_id = self.instance_ids[0]
+        self.manager.update_status(None, instance_id,
+                                   ServiceStatuses.RUNNING.code)
+        self._fail_once(InstanceServiceStatus, RuntimeError("db blip"))
+
+        self.manager.flush(None)
+        self.assertEqual(ServiceStatuses.NEW, self._status(instance_id))
+
+        self.manager.flush(None)
+        self.assertEqual(ServiceStatuses.RUNNING, self._status(instance_id))
+
+    def test_retried_status_does_not_replace_a_later_report(self):
+        instance_id = self.instance_ids[0]
+        self.manager.update_status(None, instance_id,
+                                   ServiceStatuses.RUNNING.code,
+                                   reported_at='2013-01-01T00:00:01.000000')
+        self._fail_once(InstanceServiceStatus, RuntimeError("db blip"))
+        self.manager.flush(None)
+
+        self.manager.update_status(None, instance_id,
+                                   ServiceStatuses.SHUTDOWN.code,
+                                   reported_at='2013-01-01T00:00:02.000000')
+        self.manager.flush(None)
+
+        self.assertEqual(ServiceStatuses.SHUTDOWN, self._status(instance_id))
+
+    def test_heartbeats_are_written_when_statuses_fail(self):
+        instance_id = self.instance_ids[0]
+        self.manager.update_status(None, instance_id,
+                                   ServiceStatuses.RUNNING.code)
+        self.manager.heartbeat(None, instance_id)
+        self._fail_once(InstanceServiceStatus, RuntimeError("db blip"))
+
+        self.manager.flush(None)
+
+        self.assertNotEqual(None, AgentHeartBeat.get_by(
+            instance_id=instance_id))
+
+    def test_failed_heartbeat_write_is_retried(self):
+        instance_id = self.instance_ids[0]
+        self.manager.heartbeat(None, instance_id)
+        self._fail_once(AgentHeartBeat, RuntimeError("db blip"))
+
+        self.manager.flush(None)
+        self.assertEqual(None, AgentHeartBeat.get_by(instance_id=instance_id))
+
+        self.manager.flush(None)
+        self.assertNotEqual(None, AgentHeartBeat.get_by(
+            instance_id=instance_id))
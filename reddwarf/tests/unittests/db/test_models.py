@@ -0,0 +1,179 @@
+#    Copyright 2013 OpenStack LLC
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+
+import eventlet
+import testtools
+
+from reddwarf.common import exception
+from reddwarf.common import utils
+from reddwarf.db.sqlalchemy import session
+from reddwarf.quota.models import Quota
+from reddwarf.tests.unittests.util import util
+
+TENANT = 'db-models-tenant'
+
+
+class BulkSaveTest(testtools.TestCase):
+
+    def setUp(self):
+        super(BulkSaveTest, self).setUp()
+        util.init_db()
+        self.statements = util.record_statements(self)
+
+    def tearDown(self):
+        super(BulkSaveTest, self).tearDown()
+        Quota.find_all(tenant_id=TENANT).delete()
+
+    def _limits(self):
+        return dict((quota.resource, quota.hard_limit)
+                    for quota in Quota.find_all(tenant_id=TENANT))
+
+    def test_create_all(self):
+        quotas = Quota.create_all([
+            {'tenant_id': TENANT, 'resource': 'instances', 'hard_limit': 1},
+            {'tenant_id': TENANT, 'resource': 'volumes', 'hard_limit': 2}])
+
+        self.assertEqual(['INSERT'], self.statements)
+        self.assertNotEqual(quotas[0].id, quotas[1].id)
+        self.assertEqual({'instances': 1, 'volumes': 2}, self._limits())
+
+    def test_create_all_conflict(self):
+        Quota.create(tenant_id=TENANT, resource='instances', hard_limit=1)
+
+        self.assertRaises(exception.DBConstraintError, Quota.create_all,
+                          [{'tenant_id': TENANT, 'resource': 'instances',
+                            'hard_limit': 2}])
+
+    def test_create_does_not_read(self):
+        Quota.create(tenant_id=TENANT, resource='instances', hard_limit=1)
+
+        self.assertEqual(['INSERT'], self.statements)
+
+    def test_save_all(self):
+        existing = Quota.create(tenant_id=TENANT, resource='instances',
+                                hard_limit=1)
+        existing.hard_limit = 5
+        new = Quota(tenant_id=TENANT, resource='volumes', hard_limit=2,
+                    id='new-quota-id')
+        del self.statements[:]
+
+        Quota.save_all([existing, new])
+
+        self.assertEqual(['INSERT', 'SELECT', 'UPDATE'],
+                         sorted(self.statements))
+        self.assertEqual({'instances': 5, 'volumes': 2}, self._limits())
+
+
+class SharedSessionTest(testtools.TestCase):
+
+    def setUp(self):
+        super(SharedSessionTest, self).setUp()
+        util.init_db()
+        self.statements = util.record_statements(self)
+
+    def tearDown(self):
+        super(SharedSessionTest, self).tearDown()
+        Quota.find_all(tenant_id=TENANT).delete()
+
+    def test_save_does_not_reload(self):
+        Quota.create(tenant_id=TENANT, resource='instances', hard_limit=1)
+        del self.statements[:]
+
+        with session.shared_session():
+            quota = Quota.find_by(tenant_id=TENANT, resource='instances')
+            quota.hard_limit = 2
+            quota.save()
+
+        self.assertEqual(['SELECT', 'UPDATE'], self.statements)
+        self.assertEqual(2, Quota.find_by(tenant_id=TENANT).hard_limit)
+
+    def test_save_writes_only_the_saved_model(self):
+        instances = Quota.create(tenant_id=TENANT, resource='instances',
+                                 hard_limit=1)
+        volumes = Quota.create(tenant_id=TENANT, resource='volumes',
+                               hard_limit=1)
+
+        with session.shared_session():
+            changed = Quota.find_by(id=instances.id)
+            changed.hard_limit = 2
+            saved = Quota.find_by(id=volumes.id)
+            saved.hard_limit = 3
+            saved.save()
+
+        self.assertEqual(1, Quota.find_by(id=instances.id).hard_limit)
+        self.assertEqual(3, Quota.find_by(id=volumes.id).hard_limit)
+
+    def test_reads_keep_unsaved_changes(self):
+        quota = Quota.create(tenant_id=TENANT, resource='instances',
+                             hard_limit=1)
+
+        with session.shared_session():
+            loaded = Quota.find_by(id=quota.id)
+            loaded.hard_limit = 2
+            self.assertIs(loaded, Quota.find_by(id=quota.id))
+            self.assertEqual(2, loaded.hard_limit)
+
+    def test_transactions_write_only_their_models(self):
+        quota = Quota.create(tenant_id=TENANT, resource='instances',
+                             hard_limit=1)
+
+        with session.shared_session():
+            changed = Quota.find_by(id=quota.id)
+            changed.hard_limit = 2
+            Quota.create_all([{'tenant_id': TENANT, 'resource': 'volumes',
+                               'hard_limit': 1}])
+
+        self.assertEqual(1, Quota.find_by(id=quota.id).hard_limit)
+
+    def test_sessions_are_per_greenthread(self):
+        with session.shared_session():
+            shared = session.get_session()
+            self.assertIs(shared, session.get_session())
+            other = eventlet.spawn(session.get_session).wait()
+
+        self.assertIsNot(shared, other)
+        self.assertIsNot(shared, session.get_session())
+
+
+class PaginationTest(testtools.TestCase):
+
+    def setUp(self):
+        super(PaginationTest, self).setUp()
+        util.init_db()
+        created = utils.utcnow()
+        # Created out of id order, and with ties, to check both keys.
+        for id, seconds in [('c', 0), ('a', 1), ('b', 1), ('d', 2)]:
+            Quota(tenant_id=TENANT, resource=id, hard_limit=1,
+                  id='pagination-' + id,
+                  created=created + datetime.timedelta(seconds=seconds)
+                  ).save()
+
+    def tearDown(self):
+        super(PaginationTest, self).tearDown()
+        Quota.find_all(tenant_id=TENANT).delete()
+
+    def _page(self, marker=None):
+        return Quota.find_all(tenant_id=TENANT).paginated_collection(
+            limit=2, marker=marker)
+
+    def test_pages_in_creation_order(self):
+        first, marker = self._page()
+        self.assertEqual(['c', 'a'], [quota.resource for quota in first])
+        self.assertEqual('pagination-a', marker)
+
+        second, marker = self._page(marker)
+        self.assertEqual(['b', 'd'], [quota.resource for quota in second])
+        self.assertEqual(None, marker)
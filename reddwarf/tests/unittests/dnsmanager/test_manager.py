@@ -0,0 +1,60 @@
+#    Copyright 2013 OpenStack LLC
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import testtools
+from reddwarf.common import remote
+from reddwarf.dns import driver
+from reddwarf.dns.manager import DnsManager
+
+
+class CountingDnsDriver(driver.DnsDriver):
+
+    instances = 0
+
+    def __init__(self):
+        super(CountingDnsDriver, self).__init__()
+        CountingDnsDriver.instances += 1
+
+
+class NamedEntryFactory(object):
+
+    def create_entry(self, instance_id):
+        return driver.DnsEntry(name="%s.example.com" % instance_id,
+                               content=None, type="A")
+
+
+DRIVER = "reddwarf.tests.unittests.dnsmanager.test_manager.CountingDnsDriver"
+FACTORY = "reddwarf.tests.unittests.dnsmanager.test_manager.NamedEntryFactory"
+
+
+class DnsManagerTest(testtools.TestCase):
+
+    def setUp(self):
+        super(DnsManagerTest, self).setUp()
+        self.manager = DnsManager(DRIVER, FACTORY)
+        self.manager.driver_class.instances = 0
+
+    def test_determine_hostname_does_not_build_driver(self):
+        self.assertEqual("abc.example.com",
+                         self.manager.determine_hostname("abc"))
+        self.assertEqual(0, self.manager.driver_class.instances)
+
+    def test_driver_is_built_once(self):
+        self.manager.create_instance_entry("abc", ["10.0.0.1"])
+        self.manager.delete_instance_entry("abc")
+        self.assertEqual(1, self.manager.driver_class.instances)
+
+    def test_dns_client_is_shared(self):
+        self.assertIs(remote.create_dns_client(None),
+                      remote.create_dns_client(None))
@@ -0,0 +1,108 @@
+#    Copyright 2013 OpenStack LLC
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import testtools
+from mock import Mock
+
+from reddwarf.common import exception
+from reddwarf.common import utils
+from reddwarf.extensions.mgmt.host import models
+from reddwarf.instance import models as instance_models
+from reddwarf.instance.tasks import InstanceTasks
+from reddwarf.tests.unittests.util import util
+
+
+class DetailedHostTest(testtools.TestCase):
+
+    def setUp(self):
+        super(DetailedHostTest, self).setUp()
+        util.init_db()
+        self.instances = []
+        for status in [instance_models.ServiceStatuses.RUNNING,
+                       instance_models.ServiceStatuses.SHUTDOWN]:
+            db_info = instance_models.DBInstance.create(
+                name='instance', flavor_id=1, tenant_id='tenant',
+                volume_size=1, compute_instance_id=utils.generate_uuid(),
+                task_status=InstanceTasks.NONE)
+            instance_models.InstanceServiceStatus.create(
+                instance_id=db_info.id, status=status)
+            self.instances.append(db_info)
+
+    def tearDown(self):
+        super(DetailedHostTest, self).tearDown()
+        for db_info in self.instances:
+            instance_models.InstanceServiceStatus.find_by(
+                instance_id=db_info.id).delete()
+            db_info.delete()
+
+    def test_instances_are_loaded_together(self):
+        self.patch(instance_models.DBInstance, 'find_by',
+                   Mock(side_effect=AssertionError("Loaded one at a time")))
+        servers = [{'uuid': db_info.compute_instance_id}
+                   for db_info in self.instances]
+        servers.append({'uuid': 'unknown-server'})
+        host_info = Mock(instances=servers)
+
+        host = models.DetailedHost(host_info)
+
+        running, shutdown, unknown = host.instances
+        self.assertEqual(self.instances[0].id, running['id'])
+        self.assertEqual('tenant', running['tenant_id'])
+        self.assertEqual('ACTIVE', running['status'])
+        self.assertEqual(self.instances[1].id, shutdown['id'])
+        self.assertEqual('SHUTDOWN', shutdown['status'])
+        self.assertEqual('unknown-server', unknown['server_id'])
+        self.assertEqual(None, unknown['id'])
+
+
+class DetailedHostUpdateAllTest(testtools.TestCase):
+
+    def setUp(self):
+        super(DetailedHostUpdateAllTest, self).setUp()
+        self.host = models.DetailedHost.__new__(models.DetailedHost)
+        self.host.name = 'host'
+        self.host.instances = [{'id': 'instance%d' % index}
+                               for index in range(4)]
+        self.updated = []
+        self.running = []
+        self.most_running = 0
+        self.patch(models, 'create_guest_client', self._guest_client)
+
+    def _guest_client(self, context, instance_id):
+        def update_guest():
+            self.running.append(instance_id)
+            self.most_running = max(self.most_running, len(self.running))
+            eventlet.sleep(0.01)
+            self.running.remove(instance_id)
+            if instance_id == 'instance2':
+                raise exception.GuestTimeout()
+            self.updated.append(instance_id)
+        return Mock(update_guest=update_guest)
+
+    def test_failures_are_collected(self):
+        error = self.assertRaises(exception.UpdateGuestError,
+                                  self.host.update_all, None)
+        self.assertIn('instance2', str(error))
+        self.assertEqual(['instance0', 'instance1', 'instance3'],
+                         sorted(self.updated))
+
+    def test_guests_are_updated_together(self):
+        del self.host.instances[2]
+        self.patch(models.CONF, 'host_update_concurrency', 2)
+
+        self.host.update_all(None)
+
+        self.assertEqual(2, self.most_running)
+        self.assertEqual(3, len(self.updated))
@@ -0,0 +1,104 @@
+#    Copyright 2013 OpenStack LLC
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import testtools
+from mock import Mock
+
+from reddwarf.common import exception
+from reddwarf.extensions.mysql import models
+from reddwarf.instance import models as base_models
+
+
+class LoadAndVerifyTest(testtools.TestCase):
+
+    def setUp(self):
+        super(LoadAndVerifyTest, self).setUp()
+        models._verified_instances.clear()
+        self.status = Mock(status=base_models.ServiceStatuses.RUNNING)
+        self.load = Mock(return_value=(Mock(), self.status))
+        self.orig_load = base_models.load_db_info_and_service_status
+        base_models.load_db_info_and_service_status = self.load
+        self.context = Mock(tenant='tenant', is_admin=False)
+
+    def tearDown(self):
+        super(LoadAndVerifyTest, self).tearDown()
+        base_models.load_db_info_and_service_status = self.orig_load
+        models._verified_instances.clear()
+
+    def test_running_instance_is_cached(self):
+        models.load_and_verify(self.context, 'instance')
+        models.load_and_verify(self.context, 'instance')
+        self.assertEqual(1, self.load.call_count)
+
+    def test_cache_is_per_tenant(self):
+        models.load_and_verify(self.context, 'instance')
+        models.load_and_verify(Mock(tenant='other', is_admin=False),
+                               'instance')
+        self.assertEqual(2, self.load.call_count)
+
+    def test_not_running_instance_is_not_cached(self):
+        self.status.status = base_models.ServiceStatuses.SHUTDOWN
+        for _ in range(2):
+            self.assertRaises(exception.UnprocessableEntity,
+                              models.load_and_verify, self.context,
+                              'instance')
+        self.assertEqual(2, self.load.call_count)
+
+    def test_cache_disabled(self):
+        self.patch(models.CONF, 'instance_ready_cache_ttl', 0)
+        models.load_and_verify(self.context, 'instance')
+        models.load_and_verify(self.context, 'instance')
+        self.assertEqual(2, self.load.call_count)
+
+
+class CreateTest(testtools.TestCase):
+
+    def setUp(self):
+        super(CreateTest, self).setUp()
+        self.client = Mock()
+        self.patch(models, 'load_and_verify', Mock())
+        self.patch(models, 'create_guest_client',
+                   Mock(return_value=self.client))
+        self.context = Mock()
+        self.users = [{'_name': 'user1', '_host': '%'}]
+        self.schemas = [{'_name': 'db1'}]
+
+    def test_create_users(self):
+        self.client.create_users.return_value = [
+            {'_name': 'user1', '_host': '%', 'exists': False}]
+        models.User.create(self.context, 'instance', self.users)
+        self.assertFalse(self.client.create_user.called)
+
+    def test_create_existing_user(self):
+        self.client.create_users.return_value = [
+            {'_name': 'user1', '_host': '%', 'exists': True}]
+        self.assertRaises(exception.UserAlreadyExists, models.User.create,
+                          self.context, 'instance', self.users)
+
+    def test_create_users_on_old_agent(self):
+        self.client.create_users.side_effect = exception.GuestMethodNotFound(
+            method='create_users')
+        self.client.list_users.return_value = ([], None)
+        models.User.create(self.context, 'instance', self.users)
+        self.client.create_user.assert_called_once_with(self.users)
+
+    def test_create_databases_on_old_agent(self):
+        self.client.create_databases.side_effect = (
+            exception.GuestMethodNotFound(method='create_databases'))
+        self.client.list_databases.return_value = (
+            [{'_name': 'db1', '_collate': '', '_character_set': ''}], None)
+        self.assertRaises(exception.DatabaseAlreadyExists,
+                          models.Schema.create, self.context, 'instance',
+                          self.schemas)
+        self.assertFalse(self.client.create_database.called)
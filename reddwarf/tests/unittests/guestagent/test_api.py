@@ -18,6 +18,7 @@ import testtools
 from testtools.matchers import KeysEqual, Is
 
 import reddwarf.openstack.common.rpc as rpc
+from reddwarf.openstack.common.rpc import common as rpc_common
 from reddwarf.guestagent import models as agent_models
 import reddwarf.db.models as db_models
 from reddwarf.common import exception
@@ -33,6 +34,10 @@ class ApiTest(testtools.TestCase):
             ValueError('Unexpected Rpc Invocation'))
         when(rpc).cast(any(), any(), any()).thenRaise(
             ValueError('Unexpected Rpc Invocation'))
+        api._HEARTBEATS.clear()
+        when(db_models.DatabaseModelBase).find_by(
+            instance_id=any()).thenReturn('agent')
+        when(agent_models.AgentHeartBeat).is_active('agent').thenReturn(True)
 
     def tearDown(self):
         super(ApiTest, self).tearDown()
@@ -71,12 +76,64 @@ class ApiTest(testtools.TestCase):
         when(agent_models.AgentHeartBeat).is_active(any()).thenReturn(False)
         self.assertRaises(exception.GuestTimeout, self.api._check_for_hearbeat)
 
+    def test_check_for_heartbeat_cached(self):
+        self.assertTrue(self.api._check_for_hearbeat())
+        self.assertTrue(api.API(mock(), self.FAKE_ID)._check_for_hearbeat())
+        verify(db_models.DatabaseModelBase, times=1).find_by(
+            instance_id=self.FAKE_ID)
+
+    def test_check_for_heartbeat_cache_expires(self):
+        self.assertTrue(self.api._check_for_hearbeat())
+        read_at, agent = api._HEARTBEATS[self.FAKE_ID]
+        api._HEARTBEATS[self.FAKE_ID] = (
+            read_at - api.CONF.agent_heartbeat_cache_time, agent)
+        self.assertTrue(self.api._check_for_hearbeat())
+        verify(db_models.DatabaseModelBase, times=2).find_by(
+            instance_id=self.FAKE_ID)
+
+    def test_check_for_heartbeat_cache_evicts_expired(self):
+        self.assertTrue(self.api._check_for_hearbeat())
+        read_at, agent = api._HEARTBEATS[self.FAKE_ID]
+        api._HEARTBEATS[self.FAKE_ID] = (
+            read_at - api.CONF.agent_heartbeat_cache_time, agent)
+        self.assertTrue(api.API(mock(), 'other-id')._check_for_hearbeat())
+        self.assertFalse(self.FAKE_ID in api._HEARTBEATS)
+        self.assertEqual(1, len(api._HEARTBEATS))
+
+    def test_check_for_heartbeat_cache_is_bounded(self):
+        self.patch(api.CONF, 'agent_heartbeat_cache_size', 2)
+        for instance_id in ['id1', 'id2', 'id3']:
+            self.assertTrue(api.API(mock(), instance_id)._check_for_hearbeat())
+        self.assertEqual(2, len(api._HEARTBEATS))
+        self.assertFalse('id1' in api._HEARTBEATS)
+
+    def test_call_fails_fast_without_heartbeat(self):
+        when(agent_models.AgentHeartBeat).is_active(any()).thenReturn(False)
+        self.assertRaises(exception.GuestTimeout, self.api.get_volume_info)
+        verify(rpc, never).call(any(), any(), any(), any(int))
+
     def test_create_user(self):
         exp_msg = RpcMsgMatcher('create_user', 'users')
         self._mock_rpc_cast(exp_msg)
         self.api.create_user('test_user')
         self._verify_rpc_cast(exp_msg)
 
+    def test_create_users(self):
+        exp_msg = RpcMsgMatcher('create_users', 'users')
+        exp_resp = [{'_name': 'test_user', '_host': '%', 'exists': False}]
+        self._mock_rpc_call(exp_msg, exp_resp)
+        act_resp = self.api.create_users(['test_user'])
+        self.assertThat(act_resp, Is(exp_resp))
+        self._verify_rpc_call(exp_msg)
+
+    def test_create_databases(self):
+        exp_msg = RpcMsgMatcher('create_databases', 'databases')
+        exp_resp = [{'_name': 'db1', 'exists': False}]
+        self._mock_rpc_call(exp_msg, exp_resp)
+        act_resp = self.api.create_databases(['db1'])
+        self.assertThat(act_resp, Is(exp_resp))
+        self._verify_rpc_call(exp_msg)
+
     def test_rpc_cast_exception(self):
         exp_msg = RpcMsgMatcher('create_user', 'users')
         when(rpc).cast(any(), any(), exp_msg).thenRaise(IOError('host down'))
@@ -106,6 +163,15 @@ class ApiTest(testtools.TestCase):
 
         self._verify_rpc_call(exp_msg)
 
+    def test_rpc_call_missing_method(self):
+        exp_msg = RpcMsgMatcher('create_users', 'users')
+        when(rpc).call(any(), any(), exp_msg, any(int)).thenRaise(
+            rpc_common.RemoteError('AttributeError',
+                                   "No such RPC function 'create_users'"))
+
+        self.assertRaises(exception.GuestMethodNotFound,
+                          self.api.create_users, ['test_user'])
+
     def test_delete_user(self):
         exp_msg = RpcMsgMatcher('delete_user', 'user')
         self._mock_rpc_cast(exp_msg)
@@ -12,7 +12,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import errno
 import os
+import shutil
+import socket
+import tempfile
+import threading
 import __builtin__
 from random import randint
 import time
@@ -122,6 +127,53 @@ class DbaasTest(testtools.TestCase):
 
         self.assertFalse(dbaas.load_mysqld_options())
 
+    def _listen(self):
+        path = os.path.join(tempfile.mkdtemp(), 'mysqld.sock')
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(server.close)
+        server.bind(path)
+        server.listen(1)
+        return path, server
+
+    def test_probe_mysqld_greeted(self):
+
+        path, server = self._listen()
+
+        def greet():
+            conn, _ = server.accept()
+            conn.sendall('\x4a\x00\x00\x00\x0a')
+            conn.close()
+        greeter = threading.Thread(target=greet)
+        greeter.start()
+
+        self.assertTrue(dbaas.probe_mysqld(path, 5))
+        greeter.join()
+
+    def test_probe_mysqld_silent(self):
+
+        path, server = self._listen()
+
+        self.assertFalse(dbaas.probe_mysqld(path, 0.1))
+
+    def test_probe_mysqld_no_socket(self):
+
+        self.assertRaises(socket.error, dbaas.probe_mysqld,
+                          '/nonexistent/mysqld.sock', 1)
+
+    def test_mysqld_pid(self):
+
+        pid_file = tempfile.NamedTemporaryFile()
+        pid_file.write('1234\n')
+        pid_file.flush()
+
+        self.assertEqual(1234, dbaas.mysqld_pid(pid_file.name))
+        self.assertEqual(None, dbaas.mysqld_pid('/nonexistent/mysqld.pid'))
+
+    def test_process_exists(self):
+
+        self.assertTrue(dbaas.process_exists(os.getpid()))
+
 
 class ResultSetStub(object):
 
@@ -142,6 +194,28 @@ class ResultSetStub(object):
         return self._rows.__repr__()
 
 
+class LocalSqlClientTest(testtools.TestCase):
+
+    def setUp(self):
+        super(LocalSqlClientTest, self).setUp()
+        self.engine = MagicMock(name='engine')
+        self.conn = self.engine.connect.return_value
+
+    def test_flushes_on_commit(self):
+        with dbaas.LocalSqlClient(self.engine):
+            pass
+        self.conn.execute.assert_called_once_with(dbaas.FLUSH)
+        self.conn.begin.return_value.commit.assert_called_once_with()
+        self.conn.close.assert_called_once_with()
+
+    def test_read_only_skips_transaction_and_flush(self):
+        with dbaas.LocalSqlClient(self.engine, read_only=True):
+            pass
+        self.assertFalse(self.conn.begin.called)
+        self.assertFalse(self.conn.execute.called)
+        self.conn.close.assert_called_once_with()
+
+
 class MySqlAdminMockTest(testtools.TestCase):
 
     def tearDown(self):
@@ -433,15 +507,79 @@ class MySqlAdminTest(testtools.TestCase):
 
         self.assertTrue("AND Marker >= '" + marker + "'" in args[0].text)
 
+    def test_create_users(self):
+        dbaas.LocalSqlClient.execute = Mock(return_value=[])
+
+        results = self.mySqlAdmin.create_users([dict(FAKE_USER[0],
+                                                     _host='%')])
+
+        self.assertEqual([{'_name': 'random', '_host': '%',
+                           'exists': False}], results)
+        args, kwargs = dbaas.LocalSqlClient.execute.call_args_list[0]
+        self.assertTrue("(User = :user0 AND Host = :host0)" in args[0].text)
+        self.assertEqual({'user0': 'random', 'host0': '%'}, kwargs)
+        args, _ = dbaas.LocalSqlClient.execute.call_args_list[1]
+        self.assertTrue(args[0].text.startswith("GRANT USAGE ON *.* TO "))
+        self.assertEqual(3, dbaas.LocalSqlClient.execute.call_count)
+
+    def test_create_users_creates_none_if_one_exists(self):
+        dbaas.LocalSqlClient.execute = Mock(
+            return_value=[{'User': 'random', 'Host': '%'}])
+
+        results = self.mySqlAdmin.create_users([FAKE_USER[0]])
+
+        self.assertTrue(results[0]['exists'])
+        self.assertEqual(1, dbaas.LocalSqlClient.execute.call_count)
+
+    def test_create_databases(self):
+        dbaas.LocalSqlClient.execute = Mock(
+            return_value=[{'name': 'testDB2'}])
+
+        results = self.mySqlAdmin.create_databases([FAKE_DB, FAKE_DB_2])
+
+        self.assertEqual([{'_name': 'testDB', 'exists': False},
+                          {'_name': 'testDB2', 'exists': True}], results)
+        args, kwargs = dbaas.LocalSqlClient.execute.call_args
+        self.assertTrue("schema_name IN (:name0, :name1)" in args[0].text)
+        self.assertEqual({'name0': 'testDB', 'name1': 'testDB2'}, kwargs)
+        self.assertEqual(1, dbaas.LocalSqlClient.execute.call_count)
+
+    def test_list_users_associates_dbs_in_one_query(self):
+        user_rows = MagicMock()
+        user_rows.__iter__.return_value = iter([
+            {'User': 'alice', 'Host': '%', 'Marker': 'alice@%'},
+            {'User': 'bob', 'Host': '%', 'Marker': 'bob@%'}])
+        user_rows.rowcount = 2
+        grant_rows = [{'grantee': "'alice'@'%'", 'table_schema': 'db1'},
+                      {'grantee': "'bob'@'%'", 'table_schema': 'db2'},
+                      {'grantee': "'alice'@'%'", 'table_schema': 'db3'}]
+        dbaas.LocalSqlClient.execute = Mock(side_effect=[user_rows,
+                                                         grant_rows])
+
+        users, next_marker = self.mySqlAdmin.list_users(limit=10)
+
+        self.assertEqual(2, dbaas.LocalSqlClient.execute.call_count)
+        args, kwargs = dbaas.LocalSqlClient.execute.call_args
+        self.assertTrue("grantee IN (:grantee0, :grantee1)" in args[0].text)
+        self.assertEqual(set(["'alice'@'%'", "'bob'@'%'"]),
+                         set(kwargs.values()))
+        self.assertEqual(['db1', 'db3'],
+                         [db['_name'] for db in users[0]['_databases']])
+        self.assertEqual(['db2'],
+                         [db['_name'] for db in users[1]['_databases']])
+        self.assertIsNone(next_marker)
+
 
 class MySqlAppTest(testtools.TestCase):
 
     def setUp(self):
         super(MySqlAppTest, self).setUp()
+        self.patch(dbaas.CONF, 'remote_implementation', 'fake')
         self.orig_utils_execute_with_timeout = dbaas.utils.execute_with_timeout
         self.orig_time_sleep = time.sleep
         util.init_db()
-        self.FAKE_ID = randint(1, 10000)
+        self.FAKE_ID = str(randint(1, 10000))
+        self.patch(dbaas.CONF, 'guest_id', self.FAKE_ID)
         InstanceServiceStatus.create(instance_id=self.FAKE_ID,
                                      status=ServiceStatuses.NEW)
         self.appStatus = FakeAppStatus(self.FAKE_ID, ServiceStatuses.NEW)
@@ -996,6 +1134,7 @@ class MySqlAppStatusTest(testtools.TestCase):
 
     def setUp(self):
         super(MySqlAppStatusTest, self).setUp()
+        self.patch(dbaas.CONF, 'remote_implementation', 'fake')
         util.init_db()
         self.orig_utils_execute_with_timeout = dbaas.utils.execute_with_timeout
         self.orig_load_mysqld_options = dbaas.load_mysqld_options
@@ -1045,40 +1184,97 @@ class MySqlAppStatusTest(testtools.TestCase):
 
     def test_get_actual_db_status(self):
 
-        dbaas.utils.execute_with_timeout = Mock(return_value=(None, None))
+        self.patch(dbaas, 'probe_mysqld', Mock(return_value=True))
 
         self.mySqlAppStatus = MySqlAppStatus()
         status = self.mySqlAppStatus._get_actual_db_status()
 
         self.assertEqual(ServiceStatuses.RUNNING, status)
 
+    def test_get_actual_db_status_silent(self):
+
+        self.patch(dbaas, 'probe_mysqld', Mock(return_value=False))
+
+        self.mySqlAppStatus = MySqlAppStatus()
+        status = self.mySqlAppStatus._get_actual_db_status()
+
+        self.assertEqual(ServiceStatuses.BLOCKED, status)
+
     def test_get_actual_db_status_error_shutdown(self):
 
-        from reddwarf.common.exception import ProcessExecutionError
-        mocked = Mock(side_effect=ProcessExecutionError())
-        dbaas.utils.execute_with_timeout = mocked
-        dbaas.load_mysqld_options = Mock()
-        dbaas.os.path.exists = Mock(return_value=False)
+        self.patch(dbaas, 'probe_mysqld',
+                   Mock(side_effect=socket.error(errno.ENOENT, "No file")))
+        self.patch(dbaas, 'mysqld_pid', Mock(return_value=None))
 
         self.mySqlAppStatus = MySqlAppStatus()
         status = self.mySqlAppStatus._get_actual_db_status()
 
         self.assertEqual(ServiceStatuses.SHUTDOWN, status)
 
-    def test_get_actual_db_status_error_crashed(self):
+    def test_get_actual_db_status_error_blocked(self):
 
-        from reddwarf.common.exception import ProcessExecutionError
-        dbaas.utils.execute_with_timeout = \
-            MagicMock(side_effect=[ProcessExecutionError(),
-                                   ("some output", None)])
-        dbaas.load_mysqld_options = Mock()
-        dbaas.os.path.exists = Mock(return_value=True)
+        self.patch(dbaas, 'probe_mysqld',
+                   Mock(side_effect=socket.error(errno.ECONNREFUSED, "No")))
+        self.patch(dbaas, 'mysqld_pid', Mock(return_value=1234))
+        self.patch(dbaas, 'process_exists', Mock(return_value=True))
 
         self.mySqlAppStatus = MySqlAppStatus()
         status = self.mySqlAppStatus._get_actual_db_status()
 
         self.assertEqual(ServiceStatuses.BLOCKED, status)
 
+    def test_get_actual_db_status_error_crashed(self):
+
+        self.patch(dbaas, 'probe_mysqld',
+                   Mock(side_effect=socket.error(errno.ECONNREFUSED, "No")))
+        self.patch(dbaas, 'mysqld_pid', Mock(return_value=1234))
+        self.patch(dbaas, 'process_exists', Mock(return_value=False))
+
+        self.mySqlAppStatus = MySqlAppStatus()
+        status = self.mySqlAppStatus._get_actual_db_status()
+
+        self.assertEqual(ServiceStatuses.CRASHED, status)
+
+    def test_update_reports_changed_status(self):
+
+        self.mySqlAppStatus = MySqlAppStatus()
+        self.mySqlAppStatus.set_status(ServiceStatuses.RUNNING)
+        self.mySqlAppStatus._get_actual_db_status = \
+            Mock(return_value=ServiceStatuses.SHUTDOWN)
+        self.mySqlAppStatus.set_status = Mock()
+
+        self.mySqlAppStatus.update()
+
+        self.mySqlAppStatus.set_status.assert_called_once_with(
+            ServiceStatuses.SHUTDOWN)
+
+    def test_update_skips_unchanged_status(self):
+
+        self.mySqlAppStatus = MySqlAppStatus()
+        self.mySqlAppStatus.set_status(ServiceStatuses.RUNNING)
+        self.mySqlAppStatus._get_actual_db_status = \
+            Mock(return_value=ServiceStatuses.RUNNING)
+        self.mySqlAppStatus.set_status = Mock()
+
+        self.mySqlAppStatus.update()
+
+        self.assertFalse(self.mySqlAppStatus.set_status.called)
+
+    def test_update_resyncs_unchanged_status(self):
+
+        self.mySqlAppStatus = MySqlAppStatus()
+        self.mySqlAppStatus.set_status(ServiceStatuses.RUNNING)
+        self.mySqlAppStatus._reported_at -= (
+            dbaas.CONF.agent_status_resync_interval)
+        self.mySqlAppStatus._get_actual_db_status = \
+            Mock(return_value=ServiceStatuses.RUNNING)
+        self.mySqlAppStatus.set_status = Mock()
+
+        self.mySqlAppStatus.update()
+
+        self.mySqlAppStatus.set_status.assert_called_once_with(
+            ServiceStatuses.RUNNING)
+
     def test_is_mysql_installed(self):
 
         self.mySqlAppStatus = MySqlAppStatus()
@@ -19,6 +19,7 @@ import testtools
 from testtools.matchers import Is, Equals, Not
 from reddwarf.common.context import ReddwarfContext
 
+from reddwarf.conductor import api as conductor_api
 from reddwarf.guestagent.manager import Manager
 from reddwarf.guestagent import dbaas, backup
 from reddwarf.guestagent.volume import VolumeDevice
@@ -42,6 +43,11 @@ class GuestAgentManagerTest(testtools.TestCase):
         verify(dbaas.MySqlAppStatus).get()
         verify(mock_status).update()
 
+    def test_report_heartbeat(self):
+        when(conductor_api.API).heartbeat(any()).thenReturn(None)
+        self.manager.report_heartbeat(self.context)
+        verify(conductor_api.API).heartbeat(dbaas.CONF.guest_id)
+
     def test_create_database(self):
         when(dbaas.MySqlAdmin).create_database(['db1']).thenReturn(None)
         self.manager.create_database(self.context, ['db1'])
@@ -57,6 +63,16 @@ class GuestAgentManagerTest(testtools.TestCase):
         self.manager.create_database(self.context, None)
         verify(dbaas.MySqlAdmin, never).create_database(any())
 
+    def test_create_databases(self):
+        when(dbaas.MySqlAdmin).create_databases(['db1']).thenReturn('result')
+        self.assertEqual('result',
+                         self.manager.create_databases(self.context, ['db1']))
+
+    def test_create_users(self):
+        when(dbaas.MySqlAdmin).create_users(['user1']).thenReturn('result')
+        self.assertEqual('result',
+                         self.manager.create_users(self.context, ['user1']))
+
     def test_create_user(self):
         when(dbaas.MySqlAdmin).create_user(['user1']).thenReturn(None)
         self.manager.create_user(self.context, ['user1'])
@@ -19,6 +19,7 @@ from reddwarf.common import utils
 from reddwarf.db.sqlalchemy import api as dbapi
 from reddwarf.db import models as dbmodels
 from datetime import datetime
+from datetime import timedelta
 
 
 class AgentHeartBeatTest(testtools.TestCase):
@@ -66,3 +67,10 @@ class AgentHeartBeatTest(testtools.TestCase):
         mock = models.AgentHeartBeat()
         models.AgentHeartBeat.__setitem__(mock, 'updated_at', datetime.now())
         self.assertTrue(models.AgentHeartBeat.is_active(mock))
+
+    def test_is_active_old_heartbeat(self):
+        mock = models.AgentHeartBeat()
+        models.AgentHeartBeat.__setitem__(
+            mock, 'updated_at',
+            utils.utcnow() - timedelta(seconds=models.AGENT_HEARTBEAT + 1))
+        self.assertFalse(models.AgentHeartBeat.is_active(mock))
@@ -0,0 +1,230 @@
+#    Copyright 2013 OpenStack LLC
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import eventlet
+import testtools
+from datetime import timedelta
+from mock import Mock
+from novaclient import base as novaclient_base
+from novaclient import exceptions as nova_exceptions
+from reddwarf.common import cfg
+from reddwarf.common import exception
+from reddwarf.common import remote
+from reddwarf.common import utils
+from reddwarf.instance import models
+from reddwarf.instance.tasks import InstanceTasks
+from reddwarf.tests.unittests.util import util
+
+CONF = cfg.CONF
+
+
+class ServiceStatusBatchLoadTest(testtools.TestCase):
+
+    def setUp(self):
+        super(ServiceStatusBatchLoadTest, self).setUp()
+        util.init_db()
+        self.tenant = 'TENANT-' + str(utils.utcnow())
+        self.instances = []
+        for index in range(3):
+            db_info = models.DBInstance.create(
+                name='instance%d' % index, flavor_id=1,
+                tenant_id=self.tenant, volume_size=1,
+                compute_instance_id='server%d' % index,
+                task_status=InstanceTasks.NONE)
+            models.InstanceServiceStatus.create(
+                instance_id=db_info.id,
+                status=models.ServiceStatuses.RUNNING)
+            self.instances.append(db_info)
+
+    def tearDown(self):
+        super(ServiceStatusBatchLoadTest, self).tearDown()
+        for db_info in self.instances:
+            status = models.InstanceServiceStatus.get_by(
+                instance_id=db_info.id)
+            if status:
+                status.delete()
+            models.DBInstance.find_by(id=db_info.id).delete()
+
+    def test_find_all_by_instance_ids(self):
+        ids = [db_info.id for db_info in self.instances]
+        statuses = models.InstanceServiceStatus.find_all_by_instance_ids(ids)
+        self.assertEqual(sorted(ids), sorted(statuses.keys()))
+        for instance_id, status in statuses.items():
+            self.assertEqual(instance_id, status.instance_id)
+            self.assertEqual(models.ServiceStatuses.RUNNING, status.status)
+
+    def test_find_all_by_instance_ids_empty(self):
+        statuses = models.InstanceServiceStatus.find_all_by_instance_ids([])
+        self.assertEqual({}, statuses)
+
+    def test_load_servers_status_skips_missing_status(self):
+        orphan = models.DBInstance.create(name='orphan', flavor_id=1,
+                                          tenant_id=self.tenant,
+                                          volume_size=1,
+                                          compute_instance_id='orphan',
+                                          task_status=InstanceTasks.NONE)
+        self.instances.append(orphan)
+
+        def find_server(instance_id, server_id):
+            if server_id == 'server0':
+                raise exception.ComputeInstanceNotFound(
+                    instance_id=instance_id, server_id=server_id)
+            return Mock(status='ACTIVE')
+
+        db_infos = models.DBInstance.find_all(tenant_id=self.tenant)
+        loaded = models.Instances._load_servers_status(
+            lambda context, db, status: (db, status), None, db_infos,
+            find_server)
+
+        loaded_ids = sorted(db.id for db, status in loaded)
+        self.assertEqual(sorted(db_info.id for db_info in self.instances[:3]),
+                         loaded_ids)
+        server_statuses = dict((db.compute_instance_id, db.server_status)
+                               for db, status in loaded)
+        self.assertEqual("SHUTDOWN", server_statuses['server0'])
+        self.assertEqual("ACTIVE", server_statuses['server1'])
+
+    def test_load_db_info_and_service_status(self):
+        context = Mock(is_admin=False, tenant=self.tenant)
+        db_info, status = models.load_db_info_and_service_status(
+            context, self.instances[1].id)
+        self.assertEqual(self.instances[1].id, db_info.id)
+        self.assertEqual(self.instances[1].id, status.instance_id)
+        self.assertEqual(models.ServiceStatuses.RUNNING, status.status)
+
+    def test_load_db_info_and_service_status_other_tenant(self):
+        context = Mock(is_admin=False, tenant='someone else')
+        self.assertRaises(exception.NotFound,
+                          models.load_db_info_and_service_status,
+                          context, self.instances[1].id)
+
+
+class ServerLookupTest(testtools.TestCase):
+
+    def setUp(self):
+        super(ServerLookupTest, self).setUp()
+        self.servers = dict((server_id, Mock(id=server_id))
+                            for server_id in ['s1', 's2', 's3'])
+        self.client = Mock()
+        self.client.servers.get = Mock(side_effect=self._get_server)
+
+    def _get_server(self, server_id):
+        if server_id not in self.servers:
+            raise nova_exceptions.NotFound(404, "Not found")
+        return self.servers[server_id]
+
+    def test_load_servers_fetches_only_requested_ids(self):
+        servers = models.load_servers(self.client, ['s1', 's3', None])
+        self.assertEqual(['s1', 's3'], sorted(servers.keys()))
+        self.assertEqual(2, self.client.servers.get.call_count)
+        self.assertFalse(self.client.servers.list.called)
+
+    def test_load_servers_skips_missing(self):
+        servers = models.load_servers(self.client, ['s1', 'missing'])
+        self.assertEqual(['s1'], servers.keys())
+
+    def test_load_servers_empty(self):
+        self.assertEqual({}, models.load_servers(self.client, []))
+        self.assertFalse(self.client.servers.get.called)
+
+    def test_load_servers_gives_each_lookup_its_own_client(self):
+        in_use = set()
+        shared = []
+
+        class Servers(novaclient_base.Manager):
+            def get(self, server_id):
+                if self.api in in_use:
+                    shared.append(server_id)
+                in_use.add(self.api)
+                eventlet.sleep(0.01)
+                in_use.discard(self.api)
+                return Mock(id=server_id)
+
+        def create():
+            client = Mock()
+            client.servers = Servers(client)
+            return client
+
+        servers = models.load_servers(remote.PooledClient(create),
+                                      ['s1', 's2', 's3'])
+        self.assertEqual(['s1', 's2', 's3'], sorted(servers.keys()))
+        self.assertEqual([], shared)
+
+    def test_dict_matcher(self):
+        find_server = models.create_server_dict_matcher(self.servers)
+        self.assertEqual(self.servers['s2'], find_server('instance', 's2'))
+        self.assertRaises(exception.ComputeInstanceNotFound,
+                          find_server, 'instance', 'missing')
+
+    def test_list_matcher_duplicates(self):
+        find_server = models.create_server_list_matcher(
+            [Mock(id='s1'), Mock(id='s1'), Mock(id='s2')])
+        self.assertEqual('s2', find_server('instance', 's2').id)
+        self.assertRaises(exception.ReddwarfError,
+                          find_server, 'instance', 's1')
+
+
+class ServerStatusCacheTest(testtools.TestCase):
+
+    def setUp(self):
+        super(ServerStatusCacheTest, self).setUp()
+        util.init_db()
+        self.ttl = CONF.server_status_cache_ttl
+        CONF.server_status_cache_ttl = 60
+        self.db_info = models.DBInstance.create(
+            name='cached', flavor_id=1, tenant_id='TENANT', volume_size=1,
+            compute_instance_id='server', task_status=InstanceTasks.NONE)
+        self.addresses = {'private': [{'addr': '10.0.0.1'}]}
+        self.client = Mock()
+        self.client.servers.get = Mock(
+            return_value=Mock(status='ACTIVE', addresses=self.addresses))
+        self.create_nova_client = models.create_nova_client
+        models.create_nova_client = lambda context: self.client
+
+    def tearDown(self):
+        super(ServerStatusCacheTest, self).tearDown()
+        CONF.server_status_cache_ttl = self.ttl
+        models.create_nova_client = self.create_nova_client
+        models.DBInstance.find_by(id=self.db_info.id).delete()
+
+    def _load(self):
+        db_info = models.DBInstance.find_by(id=self.db_info.id)
+        models.load_simple_instance_server_status(None, db_info)
+        return db_info
+
+    def test_status_is_cached(self):
+        db_info = self._load()
+        self.assertEqual('ACTIVE', db_info.server_status)
+        self.assertEqual(self.addresses, db_info.addresses)
+        self.assertEqual(1, self.client.servers.get.call_count)
+
+        db_info = self._load()
+        self.assertEqual('ACTIVE', db_info.server_status)
+        self.assertEqual(self.addresses, db_info.addresses)
+        self.assertEqual(1, self.client.servers.get.call_count)
+
+    def test_stale_status_is_refreshed(self):
+        self._load()
+        models.DBInstance.find_all(id=self.db_info.id).update(
+            server_status_updated=utils.utcnow() - timedelta(seconds=61))
+        self._load()
+        self.assertEqual(2, self.client.servers.get.call_count)
+
+    def test_cache_disabled(self):
+        CONF.server_status_cache_ttl = 0
+        self._load()
+        db_info = self._load()
+        self.assertEqual('ACTIVE', db_info.server_status)
+        self.assertEqual(2, self.client.servers.get.call_count)
+        self.assertEqual(None, db_info.server_status_updated)
@@ -11,9 +11,11 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import eventlet
 import testtools
 from mockito import mock, when, unstub, any, verify, never, times
 from mock import Mock
+from sqlalchemy.orm import Query
 from reddwarf.quota.quota import DbQuotaDriver
 from reddwarf.quota.models import Resource
 from reddwarf.quota.models import Quota
@@ -25,6 +27,7 @@ from reddwarf.common import exception
 from reddwarf.common import cfg
 from reddwarf.quota.quota import run_with_quotas
 from reddwarf.quota.quota import QUOTAS
+from reddwarf.tests.unittests.util import util
 """
 Unit tests for the classes and functions in DbQuotaDriver.py.
 """
@@ -140,6 +143,7 @@ class DbQuotaDriverTest(testtools.TestCase):
         self.orig_QuotaUsage_find_by = QuotaUsage.find_by
         self.orig_Reservation_create = Reservation.create
         self.orig_QuotaUsage_create = QuotaUsage.create
+        self.orig_QuotaUsage_create_all = QuotaUsage.create_all
         self.orig_QuotaUsage_save = QuotaUsage.save
         self.orig_Reservation_save = Reservation.save
         self.mock_quota_result = Mock()
@@ -154,6 +158,7 @@ class DbQuotaDriverTest(testtools.TestCase):
         QuotaUsage.find_by = self.orig_QuotaUsage_find_by
         Reservation.create = self.orig_Reservation_create
         QuotaUsage.create = self.orig_QuotaUsage_create
+        QuotaUsage.create_all = self.orig_QuotaUsage_create_all
         QuotaUsage.save = self.orig_QuotaUsage_save
         Reservation.save = self.orig_Reservation_save
 
@@ -322,7 +327,7 @@ class DbQuotaDriverTest(testtools.TestCase):
                                   reserved=0)]
 
         self.mock_usage_result.all = Mock(return_value=[])
-        QuotaUsage.create = Mock(side_effect=FAKE_QUOTAS)
+        QuotaUsage.create_all = Mock(return_value=FAKE_QUOTAS)
 
         usages = self.driver.get_all_quota_usages_by_tenant(FAKE_TENANT1,
                                                             resources.keys())
@@ -349,7 +354,7 @@ class DbQuotaDriverTest(testtools.TestCase):
                                     in_use=0,
                                     reserved=0)
         self.mock_usage_result.all = Mock(return_value=FAKE_QUOTAS)
-        QuotaUsage.create = Mock(return_value=NEW_FAKE_QUOTA)
+        QuotaUsage.create_all = Mock(return_value=[NEW_FAKE_QUOTA])
 
         usages = self.driver.get_all_quota_usages_by_tenant(FAKE_TENANT1,
                                                             resources.keys())
@@ -364,35 +369,6 @@ class DbQuotaDriverTest(testtools.TestCase):
         self.assertEquals(0, usages[Resource.VOLUMES].in_use)
         self.assertEquals(0, usages[Resource.VOLUMES].reserved)
 
-    def test_reserve(self):
-
-        FAKE_QUOTAS = [QuotaUsage(id=1,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.INSTANCES,
-                                  in_use=1,
-                                  reserved=2),
-                       QuotaUsage(id=2,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.VOLUMES,
-                                  in_use=1,
-                                  reserved=1)]
-
-        self.mock_quota_result.all = Mock(return_value=[])
-        self.mock_usage_result.all = Mock(return_value=FAKE_QUOTAS)
-        QuotaUsage.save = Mock()
-        Reservation.create = Mock()
-
-        delta = {'instances': 2, 'volumes': 3}
-        self.driver.reserve(FAKE_TENANT1, resources, delta)
-        _, kw = Reservation.create.call_args_list[0]
-        self.assertEquals(1, kw['usage_id'])
-        self.assertEquals(2, kw['delta'])
-        self.assertEquals(Reservation.Statuses.RESERVED, kw['status'])
-        _, kw = Reservation.create.call_args_list[1]
-        self.assertEquals(2, kw['usage_id'])
-        self.assertEquals(3, kw['delta'])
-        self.assertEquals(Reservation.Statuses.RESERVED, kw['status'])
-
     def test_reserve_resource_unknown(self):
 
         delta = {'instances': 10, 'volumes': 2000, 'Fake_resource': 123}
@@ -402,44 +378,64 @@ class DbQuotaDriverTest(testtools.TestCase):
                           resources,
                           delta)
 
-    def test_reserve_over_quota(self):
 
-        FAKE_QUOTAS = [QuotaUsage(id=1,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.INSTANCES,
-                                  in_use=0,
-                                  reserved=0),
-                       QuotaUsage(id=2,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.VOLUMES,
-                                  in_use=0,
-                                  reserved=0)]
+class DbQuotaDriverReserveTest(testtools.TestCase):
 
-        self.mock_quota_result.all = Mock(return_value=[])
-        self.mock_usage_result.all = Mock(return_value=FAKE_QUOTAS)
+    def setUp(self):
+        super(DbQuotaDriverReserveTest, self).setUp()
+        util.init_db()
+        self.driver = DbQuotaDriver(resources)
+
+    def tearDown(self):
+        super(DbQuotaDriverReserveTest, self).tearDown()
+        for usage in QuotaUsage.find_all(tenant_id=FAKE_TENANT1):
+            Reservation.find_all(usage_id=usage.id).delete()
+        QuotaUsage.find_all(tenant_id=FAKE_TENANT1).delete()
+
+    def _create_usage(self, resource, in_use, reserved):
+        return QuotaUsage.create(tenant_id=FAKE_TENANT1, resource=resource,
+                                 in_use=in_use, reserved=reserved)
+
+    def _usage(self, resource):
+        return QuotaUsage.find_by(tenant_id=FAKE_TENANT1, resource=resource)
+
+    def test_reserve(self):
+        self._create_usage(Resource.INSTANCES, 1, 2)
+        self._create_usage(Resource.VOLUMES, 1, 1)
+
+        delta = {'instances': 2, 'volumes': 3}
+        reservations = self.driver.reserve(FAKE_TENANT1, resources, delta)
+
+        instances = self._usage(Resource.INSTANCES)
+        volumes = self._usage(Resource.VOLUMES)
+        self.assertEqual(4, instances.reserved)
+        self.assertEqual(4, volumes.reserved)
+        self.assertEqual({instances.id: 2, volumes.id: 3},
+                         dict((resv.usage_id, resv.delta)
+                              for resv in reservations))
+        for resv in reservations:
+            self.assertEqual(Reservation.Statuses.RESERVED,
+                             Reservation.find_by(id=resv.id).status)
+
+    def test_reserve_creates_missing_usages(self):
+        self.driver.reserve(FAKE_TENANT1, resources, {'instances': 2})
+
+        usage = self._usage(Resource.INSTANCES)
+        self.assertEqual(0, usage.in_use)
+        self.assertEqual(2, usage.reserved)
 
+    def test_reserve_over_quota(self):
         delta = {'instances': 1, 'volumes': CONF.max_volumes_per_user + 1}
         self.assertRaises(exception.QuotaExceeded,
                           self.driver.reserve,
                           FAKE_TENANT1,
                           resources,
                           delta)
+        self.assertEqual([], QuotaUsage.find_all(tenant_id=FAKE_TENANT1).all())
 
     def test_reserve_over_quota_with_usage(self):
-
-        FAKE_QUOTAS = [QuotaUsage(id=1,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.INSTANCES,
-                                  in_use=1,
-                                  reserved=0),
-                       QuotaUsage(id=2,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.VOLUMES,
-                                  in_use=0,
-                                  reserved=0)]
-
-        self.mock_quota_result.all = Mock(return_value=[])
-        self.mock_usage_result.all = Mock(return_value=FAKE_QUOTAS)
+        self._create_usage(Resource.INSTANCES, 1, 0)
+        self._create_usage(Resource.VOLUMES, 0, 0)
 
         delta = {'instances': 5, 'volumes': 3}
         self.assertRaises(exception.QuotaExceeded,
@@ -447,22 +443,11 @@ class DbQuotaDriverTest(testtools.TestCase):
                           FAKE_TENANT1,
                           resources,
                           delta)
+        self.assertEqual(0, self._usage(Resource.VOLUMES).reserved)
 
     def test_reserve_over_quota_with_reserved(self):
-
-        FAKE_QUOTAS = [QuotaUsage(id=1,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.INSTANCES,
-                                  in_use=1,
-                                  reserved=2),
-                       QuotaUsage(id=2,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.VOLUMES,
-                                  in_use=0,
-                                  reserved=0)]
-
-        self.mock_quota_result.all = Mock(return_value=[])
-        self.mock_usage_result.all = Mock(return_value=FAKE_QUOTAS)
+        self._create_usage(Resource.INSTANCES, 1, 2)
+        self._create_usage(Resource.VOLUMES, 0, 0)
 
         delta = {'instances': 4, 'volumes': 2}
         self.assertRaises(exception.QuotaExceeded,
@@ -470,75 +455,84 @@ class DbQuotaDriverTest(testtools.TestCase):
                           FAKE_TENANT1,
                           resources,
                           delta)
+        self.assertEqual(2, self._usage(Resource.INSTANCES).reserved)
 
     def test_commit(self):
-
-        Reservation.save = Mock()
-        QuotaUsage.save = Mock()
-
-        FAKE_QUOTAS = [QuotaUsage(id=1,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.INSTANCES,
-                                  in_use=5,
-                                  reserved=2),
-                       QuotaUsage(id=2,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.VOLUMES,
-                                  in_use=1,
-                                  reserved=2)]
-
-        FAKE_RESERVATIONS = [Reservation(usage_id=1,
-                                         delta=1,
-                                         status=Reservation.Statuses.RESERVED),
-                             Reservation(usage_id=2,
-                                         delta=2,
-                                         status=Reservation.Statuses.RESERVED)]
-
-        QuotaUsage.find_by = Mock(side_effect=FAKE_QUOTAS)
-        self.driver.commit(FAKE_RESERVATIONS)
-
-        self.assertEqual(6, FAKE_QUOTAS[0].in_use)
-        self.assertEqual(1, FAKE_QUOTAS[0].reserved)
-        self.assertEqual(Reservation.Statuses.COMMITTED,
-                         FAKE_RESERVATIONS[0].status)
-
-        self.assertEqual(3, FAKE_QUOTAS[1].in_use)
-        self.assertEqual(0, FAKE_QUOTAS[1].reserved)
-        self.assertEqual(Reservation.Statuses.COMMITTED,
-                         FAKE_RESERVATIONS[1].status)
+        self._create_usage(Resource.INSTANCES, 2, 1)
+        self._create_usage(Resource.VOLUMES, 1, 0)
+        reservations = self.driver.reserve(FAKE_TENANT1, resources,
+                                           {'instances': 1, 'volumes': 2})
+
+        self.driver.commit(reservations)
+
+        instances = self._usage(Resource.INSTANCES)
+        volumes = self._usage(Resource.VOLUMES)
+        self.assertEqual(3, instances.in_use)
+        self.assertEqual(1, instances.reserved)
+        self.assertEqual(3, volumes.in_use)
+        self.assertEqual(0, volumes.reserved)
+        for resv in reservations:
+            self.assertEqual(Reservation.Statuses.COMMITTED, resv.status)
+            self.assertEqual(Reservation.Statuses.COMMITTED,
+                             Reservation.find_by(id=resv.id).status)
 
     def test_rollback(self):
-
-        Reservation.save = Mock()
-        QuotaUsage.save = Mock()
-
-        FAKE_QUOTAS = [QuotaUsage(id=1,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.INSTANCES,
-                                  in_use=5,
-                                  reserved=2),
-                       QuotaUsage(id=2,
-                                  tenant_id=FAKE_TENANT1,
-                                  resource=Resource.VOLUMES,
-                                  in_use=1,
-                                  reserved=2)]
-
-        FAKE_RESERVATIONS = [Reservation(usage_id=1,
-                                         delta=1,
-                                         status=Reservation.Statuses.RESERVED),
-                             Reservation(usage_id=2,
-                                         delta=2,
-                                         status=Reservation.Statuses.RESERVED)]
-
-        QuotaUsage.find_by = Mock(side_effect=FAKE_QUOTAS)
-        self.driver.rollback(FAKE_RESERVATIONS)
-
-        self.assertEqual(5, FAKE_QUOTAS[0].in_use)
-        self.assertEqual(1, FAKE_QUOTAS[0].reserved)
-        self.assertEqual(Reservation.Statuses.ROLLEDBACK,
-                         FAKE_RESERVATIONS[0].status)
-
-        self.assertEqual(1, FAKE_QUOTAS[1].in_use)
-        self.assertEqual(0, FAKE_QUOTAS[1].reserved)
-        self.assertEqual(Reservation.Statuses.ROLLEDBACK,
-                         FAKE_RESERVATIONS[1].status)
+        self._create_usage(Resource.INSTANCES, 2, 1)
+        self._create_usage(Resource.VOLUMES, 1, 0)
+        reservations = self.driver.reserve(FAKE_TENANT1, resources,
+                                           {'instances': 1, 'volumes': 2})
+
+        self.driver.rollback(reservations)
+
+        instances = self._usage(Resource.INSTANCES)
+        volumes = self._usage(Resource.VOLUMES)
+        self.assertEqual(2, instances.in_use)
+        self.assertEqual(1, instances.reserved)
+        self.assertEqual(1, volumes.in_use)
+        self.assertEqual(0, volumes.reserved)
+        for resv in reservations:
+            self.assertEqual(Reservation.Statuses.ROLLEDBACK, resv.status)
+            self.assertEqual(Reservation.Statuses.ROLLEDBACK,
+                             Reservation.find_by(id=resv.id).status)
+
+    def test_reserve_locks_usage_rows(self):
+        # SQLite ignores row locks, so check that the reservation asks for
+        # one rather than that concurrent reservations wait on it.
+        modes = []
+        with_lockmode = Query.with_lockmode
+
+        def spy(query, mode):
+            modes.append(mode)
+            return with_lockmode(query, mode)
+
+        self.patch(Query, 'with_lockmode', spy)
+        self.driver.reserve(FAKE_TENANT1, resources, {'instances': 1})
+        self.assertEqual(['update'], modes)
+
+    def test_interleaved_run_with_quotas_stays_within_limit(self):
+        # The greenthreads only interleave outside the reserve transaction,
+        # so this covers the accounting around it, not the row lock.
+        limit = CONF.max_instances_per_user
+        self.patch(QUOTAS, '_driver', self.driver)
+        created = []
+
+        def create():
+            # Yield while the reservation is held, as a real create would.
+            eventlet.sleep(0.01)
+            created.append(True)
+
+        def attempt():
+            try:
+                run_with_quotas(FAKE_TENANT1, {'instances': 1}, create)
+            except exception.QuotaExceeded:
+                pass
+
+        pool = eventlet.GreenPool()
+        for _ in range(limit * 4):
+            pool.spawn(attempt)
+        pool.waitall()
+
+        usage = self._usage(Resource.INSTANCES)
+        self.assertEqual(limit, len(created))
+        self.assertEqual(limit, usage.in_use)
+        self.assertEqual(0, usage.reserved)
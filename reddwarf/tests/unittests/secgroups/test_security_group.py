@@ -78,3 +78,49 @@ class Security_Group_Exceptions_Test(testtools.TestCase):
         self.assertRaises(exception.SecurityGroupRuleDeletionError,
                           models.RemoteSecurityGroup.delete_rule,
                           1, self.context)
+
+
+class SecurityGroupRuleDeleteAllTest(testtools.TestCase):
+
+    def setUp(self):
+        super(SecurityGroupRuleDeleteAllTest, self).setUp()
+        self.patch(models.SecurityGroupRule, 'save_all', Mock())
+        self.rules = [Mock(id='rule1'), Mock(id='rule2')]
+
+    def test_delete_all(self):
+        self.patch(models.RemoteSecurityGroup, 'delete_rule', Mock())
+
+        models.SecurityGroupRule.delete_all(self.rules, Mock())
+
+        models.SecurityGroupRule.save_all.assert_called_with(self.rules)
+        self.assertTrue(all(rule.deleted for rule in self.rules))
+
+    def test_delete_all_remote_failure(self):
+        def delete_rule(rule_id, context):
+            if rule_id == 'rule2':
+                raise exception.SecurityGroupRuleDeletionError()
+        self.patch(models.RemoteSecurityGroup, 'delete_rule',
+                   Mock(side_effect=delete_rule))
+
+        self.assertRaises(exception.SecurityGroupRuleDeletionError,
+                          models.SecurityGroupRule.delete_all,
+                          self.rules, Mock())
+        models.SecurityGroupRule.save_all.assert_called_with(self.rules[:1])
+
+    def test_delete_all_save_failure_keeps_remote_failure(self):
+        self.patch(models.RemoteSecurityGroup, 'delete_rule',
+                   Mock(side_effect=exception.SecurityGroupRuleDeletionError))
+        models.SecurityGroupRule.save_all.side_effect = (
+            exception.DBConstraintError(model_name='rule', error='failed'))
+
+        self.assertRaises(exception.SecurityGroupRuleDeletionError,
+                          models.SecurityGroupRule.delete_all,
+                          self.rules, Mock())
+
+    def test_delete_all_other_failure_is_reraised(self):
+        self.patch(models.RemoteSecurityGroup, 'delete_rule',
+                   Mock(side_effect=IOError('nova down')))
+
+        self.assertRaises(IOError, models.SecurityGroupRule.delete_all,
+                          self.rules, Mock())
+        models.SecurityGroupRule.save_all.assert_called_with([])
@@ -16,6 +16,7 @@ import reddwarf.common.remote as remote
 import testtools
 import reddwarf.taskmanager.models as taskmanager_models
 import reddwarf.backup.models as backup_models
+from mock import Mock
 from mockito import mock, when, unstub, any, verify, never
 from swiftclient.client import ClientException
 
@@ -92,3 +93,73 @@ class BackupTasksTest(testtools.TestCase):
         verify(backup_models.Backup, never).delete(self.backup.id)
         self.assertEqual(backup_models.BackupState.FAILED, self.backup.state,
                          "backup should be in FAILED status")
+
+
+class NovaNotificationTest(testtools.TestCase):
+    def setUp(self):
+        super(NovaNotificationTest, self).setUp()
+        self.db_info = mock()
+        self.db_info.id = 'instance id'
+        self.db_info.cached_addresses = {'private': [{'addr': '10.0.0.1'}]}
+        taskmanager_models.inst_models.DBInstance.get_by = Mock(
+            side_effect=self._get_by)
+
+    def tearDown(self):
+        super(NovaNotificationTest, self).tearDown()
+        del taskmanager_models.inst_models.DBInstance.get_by
+        unstub()
+
+    def _get_by(self, compute_instance_id=None, deleted=None):
+        if compute_instance_id == 'server id' and deleted is False:
+            return self.db_info
+
+    def _message(self, event_type='compute.instance.update', **payload):
+        payload.setdefault('instance_id', 'server id')
+        return {'event_type': event_type, 'payload': payload}
+
+    def test_nova_server_status(self):
+        self.assertEqual('ACTIVE',
+                         taskmanager_models.nova_server_status('active'))
+        self.assertEqual('REBOOT', taskmanager_models.nova_server_status(
+            'active', 'rebooting'))
+        self.assertEqual('SHUTOFF',
+                         taskmanager_models.nova_server_status('stopped'))
+        self.assertEqual('UNKNOWN',
+                         taskmanager_models.nova_server_status('bogus'))
+
+    def test_update_server_status(self):
+        taskmanager_models.update_server_status_from_notification(
+            self._message(state='active', new_task_state='resize_prep'))
+        verify(self.db_info).update_server_status(
+            'RESIZE', self.db_info.cached_addresses)
+
+    def test_update_server_status_with_fixed_ips(self):
+        fixed_ips = [{'label': 'private', 'address': '10.0.0.2',
+                      'version': 4}]
+        taskmanager_models.update_server_status_from_notification(
+            self._message(state='active', fixed_ips=fixed_ips))
+        verify(self.db_info).update_server_status(
+            'ACTIVE', {'private': [{'addr': '10.0.0.2', 'version': 4}]})
+
+    def test_ignores_other_events(self):
+        taskmanager_models.update_server_status_from_notification(
+            self._message(event_type='volume.create.end', state='active'))
+        verify(self.db_info, never).update_server_status(any(), any())
+
+    def test_ignores_unknown_servers(self):
+        taskmanager_models.update_server_status_from_notification(
+            self._message(instance_id='other server', state='active'))
+        verify(self.db_info, never).update_server_status(any(), any())
+
+    def test_wakes_server_pollers(self):
+        when(taskmanager_models.utils).wake_pollers(any()).thenReturn(None)
+        taskmanager_models.wake_pollers_from_notification(
+            self._message(event_type='compute.instance.delete.end'))
+        verify(taskmanager_models.utils).wake_pollers('server id')
+
+    def test_wakes_volume_pollers(self):
+        when(taskmanager_models.utils).wake_pollers(any()).thenReturn(None)
+        taskmanager_models.wake_pollers_from_notification(
+            {'event_type': 'volume.create.end',
+             'payload': {'volume_id': 'volume id'}})
+        verify(taskmanager_models.utils).wake_pollers('volume id')
@@ -21,3 +21,21 @@ def init_db():
     db_api = get_db_api()
     db_api.db_sync(CONF)
     session.configure_db(CONF)
+
+
+def record_statements(test):
+    """Returns a list the verb of every SQL statement run is appended to.
+
+    The recording stops when the test cleans up.
+    """
+    from sqlalchemy import event
+    from reddwarf.db.sqlalchemy import session
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split()[0])
+
+    event.listen(session._ENGINE, 'before_cursor_execute', record)
+    test.addCleanup(event.Events._remove, session._ENGINE,
+                    'before_cursor_execute', record)
+    return statements
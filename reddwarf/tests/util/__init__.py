@@ -224,7 +224,7 @@ def unquote_user_host(user_hostname):
 if CONFIG.simulate_events:
     # Without event let, this just calls time.sleep.
     def poll_until(retriever, condition=lambda value: value,
-                   sleep_time=1, time_out=None):
+                   sleep_time=1, time_out=None, **kwargs):
         """Retrieves object until it passes condition, then returns it.
 
         If time_out_limit is passed in, PollTimeOut will be raised once that
@@ -53,6 +53,7 @@ setuptools.setup(
              'bin/reddwarf-server',
              'bin/reddwarf-taskmanager',
              'bin/reddwarf-mgmt-taskmanager',
+             'bin/reddwarf-conductor',
              'bin/reddwarf-manage',
              ],
     py_modules=[],
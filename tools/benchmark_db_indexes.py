@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+# Copyright 2013 OpenStack LLC.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Measures the hot lookup queries before and after the lookup index migration.
+
+Seeds a database migrated to the version before the indexes with a fleet of
+instances, then prints the query plan and mean latency of each lookup, once
+before and once after upgrading. Use a scratch database; it is written to.
+
+    tools/benchmark_db_indexes.py [--connection URL] [--instances N]
+"""
+
+import datetime
+import optparse
+import os
+import sys
+import time
+import uuid
+
+possible_topdir = os.path.normpath(os.path.join(os.path.abspath(sys.argv[0]),
+                                                os.pardir,
+                                                os.pardir))
+if os.path.exists(os.path.join(possible_topdir, 'reddwarf', '__init__.py')):
+    sys.path.insert(0, possible_topdir)
+
+import sqlalchemy
+
+from reddwarf.db.sqlalchemy import migration
+
+INDEX_VERSION = 15
+
+QUERIES = [
+    ('service status by instance',
+     "SELECT * FROM service_statuses WHERE instance_id = :instance_id"),
+    ('heartbeat by instance',
+     "SELECT * FROM agent_heartbeats WHERE instance_id = :instance_id"),
+    ('instances by tenant',
+     "SELECT * FROM instances WHERE tenant_id = :tenant_id "
+     "AND deleted = :deleted"),
+    ('instance by server',
+     "SELECT * FROM instances WHERE compute_instance_id = :server_id"),
+    ('running backups by instance',
+     "SELECT * FROM backups WHERE instance_id = :instance_id "
+     "AND state = :state"),
+    ('reservations by usage',
+     "SELECT * FROM reservations WHERE usage_id = :usage_id"),
+    ('security groups by instance',
+     "SELECT * FROM security_group_instance_associations "
+     "WHERE instance_id = :instance_id"),
+]
+
+
+def seed(engine, instance_count, tenant_count):
+    now = datetime.datetime.utcnow()
+    tables = dict((name, [])
+                  for name in ['instances', 'service_statuses',
+                               'agent_heartbeats', 'backups',
+                               'quota_usages', 'reservations',
+                               'security_groups',
+                               'security_group_instance_associations'])
+    for tenant in range(tenant_count):
+        usage_id = str(uuid.uuid4())
+        tables['quota_usages'].append(
+            {'id': usage_id, 'tenant_id': 'tenant%d' % tenant,
+             'resource': 'instances', 'in_use': 0, 'reserved': 0})
+        for _ in range(4):
+            tables['reservations'].append(
+                {'id': str(uuid.uuid4()), 'usage_id': usage_id, 'delta': 1,
+                 'status': 'Committed'})
+    for index in range(instance_count):
+        instance_id = str(uuid.uuid4())
+        group_id = str(uuid.uuid4())
+        tables['instances'].append(
+            {'id': instance_id, 'name': 'instance%d' % index,
+             'tenant_id': 'tenant%d' % (index % tenant_count),
+             'compute_instance_id': 'server%d' % index,
+             'deleted': index % 10 == 0, 'created': now, 'updated': now})
+        tables['service_statuses'].append(
+            {'id': str(uuid.uuid4()), 'instance_id': instance_id,
+             'status_id': 1, 'status_description': 'running',
+             'updated_at': now})
+        tables['agent_heartbeats'].append(
+            {'id': str(uuid.uuid4()), 'instance_id': instance_id,
+             'updated_at': now})
+        tables['security_groups'].append(
+            {'id': group_id, 'name': 'group%d' % index, 'deleted': False})
+        tables['security_group_instance_associations'].append(
+            {'id': str(uuid.uuid4()), 'security_group_id': group_id,
+             'instance_id': instance_id, 'deleted': False})
+        for backup in range(3):
+            tables['backups'].append(
+                {'id': str(uuid.uuid4()), 'name': 'backup%d' % backup,
+                 'tenant_id': 'tenant%d' % (index % tenant_count),
+                 'instance_id': instance_id,
+                 'state': 'NEW' if backup == 2 else 'COMPLETED',
+                 'deleted': False, 'created': now, 'updated': now})
+    meta = sqlalchemy.MetaData(bind=engine)
+    for name in ['quota_usages', 'reservations', 'instances',
+                 'service_statuses', 'agent_heartbeats', 'security_groups',
+                 'security_group_instance_associations', 'backups']:
+        table = sqlalchemy.Table(name, meta, autoload=True)
+        engine.execute(table.insert(), tables[name])
+
+
+def query_plan(engine, sql, params):
+    if engine.name == 'sqlite':
+        explain = "EXPLAIN QUERY PLAN "
+    else:
+        explain = "EXPLAIN "
+    rows = engine.execute(sqlalchemy.text(explain + sql), **params)
+    return ["    %s" % " | ".join(str(value) for value in row)
+            for row in rows]
+
+
+def measure(engine, params, repeat):
+    results = {}
+    for name, sql in QUERIES:
+        statement = sqlalchemy.text(sql)
+        start = time.time()
+        for _ in range(repeat):
+            engine.execute(statement, **params).fetchall()
+        results[name] = ((time.time() - start) / repeat * 1000,
+                         query_plan(engine, sql, params))
+    return results
+
+
+def main():
+    parser = optparse.OptionParser(usage=__doc__.strip())
+    parser.add_option('--connection', default='sqlite:///index_bench.sqlite',
+                      help='SQLAlchemy URL of a scratch database.')
+    parser.add_option('--instances', type='int', default=20000)
+    parser.add_option('--tenants', type='int', default=500)
+    parser.add_option('--repeat', type='int', default=200)
+    (options, args) = parser.parse_args()
+
+    db_options = {'sql_connection': options.connection}
+    migration.db_sync(db_options, version=INDEX_VERSION - 1)
+    engine = sqlalchemy.create_engine(options.connection)
+    print "Seeding %d instances for %d tenants..." % (
+        options.instances, options.tenants)
+    seed(engine, options.instances, options.tenants)
+
+    sample = engine.execute("SELECT i.id, i.compute_instance_id, i.tenant_id "
+                            "FROM instances i LIMIT 1 OFFSET %d"
+                            % (options.instances / 2)).fetchone()
+    usage = engine.execute("SELECT id FROM quota_usages LIMIT 1").fetchone()
+    params = {'instance_id': sample[0], 'server_id': sample[1],
+              'tenant_id': sample[2], 'deleted': False, 'state': 'NEW',
+              'usage_id': usage[0]}
+
+    before = measure(engine, params, options.repeat)
+    migration.upgrade(db_options, version=INDEX_VERSION)
+    after = measure(engine, params, options.repeat)
+
+    for name, sql in QUERIES:
+        before_ms, before_plan = before[name]
+        after_ms, after_plan = after[name]
+        print
+        print "%s: %.3f ms -> %.3f ms" % (name, before_ms, after_ms)
+        print "  before:"
+        print "\n".join(before_plan)
+        print "  after:"
+        print "\n".join(after_plan)
+
+
+if __name__ == '__main__':
+    main()